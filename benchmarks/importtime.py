@@ -0,0 +1,127 @@
+"""
+Measures how long it takes to import doctor with ``python -X importtime``
+and checks that its heavy optional dependencies aren't imported with it.
+
+Usage::
+
+    python -m benchmarks.importtime [-n RUNS] [-m MODULE] [--top N]
+                                    [--json FILE]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Sequence
+
+import simplejson as json
+
+
+#: Dependencies that are only imported when they are first used.
+LAZY_DEPENDENCIES = ('isodate', 'jsonschema', 'rfc3987', 'sphinx', 'yaml')
+
+
+class ImportTime(NamedTuple):
+    """The import time of a module, in microseconds.
+
+    :param name: The name of the module.
+    :param self_us: The time spent importing the module itself.
+    :param cumulative_us: The time including the imports of its dependencies.
+    """
+    name: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(output: str) -> Dict[str, ImportTime]:
+    """Parses the output of ``python -X importtime``.
+
+    :param output: The stderr of the python process.
+    :returns: A dict of module name to its import time.
+    """
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # The header line.
+            continue
+        name = fields[2].strip()
+        times[name] = ImportTime(name, int(fields[0]), int(fields[1]))
+    return times
+
+
+def measure_import(module: str) -> Dict[str, ImportTime]:
+    """Imports a module in a new python process and times it.
+
+    :param module: The name of the module to import.
+    :returns: A dict of module name to import time for every module that was
+        imported.
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    return parse_importtime(process.stderr)
+
+
+def get_loaded_modules(module: str, names: Sequence[str]) -> List[str]:
+    """Gets which modules are imported along with a module.
+
+    :param module: The name of the module to import.
+    :param names: The names of the modules to look for.
+    :returns: The names that were imported, in the order given.
+    """
+    code = ('import sys, {}; print(",".join(name for name in {!r} '
+            'if name in sys.modules))').format(module, list(names))
+    process = subprocess.run(
+        [sys.executable, '-c', code], stdout=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    return [name for name in process.stdout.strip().split(',') if name]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', '--runs', type=int, default=10,
+                        help='Number of times the module is imported.')
+    parser.add_argument('-m', '--module', default='doctor',
+                        help='The module to import.')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Number of slowest modules to report.')
+    parser.add_argument('--json', dest='json_file',
+                        help='Also write the results to this JSON file.')
+    args = parser.parse_args(argv)
+
+    runs = [measure_import(args.module) for _ in range(args.runs)]
+    totals = [run[args.module].cumulative_us for run in runs]
+    # Use the run with the median total to report the slowest modules.
+    median_run = sorted(runs, key=lambda run: run[args.module].cumulative_us)[
+        len(runs) // 2]
+    slowest = sorted(median_run.values(), key=lambda t: t.cumulative_us,
+                     reverse=True)[:args.top]
+    loaded = get_loaded_modules(args.module, LAZY_DEPENDENCIES)
+
+    print('import {}: median {:.1f} ms, min {:.1f} ms over {} runs'.format(
+        args.module, statistics.median(totals) / 1000.0, min(totals) / 1000.0,
+        len(totals)))
+    print('{:<40}{:>12}{:>12}  (in ms)'.format(
+        'module', 'self', 'cumulative'))
+    for t in slowest:
+        print('{:<40}{:>12.1f}{:>12.1f}'.format(
+            t.name, t.self_us / 1000.0, t.cumulative_us / 1000.0))
+    print('lazy dependencies imported: {}'.format(', '.join(loaded) or 'none'))
+
+    if args.json_file:
+        with open(args.json_file, 'w') as f:
+            json.dump({
+                'module': args.module,
+                'median_us': statistics.median(totals),
+                'min_us': min(totals),
+                'slowest': [t._asdict() for t in slowest],
+                'lazy_dependencies_imported': loaded,
+            }, f, indent=2, sort_keys=True)
+    return 1 if loaded else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Runs the request validation benchmarks and reports throughput and latency
+percentiles per scenario.
+
+Usage::
+
+    python -m benchmarks.run [-n ITERATIONS] [-k PATTERN] [--json FILE]
+"""
+import argparse
+import gc
+import sys
+import time
+from typing import Callable, Dict, List
+
+import simplejson as json
+
+from benchmarks.scenarios import SCENARIOS
+
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_timings: List[float], pct: float) -> float:
+    """Gets a percentile of sorted timings using the nearest-rank method.
+
+    :param sorted_timings: The timings in ascending order.
+    :param pct: The percentile, between 0 and 100.
+    :returns: The timing at the percentile.
+    """
+    rank = max(int(round(pct / 100.0 * len(sorted_timings))), 1)
+    return sorted_timings[rank - 1]
+
+
+def measure(func: Callable[[], None], iterations: int,
+            warmup: int) -> Dict[str, float]:
+    """Times a callable and returns statistics about it.
+
+    :param func: The callable to time.
+    :param iterations: The number of timed calls.
+    :param warmup: The number of untimed calls made first.
+    :returns: A dict with the throughput in ops/s and latencies in
+        microseconds.
+    """
+    for _ in range(warmup):
+        func()
+    timings = []
+    timer = time.perf_counter
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            start = timer()
+            func()
+            timings.append(timer() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    timings.sort()
+    stats = {
+        'iterations': iterations,
+        'ops_per_sec': iterations / sum(timings),
+        'mean_us': sum(timings) / iterations * 1e6,
+        'min_us': timings[0] * 1e6,
+        'max_us': timings[-1] * 1e6,
+    }
+    for pct in PERCENTILES:
+        stats['p{}_us'.format(pct)] = percentile(timings, pct) * 1e6
+    return stats
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', '--iterations', type=int, default=2000,
+                        help='Timed calls per scenario.')
+    parser.add_argument('-w', '--warmup', type=int, default=200,
+                        help='Untimed calls per scenario made first.')
+    parser.add_argument('-k', '--filter', default='',
+                        help='Only run scenarios whose name contains this.')
+    parser.add_argument('--json', dest='json_file',
+                        help='Also write the results to this JSON file.')
+    args = parser.parse_args(argv)
+
+    columns = ['ops/s', 'mean'] + ['p{}'.format(p) for p in PERCENTILES]
+    print('{:<26}'.format('scenario') +
+          ''.join('{:>12}'.format(c) for c in columns) + '  (latency in us)')
+    results = {}
+    for scenario in SCENARIOS:
+        if args.filter not in scenario.name:
+            continue
+        stats = measure(scenario.setup(), args.iterations, args.warmup)
+        results[scenario.name] = stats
+        values = [stats['ops_per_sec'], stats['mean_us']] + [
+            stats['p{}_us'.format(p)] for p in PERCENTILES]
+        print('{:<26}'.format(scenario.name) +
+              ''.join('{:>12.1f}'.format(v) for v in values))
+
+    if args.json_file:
+        with open(args.json_file, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Benchmark scenarios for the request validation hot path.
+
+Each scenario builds its fixtures once and returns a callable that handles a
+single request, so only the work done per request is timed.  Requests are
+run through :mod:`doctor.pipeline`, which does the same work as
+:func:`doctor.flask.handle_http` without needing a Flask request context.
+"""
+import os
+from typing import Callable, List, NamedTuple
+
+import simplejson as json
+
+from doctor import types
+from doctor.pipeline import Error, Request, handle_request
+from doctor.plan import create_validation_plan
+from doctor.routing import HTTPMethod
+
+
+SCHEMA_FILE = os.path.join(os.path.dirname(__file__), 'schema', 'note.yaml')
+
+
+class Scenario(NamedTuple):
+    """A benchmark scenario.
+
+    :param name: The name of the scenario.
+    :param description: A short description of what is benchmarked.
+    :param setup: A callable that builds the fixtures and returns the callable
+        to benchmark.
+    """
+    name: str
+    description: str
+    setup: Callable[[], Callable[[], None]]
+
+
+NoteId = types.integer('Note ID', minimum=1, example=1)
+Body = types.string('Note body', max_length=1000, example='body')
+Done = types.boolean('Marks if a note is done or not.', example=False)
+Limit = types.integer('Max results', minimum=1, maximum=100, example=10)
+Offset = types.integer('Result offset', minimum=0, example=0)
+Sort = types.enum('Sort order', enum=['asc', 'desc'], example='asc')
+Query = types.string('Search query', min_length=1, example='milk')
+Tag = types.enum('A tag', enum=['work', 'home', 'errand', 'idea'],
+                 example='work')
+Tags = types.array('Tags', items=Tag, example=['work'])
+Latitude = types.number('Latitude', minimum=-90, maximum=90, example=45.0)
+Longitude = types.number('Longitude', minimum=-180, maximum=180,
+                         example=-122.0)
+
+
+class Location(types.Object):
+    description = 'A location.'
+    additional_properties = False
+    properties = {'lat': Latitude, 'lon': Longitude}
+    required = ['lat', 'lon']
+
+
+class Comment(types.Object):
+    description = 'A comment on a note.'
+    additional_properties = False
+    properties = {
+        'comment_id': NoteId,
+        'body': Body,
+        'location': Location,
+    }
+    required = ['comment_id', 'body']
+
+
+Comments = types.array('Comments', items=Comment)
+
+
+class Note(types.Object):
+    description = 'A note.'
+    additional_properties = False
+    properties = {
+        'note_id': NoteId,
+        'body': Body,
+        'done': Done,
+        'tags': Tags,
+        'location': Location,
+        'comments': Comments,
+    }
+    required = ['note_id', 'body', 'done']
+
+
+Notes = types.array('Notes', items=Note)
+NotesPage = types.array('A page of notes', items=Notes)
+
+
+class NoteIdOrQuery(types.UnionType):
+    description = 'A note ID or a search query.'
+    types = [NoteId, Query]
+
+
+class TagOrTags(types.UnionType):
+    description = 'A tag or an array of tags.'
+    types = [Tag, Tags]
+
+
+class LocationOrLatitude(types.UnionType):
+    description = 'A location object or a latitude.'
+    types = [Location, Latitude]
+
+
+SchemaNote = types.json_schema_type(SCHEMA_FILE, definition_key='note')
+SchemaTag = types.json_schema_type(SCHEMA_FILE, definition_key='tag')
+
+
+def make_logic(func: Callable, req_obj_type=None) -> Callable:
+    """Adds the doctor attributes and validation plan to a logic function.
+
+    :param func: The logic function.
+    :param req_obj_type: The `req_obj_type` of the route, if any.
+    :returns: The logic function routes would call.
+    """
+    logic = HTTPMethod('get', func, req_obj_type=req_obj_type).logic
+    logic._doctor_validation_plan = create_validation_plan(logic)
+    return logic
+
+
+def make_note(note_id: int, num_comments: int) -> dict:
+    return {
+        'note_id': note_id,
+        'body': 'Note body {}'.format(note_id),
+        'done': note_id % 2 == 0,
+        'tags': ['work', 'idea'],
+        'location': {'lat': 45.5, 'lon': -122.6},
+        'comments': [
+            {'comment_id': i + 1, 'body': 'Comment {}'.format(i),
+             'location': {'lat': 10.0, 'lon': 20.0}}
+            for i in range(num_comments)],
+    }
+
+
+def check(result):
+    """Makes sure a benchmarked request didn't fail validation."""
+    if isinstance(result, Error):
+        raise AssertionError('Benchmark request failed: {}'.format(
+            result.description))
+
+
+def small_get_query_string():
+    def logic(note_id: NoteId, limit: Limit = 10, offset: Offset = 0,
+              sort: Sort = 'asc', done: Done = None, tags: Tags = None):
+        return None
+
+    logic = make_logic(logic)
+    request = Request('GET', query={
+        'note_id': '12', 'limit': '50', 'offset': '100', 'sort': 'desc',
+        'done': 'false', 'tags': '["work", "home"]'})
+
+    def run():
+        check(handle_request(request, logic))
+    return run
+
+
+def large_nested_json_post():
+    def logic(note_id: NoteId, body: Body, done: Done, tags: Tags,
+              location: Location, comments: Comments):
+        return None
+
+    logic = make_logic(logic)
+    body = json.dumps(make_note(1, 200)).encode('utf-8')
+
+    def run():
+        request = Request('POST', 'application/json', body=body)
+        check(handle_request(request, logic))
+    return run
+
+
+def deep_arrays_of_objects():
+    def logic(notes: NotesPage):
+        return None
+
+    logic = make_logic(logic)
+    page = [[make_note(i * 10 + j + 1, 3) for j in range(10)]
+            for i in range(10)]
+    body = json.dumps({'notes': page}).encode('utf-8')
+
+    def run():
+        request = Request('POST', 'application/json', body=body)
+        check(handle_request(request, logic))
+    return run
+
+
+def union_type_params():
+    def logic(a: NoteIdOrQuery, b: NoteIdOrQuery, c: TagOrTags,
+              d: TagOrTags, e: LocationOrLatitude, f: LocationOrLatitude):
+        return None
+
+    logic = make_logic(logic)
+    request = Request('GET', query={
+        'a': '12', 'b': 'milk', 'c': 'home', 'd': '["work", "idea"]',
+        'e': '{"lat": 1.5, "lon": 2.5}', 'f': '45.0'})
+
+    def run():
+        check(handle_request(request, logic))
+    return run
+
+
+def json_schema_params():
+    def logic(note: SchemaNote, tag: SchemaTag):
+        return None
+
+    logic = make_logic(logic)
+    note = make_note(1, 0)
+    del note['location'], note['comments']
+    body = json.dumps({'note': note, 'tag': 'errand'}).encode('utf-8')
+
+    def run():
+        request = Request('POST', 'application/json', body=body)
+        check(handle_request(request, logic))
+    return run
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario('small_get_query_string',
+             'GET with six query string params', small_get_query_string),
+    Scenario('large_nested_json_post',
+             'POST of a note with 200 nested comments',
+             large_nested_json_post),
+    Scenario('deep_arrays_of_objects',
+             'POST of a 10x10 array of arrays of notes',
+             deep_arrays_of_objects),
+    Scenario('union_type_params',
+             'GET with six UnionType query string params', union_type_params),
+    Scenario('json_schema_params',
+             'POST of JsonSchema-backed params', json_schema_params),
+]
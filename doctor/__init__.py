@@ -1,11 +1,30 @@
 from __future__ import absolute_import
+import importlib
+import sys
+
 from ._version import __version__
 
 from . import errors
 from . import parsers
 from . import response
-from . import resource
 from . import routing
-from . import schema
 
-__all__ = [__version__, errors, parsers, response, resource, routing, schema]
+#: Submodules that are imported the first time they are accessed as
+#: attributes of the package, since they import jsonschema and yaml.
+_LAZY_MODULES = ('resource', 'schema')
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # Module __getattr__ (PEP 562) requires Python 3.7, so the submodules are
+    # imported eagerly on older versions.
+    from . import resource
+    from . import schema
+
+__all__ = ['__version__', 'errors', 'parsers', 'response', 'resource',
+           'routing', 'schema']
+
+
+def __getattr__(name):
+    if name in _LAZY_MODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name))
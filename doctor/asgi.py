@@ -0,0 +1,399 @@
+"""
+Helpers for serving doctor routes from an asyncio ASGI application.
+
+Handlers created by :func:`create_routes` are ASGI 3 applications, so they
+can be mounted in any ASGI router.  Path parameters are read from the
+`path_params` key of the ASGI scope, which is where routers such as
+Starlette's place them.
+"""
+import asyncio
+import functools
+import inspect
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl
+
+
+from .body import BodyLimits, check_size
+from .compression import Compression
+from .errors import PayloadTooLargeError
+from .pipeline import (BatchCall, Error, LogicCall, Request, encode_response,
+                       finish_batch, finish_call, prepare_batch, prepare_call)
+from .routing import create_routes as doctor_create_routes
+from .routing import Route
+
+
+class HTTPException(Exception):
+    """Base class for errors that are returned as an HTTP error response.
+
+    :param description: The error description.
+    :param errors: A dict containing all validation errors during the request.
+        The key is the param name and the value is the error message.
+    """
+    code = 500
+    name = 'Internal Server Error'
+
+    def __init__(self, description: str=None, errors: dict=None):
+        super(HTTPException, self).__init__(description)
+        self.description = description
+        self.data = {'status': self.code, 'message': str(description)}
+        self.errors = errors
+
+    def __str__(self):
+        return '%d: %s: %s' % (self.code, self.name, self.description)
+
+
+class HTTP400Exception(HTTPException):
+    code = 400
+    name = 'Bad Request'
+
+
+class HTTP401Exception(HTTPException):
+    code = 401
+    name = 'Unauthorized'
+
+
+class HTTP403Exception(HTTPException):
+    code = 403
+    name = 'Forbidden'
+
+
+class HTTP404Exception(HTTPException):
+    code = 404
+    name = 'Not Found'
+
+
+class HTTP405Exception(HTTPException):
+    code = 405
+    name = 'Method Not Allowed'
+
+
+class HTTP409Exception(HTTPException):
+    code = 409
+    name = 'Conflict'
+
+
+class HTTP413Exception(HTTPException):
+    code = 413
+    name = 'Payload Too Large'
+
+
+class HTTP500Exception(HTTPException):
+    code = 500
+    name = 'Internal Server Error'
+
+
+#: Maps the status code of a :class:`~doctor.pipeline.Error` to the exception
+#: that is raised for it.
+HTTP_EXCEPTIONS = {
+    400: HTTP400Exception,
+    401: HTTP401Exception,
+    403: HTTP403Exception,
+    404: HTTP404Exception,
+    409: HTTP409Exception,
+    413: HTTP413Exception,
+    500: HTTP500Exception,
+}
+
+
+async def read_request(scope: dict, receive: Callable,
+                       max_body_bytes: int = None) -> Request:
+    """Reads a request from an ASGI connection, including the entire body.
+
+    Query string params and `application/x-www-form-urlencoded` form params
+    are combined.  Like flask's `request.values`, only the first value of a
+    param is used, and query string params are looked at first.
+
+    :param scope: The ASGI connection scope.
+    :param receive: The ASGI receive callable.
+    :param max_body_bytes: If specified, reading stops as soon as the body is
+        known to be larger than this.
+    :returns: The request.
+    :raises PayloadTooLargeError: If the body is larger than `max_body_bytes`.
+    """
+    limits = BodyLimits(max_bytes=max_body_bytes)
+    content_type = ''
+    content_length = None
+    headers = {}
+    for key, value in scope.get('headers', []):
+        key = key.lower()
+        if key == b'content-type':
+            content_type = value.decode('latin-1')
+        elif key == b'content-length' and value.isdigit():
+            content_length = int(value)
+        name = key.decode('latin-1')
+        value = value.decode('latin-1')
+        # Repeated headers are combined as described in RFC 7230.
+        headers[name] = (
+            '{}, {}'.format(headers[name], value) if name in headers
+            else value)
+    mimetype = content_type.split(';', 1)[0].strip().lower()
+    check_size(content_length, limits)
+    chunks = []
+    size = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        check_size(size, limits)
+        chunks.append(chunk)
+        more_body = message.get('more_body', False)
+    body = b''.join(chunks)
+    params = parse_qsl(scope.get('query_string', b'').decode('latin-1'),
+                       keep_blank_values=True)
+    if mimetype == 'application/x-www-form-urlencoded':
+        params += parse_qsl(body.decode('utf-8'), keep_blank_values=True)
+    query = {}
+    for key, value in params:
+        query.setdefault(key, value)
+    return Request(scope['method'], mimetype, body=body, query=query,
+                   path_params=scope.get('path_params', {}),
+                   path=scope.get('path', ''), content_length=content_length,
+                   headers=headers)
+
+
+class Resource(object):
+    """The base class of handlers created by :func:`create_routes`.
+
+    A handler class is an ASGI application.  Each request instantiates the
+    class, which is then awaited to dispatch the request to the method
+    matching the HTTP method.
+
+    :param scope: The ASGI connection scope.
+    :param receive: The ASGI receive callable.
+    :param send: The ASGI send callable.
+    """
+    #: If True, uncaught errors in logic functions are re-raised instead of
+    #: being turned into 500 responses.
+    debug = False
+    #: If set, requests with a body larger than this many bytes are rejected
+    #: with a 413 response while the body is read.  A route's
+    #: :class:`~doctor.body.BodyLimits` also apply if they are lower.
+    max_body_bytes = None
+
+    def __init__(self, scope: dict, receive: Callable, send: Callable):
+        assert scope['type'] == 'http'
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.request = None
+
+    def __await__(self):
+        return self.dispatch().__await__()
+
+    async def dispatch(self):
+        """Dispatches the request and sends the response."""
+        method = getattr(self, self.scope['method'].lower(), None)
+        max_body_bytes = self.max_body_bytes
+        # The handler method has the attributes of the logic function.
+        body_limits = getattr(method, '_doctor_body_limits', None)
+        if body_limits is not None and body_limits.max_bytes is not None:
+            if max_body_bytes is None or body_limits.max_bytes < max_body_bytes:
+                max_body_bytes = body_limits.max_bytes
+        try:
+            self.request = await read_request(
+                self.scope, self.receive, max_body_bytes=max_body_bytes)
+        except PayloadTooLargeError as e:
+            error = HTTP413Exception(e)
+            await self.send_response(error.data, error.code)
+            return
+        try:
+            if method is None:
+                raise HTTP405Exception('The method is not allowed for the '
+                                       'requested URL.')
+            result = await method(**self.request.path_params)
+        except HTTPException as e:
+            result = (e.data, e.code)
+        await self.send_response(
+            *result, compression=getattr(method, '_doctor_compression', None))
+
+    async def send_response(self, content: Any, status_code: int,
+                            headers: dict=None,
+                            compression: Compression=None):
+        """Sends a response, encoding the content as JSON.
+
+        :param content: The response content.
+        :param status_code: The HTTP status code.
+        :param headers: A dict of additional response headers.
+        :param compression: If specified, the body is compressed with an
+            encoding accepted by the client.
+        """
+        accept_encoding = None
+        if compression is not None and self.request is not None:
+            accept_encoding = self.request.headers.get('accept-encoding')
+        body, status_code, headers = encode_response(
+            (content, status_code, headers), accept_encoding, compression)
+        raw_headers = [(b'content-type', b'application/json'),
+                       (b'content-length', str(len(body)).encode('latin-1'))]
+        for key, value in headers.items():
+            raw_headers.append(
+                (key.lower().encode('latin-1'), str(value).encode('latin-1')))
+        await self.send({'type': 'http.response.start',
+                         'status': status_code,
+                         'headers': raw_headers})
+        await self.send({'type': 'http.response.body', 'body': body})
+
+
+async def call_logic(logic: Callable, *args, **kwargs) -> Any:
+    """Calls a logic function.
+
+    `async def` logic functions are awaited.  Regular logic functions are run
+    in the event loop's default executor so they don't block the loop.
+
+    :param logic: The logic function.
+    :returns: The result of the logic function.
+    """
+    if inspect.iscoroutinefunction(logic):
+        return await logic(*args, **kwargs)
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        None, functools.partial(logic, *args, **kwargs))
+
+
+async def handle_http(handler: Resource, args: Tuple, kwargs: Dict,
+                      logic: Callable):
+    """Handle an ASGI HTTP request
+
+    This runs the :mod:`doctor.pipeline` for the handler's request, awaiting
+    the logic function between :func:`~doctor.pipeline.prepare_call` and
+    :func:`~doctor.pipeline.finish_call`, and turns any errors into HTTP
+    exceptions.
+
+    :param handler: An instance of a :class:`Resource` handler class.
+    :param tuple args: Any positional arguments passed to the wrapper method.
+    :param dict kwargs: Any keyword arguments passed to the wrapper method.
+        These are the path params of the request.
+    :param callable logic: The callable to invoke to actually perform the
+        business logic for this request.
+    """
+    request = handler.request
+    if getattr(logic, '_doctor_batch_method', None) is not None:
+        result = await handle_batch_http(request, logic, args)
+    else:
+        result = prepare_call(request, logic, args)
+        if isinstance(result, LogicCall):
+            try:
+                response = await call_logic(
+                    logic, *result.args, **result.kwargs)
+            except Exception as e:
+                response = e
+            result = finish_call(request, result, response)
+    if isinstance(result, Error):
+        raise_error(handler, result)
+    return result
+
+
+def raise_error(handler: Resource, error: Error):
+    """Raises the HTTP exception of an error.
+
+    :param handler: An instance of a :class:`Resource` handler class.
+    :param error: The error.
+    :raises HTTPException: The HTTP exception of the error, or the original
+        exception of a 500 error if the handler is in debug mode.
+    """
+    if error.status_code == 500:
+        # Always re-raise exceptions when debug is enabled for development.
+        if handler.debug:
+            raise error.exception
+        logging.error(error.exception, exc_info=error.exception)
+    raise HTTP_EXCEPTIONS[error.status_code](
+        error.description, errors=error.errors)
+
+
+def get_batch_semaphore(logic: Callable) -> Optional[asyncio.Semaphore]:
+    """Gets the semaphore that limits the concurrency of a batch endpoint.
+
+    asyncio semaphores belong to an event loop, so it's created the first
+    time the batch endpoint handles a request.
+
+    :param logic: The logic function of the batch endpoint.
+    :returns: The semaphore, or None if the batch has no `max_concurrency`.
+    """
+    max_concurrency = logic._doctor_batch.max_concurrency
+    if max_concurrency is None:
+        return None
+    semaphore = getattr(logic, '_doctor_batch_async_semaphore', None)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        logic._doctor_batch_async_semaphore = semaphore
+    return semaphore
+
+
+async def run_batch_calls(logic: Callable, calls: List[BatchCall],
+                          results: Dict[int, Any]):
+    """Calls the logic function for the valid items of a batch request.
+
+    The calls run concurrently.  `async def` logic functions are awaited, and
+    regular logic functions are run in the batch's executor, or the event
+    loop's default executor if it doesn't have one.  The responses are
+    mapped back to the items once all calls finish.
+
+    :param logic: The logic function of the batch endpoint.
+    :param calls: The calls of the valid items.
+    :param results: A dict of item index to response that is updated with the
+        value returned by the logic function or the exception it raised.
+    """
+    executor = logic._doctor_batch.executor
+    semaphore = get_batch_semaphore(logic)
+
+    async def call_item(call):
+        if inspect.iscoroutinefunction(logic):
+            return await logic(*call.args, **call.kwargs)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(executor, functools.partial(
+            logic._doctor_batch_logic, *call.args, **call.kwargs))
+
+    async def run(call):
+        if semaphore is None:
+            return await call_item(call)
+        async with semaphore:
+            return await call_item(call)
+
+    responses = await asyncio.gather(*(run(call) for call in calls),
+                                     return_exceptions=True)
+    for call, response in zip(calls, responses):
+        results[call.index] = response
+
+
+async def handle_batch_http(request: Request, logic: Callable,
+                            args: Tuple) -> Union[Tuple, Error]:
+    """Handles a request to a batch endpoint.
+
+    This is the ASGI version of
+    :func:`~doctor.pipeline.handle_batch_request`, which handles the items
+    concurrently with :func:`run_batch_calls` between
+    :func:`~doctor.pipeline.prepare_batch` and
+    :func:`~doctor.pipeline.finish_batch`.
+
+    :param request: The request.
+    :param logic: The logic function of the batch endpoint.
+    :param args: Any positional arguments that should be passed to the logic
+        function before the request params.
+    :returns: The result, or an :class:`~doctor.pipeline.Error` if the request
+        could not be handled.
+    """
+    prepared = prepare_batch(request, logic, args)
+    if isinstance(prepared, Error):
+        return prepared
+    many_responses = None
+    try:
+        if prepared.many_params is not None:
+            many_responses = await call_logic(
+                logic._doctor_batch.many, *args, prepared.many_params)
+        else:
+            await run_batch_calls(logic, prepared.calls, prepared.responses)
+    except Exception as e:
+        many_responses = e
+    return finish_batch(request, logic, prepared, many_responses)
+
+
+def create_routes(routes: Tuple[Route]) -> List[Tuple[str, Resource]]:
+    """A thin wrapper around create_routes that passes in ASGI specific values.
+
+    :param routes: A tuple containing the route and another tuple with
+        all http methods allowed for the route.
+    :returns: A list of tuples containing the route and generated handler.
+    """
+    return doctor_create_routes(
+        routes, handle_http, default_base_handler_class=Resource)
@@ -0,0 +1,87 @@
+"""
+Batch endpoints.
+
+An http method with a :class:`Batch` gets a companion endpoint that takes a
+JSON array of param sets in a POST request.  Each item is validated against
+the logic function's signature as if it were the JSON body of a request,
+and the logic function is called once for every valid item.  The response is
+a JSON array with a result for each item, in the same order:
+
+.. code-block:: json
+
+    [
+        {"status": 200, "data": {"item_id": 1}},
+        {"status": 400, "message": "item_id - Must be a valid number.",
+         "errors": {"item_id": "Must be a valid number."}}
+    ]
+
+If the batch has a `many` callable, it is called once with the params of all
+valid items instead of calling the logic function once per item.
+
+Items are handled one at a time unless the batch has an `executor`, which
+runs the logic function of every valid item in parallel.  The ASGI adapter
+always handles items concurrently, awaiting `async def` logic functions on
+the event loop and running regular logic functions in the executor, or in
+the event loop's default executor.
+"""
+from concurrent.futures import Executor
+from typing import Any, Callable, List, NamedTuple, Optional
+
+
+class Batch(NamedTuple):
+    """The configuration of a batch endpoint.
+
+    :param route: The route of the batch endpoint.  Defaults to the route of
+        the http method followed by `batch/`, e.g. `/items/batch/`.  It must
+        be set for routes that don't end with a `/`, like regex routes.
+    :param max_items: The maximum number of items in a batch, or None for no
+        limit.  Larger batches get a 413 response.
+    :param many: A callable that handles all items at once.  It is called
+        with any positional arguments passed to the handler followed by a
+        list with the params of each valid item.  The params are a dict of
+        logic function param name to value, or the request object of a
+        `req_obj_type`.  It must return a list with a response for each item,
+        in the same order.  A response that is an exception is handled as if
+        the logic function raised it for the item.
+    :param executor: A :class:`concurrent.futures.Executor`, like a
+        `ThreadPoolExecutor` or a `ProcessPoolExecutor`, that calls the logic
+        function for each item.  A `ProcessPoolExecutor` requires a logic
+        function that can be pickled, i.e. one defined at the top level of a
+        module.  The executor isn't shut down by doctor.
+    :param max_concurrency: The maximum number of items of the batch endpoint
+        that are handled at the same time, across all of its requests, or
+        None for no limit other than the size of the executor.
+    """
+    route: Optional[str] = None
+    max_items: Optional[int] = 100
+    many: Optional[Callable[..., List[Any]]] = None
+    executor: Optional[Executor] = None
+    max_concurrency: Optional[int] = None
+
+
+def get_batch_route(route: str, batch: Batch) -> str:
+    """Gets the route of a batch endpoint.
+
+    :param route: The route of the http method.
+    :param batch: The batch configuration.
+    :returns: The route of the batch endpoint.
+    :raises ValueError: If the batch doesn't have a route and one can't be
+        derived from the route of the http method.
+    """
+    if batch.route is not None:
+        return batch.route
+    if not route.endswith('/'):
+        raise ValueError(
+            'Batch endpoints of routes that do not end with a / must set '
+            'the route of the batch: {}'.format(route))
+    return route + 'batch/'
+
+
+def check_batch(batch: Batch):
+    """Checks the configuration of a batch endpoint.
+
+    :param batch: The batch configuration.
+    :raises ValueError: If the configuration is invalid.
+    """
+    if batch.max_concurrency is not None and batch.max_concurrency < 1:
+        raise ValueError('The max_concurrency of a batch must be at least 1.')
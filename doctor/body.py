@@ -0,0 +1,232 @@
+"""
+Request body ingestion.
+
+Before a JSON request body is parsed into python objects it can be scanned
+for its size, nesting depth, array lengths and object key counts, so bodies
+that are too large are rejected before they are fully materialized.  The
+scan only tokenizes strings and structural characters, so it is much cheaper
+than parsing the body.
+"""
+import re
+from typing import Any, Mapping, NamedTuple, Optional, Union
+
+from . import json_backend
+from .errors import InvalidValueError, PayloadTooLargeError, TypeSystemError
+from .types import Array, Object
+
+
+class BodyLimits(NamedTuple):
+    """Limits for a JSON request body.
+
+    Any limit that is None isn't enforced.
+
+    :param max_bytes: The maximum size of the body in bytes.
+    :param max_depth: The maximum nesting depth of arrays and objects.
+    :param max_array_length: The maximum number of items in an array.
+    :param max_object_keys: The maximum number of keys in an object.
+    """
+    max_bytes: Optional[int] = None
+    max_depth: Optional[int] = None
+    max_array_length: Optional[int] = None
+    max_object_keys: Optional[int] = None
+
+
+#: Matches a JSON string or a structural character.  Scalars other than
+#: strings don't affect the structure so they are skipped.
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|[\[\]{},:]', re.DOTALL)
+
+
+def _unescape_key(token: str) -> str:
+    if '\\' not in token:
+        return token[1:-1]
+    return json_backend.loads(token)
+
+
+class _Container(object):
+    """The state of an array or object while scanning."""
+    __slots__ = ('is_object', 'count', 'limit', 'type_limit', 'annotation',
+                 'properties', 'key', 'param')
+
+    def __init__(self, is_object, limit, annotation, properties, param):
+        self.is_object = is_object
+        self.count = 1
+        self.limit = limit
+        self.type_limit = None
+        self.annotation = annotation
+        self.properties = properties
+        self.key = None
+        self.param = param
+
+
+def check_size(size: Optional[int], limits: BodyLimits):
+    """Checks the size of a body against the limits.
+
+    :param size: The size of the body in bytes, e.g. from the Content-Length
+        header.  Nothing is checked if it is None.
+    :param limits: The body limits.
+    :raises PayloadTooLargeError: If the body is too large.
+    """
+    if (size is not None and limits.max_bytes is not None and
+            size > limits.max_bytes):
+        raise PayloadTooLargeError(
+            'Request body must not be larger than {} bytes.'.format(
+                limits.max_bytes))
+
+
+def check_json_body(body: Union[bytes, str], limits: BodyLimits,
+                    root: Any = None):
+    """Checks a JSON body against limits without parsing it.
+
+    If the types the body should validate against are given, arrays and
+    objects are also checked against the `max_items` of
+    :class:`~doctor.types.Array` types and the properties of
+    :class:`~doctor.types.Object` types that don't allow additional
+    properties, since a body that exceeds those can never validate.
+
+    Most invalid JSON isn't detected and is left for the JSON parser to
+    reject.  Bodies that can't be scanned, like ones with unbalanced brackets
+    or that aren't valid UTF-8, raise the same error as the parser.
+
+    :param body: The raw JSON body.
+    :param limits: The body limits.
+    :param root: The type the body should validate against, or a mapping of
+        request param names to types if the body contains request params.
+    :raises InvalidValueError: If the body can't be scanned because it isn't
+        valid JSON.
+    :raises PayloadTooLargeError: If the body exceeds any of the limits.
+    :raises TypeSystemError: If an array or object exceeds the limits of its
+        type.
+    """
+    check_size(len(body), limits)
+    if isinstance(body, bytes):
+        try:
+            body = body.decode('utf-8')
+        except UnicodeDecodeError:
+            raise _invalid_json()
+
+    stack = []
+    container = None
+    last_string = None
+    pending = root
+    for match in _TOKEN_RE.finditer(body):
+        token = match.group()
+        char = token[0]
+        if char == '"':
+            last_string = token
+            continue
+        if char == ',':
+            if container is None:
+                raise _invalid_json()
+            container.count += 1
+            _check_count(container)
+            if not container.is_object:
+                pending = _item_type(container.annotation)
+            continue
+        if char == ':':
+            if container is None or not container.is_object or (
+                    last_string is None):
+                raise _invalid_json()
+            try:
+                key = _unescape_key(last_string)
+            except ValueError:
+                raise _invalid_json()
+            container.key = key
+            if container.properties is not None:
+                pending = container.properties.get(key)
+            else:
+                pending = None
+            continue
+        if char in '[{':
+            if limits.max_depth is not None and len(stack) >= limits.max_depth:
+                raise PayloadTooLargeError(
+                    'Request body must not be nested more than {} '
+                    'levels.'.format(limits.max_depth))
+            if container is None:
+                param = '__all__'
+            elif container.param is None:
+                # Containers in a body of request params are reported
+                # under the param they belong to.
+                param = container.key
+            else:
+                param = container.param
+            container = _open_container(char == '{', pending, limits, param,
+                                        is_params=(container is None and
+                                                   isinstance(root, Mapping)))
+            stack.append(container)
+            if not container.is_object:
+                pending = _item_type(container.annotation)
+            continue
+        # A closing bracket.
+        if container is None or container.is_object != (char == '}'):
+            raise _invalid_json()
+        stack.pop()
+        container = stack[-1] if stack else None
+        pending = None
+
+
+def _invalid_json() -> InvalidValueError:
+    return InvalidValueError('Request body is not valid JSON.')
+
+
+def _open_container(is_object: bool, annotation: Any, limits: BodyLimits,
+                    param: str, is_params: bool = False) -> _Container:
+    properties = None
+    if is_params:
+        # The root of a body of request params.  Any keys that aren't
+        # params are ignored, so only the params' types are known.
+        properties = annotation
+        annotation = None
+        param = None
+    if is_object:
+        limit = limits.max_object_keys
+        if _is_type(annotation, Object):
+            properties = annotation.properties
+        else:
+            annotation = None
+    else:
+        limit = limits.max_array_length
+        if not _is_type(annotation, Array):
+            annotation = None
+    container = _Container(is_object, limit, annotation, properties, param)
+    if annotation is not None:
+        if is_object:
+            if not annotation.additional_properties:
+                container.type_limit = len(properties)
+        else:
+            container.type_limit = annotation.max_items
+    # Containers start with a count of 1, which is only wrong for empty
+    # containers.  Those can't exceed a limit so it doesn't matter.
+    return container
+
+
+def _is_type(annotation: Any, cls: type) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, cls)
+
+
+def _item_type(annotation: Any) -> Any:
+    if annotation is None:
+        return None
+    items = getattr(annotation, 'items', None)
+    if isinstance(items, list):
+        return None
+    return items
+
+
+def _check_count(container: _Container):
+    if container.limit is not None and container.count > container.limit:
+        if container.is_object:
+            message = 'Objects must not have more than {} keys.'
+        else:
+            message = 'Arrays must not have more than {} items.'
+        raise PayloadTooLargeError(message.format(container.limit))
+    if (container.type_limit is not None and
+            container.count > container.type_limit and
+            container.param is not None):
+        annotation = container.annotation
+        if container.is_object:
+            code = 'additional_properties'
+        else:
+            code = 'max_items'
+        detail = TypeSystemError(cls=annotation, code=code).detail
+        raise TypeSystemError(
+            {container.param: detail}, errors={container.param: detail})
@@ -0,0 +1,187 @@
+"""
+Caching of responses by their validated request params.
+
+A :class:`ResponseCache` can be set on an http method with the
+`response_cache` option.  Requests are validated as usual, and the cache key
+is built from the route, the HTTP method and the coerced params, so
+requests that only differ in how their params are written, like `?a=1&b=2`
+and `?b=2&a=01`, share a response.  The logic function is only called if
+the key isn't cached.
+
+Responses are cached in process by a :class:`MemoryCacheBackend` unless
+another :class:`CacheBackend` is provided.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+from .parsers import CacheInfo
+
+
+class CacheBackend(object):
+    """Stores cached responses.
+
+    Subclass this to store responses somewhere other than the memory of the
+    process.  Cached values are tuples of the response content, status code
+    and headers.
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        """Gets a cached value.
+
+        :param key: The cache key.
+        :returns: The value, or None if it isn't cached or has expired.
+        """
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float]):
+        """Caches a value.
+
+        :param key: The cache key.
+        :param value: The value.
+        :param ttl: The number of seconds the value should be cached for, or
+            None if it shouldn't expire.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """Removes all cached values."""
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """A thread safe, bounded LRU cache in the memory of the process.
+
+    Cached values are shared between requests and aren't copied.
+
+    :param maxsize: The maximum number of values to cache.  The least
+        recently used value is evicted when it is full.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize < 1:
+            raise ValueError('maxsize must be greater than 0.')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        #: Maps keys to a tuple of the expiry time and the value.
+        self._values = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            try:
+                expires, value = self._values[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            if expires is not None and expires <= time.monotonic():
+                del self._values[key]
+                self.misses += 1
+                return None
+            self._values.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float]):
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._values[key] = (expires, value)
+            self._values.move_to_end(key)
+            if len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+    def clear(self):
+        """Removes all values and resets the statistics."""
+        with self._lock:
+            self._values.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Returns the statistics of the cache."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize,
+                             len(self._values))
+
+
+class ResponseCache(object):
+    """Caches the responses of an http method.
+
+    Only successful responses with a 2xx status code are cached.  Cached
+    responses include the headers of a :class:`~doctor.response.Response`
+    returned by the logic function, and aren't validated again.
+
+    :param ttl: The number of seconds responses are cached for, or None if
+        they shouldn't expire.
+    :param maxsize: The maximum number of responses to cache in the default
+        :class:`MemoryCacheBackend`.
+    :param backend: The :class:`CacheBackend` to store responses in.  If not
+        provided a :class:`MemoryCacheBackend` is created.
+    :param allow_unsafe_methods: Responses are only cached for GET requests
+        unless this is True, since other methods usually change state.
+    """
+
+    def __init__(self, ttl: Optional[float] = 60.0, maxsize: int = 1024,
+                 backend: CacheBackend = None,
+                 allow_unsafe_methods: bool = False):
+        if ttl is not None and ttl <= 0:
+            raise ValueError('ttl must be greater than 0.')
+        if backend is None:
+            backend = MemoryCacheBackend(maxsize)
+        self.ttl = ttl
+        self.backend = backend
+        self.allow_unsafe_methods = allow_unsafe_methods
+
+    def get_key(self, route: str, method: str, args: Sequence,
+                kwargs: Dict[str, Any]) -> str:
+        """Gets the cache key of a request.
+
+        :param route: The route of the request.
+        :param method: The HTTP method of the request.
+        :param args: The validated params passed to the logic function as
+            positional arguments, e.g. the request object of a `req_obj_type`.
+        :param kwargs: The validated params passed to the logic function as
+            keyword arguments.
+        :returns: The cache key.
+        """
+        # Params are coerced to their types, so encoding them as JSON with
+        # sorted keys gives the same key for equal requests.
+        params = json.dumps([args, kwargs], sort_keys=True,
+                            separators=(',', ':'), default=str)
+        return '{} {} {}'.format(method.upper(), route, params)
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Gets a cached result.
+
+        :param key: The cache key.
+        :returns: The result, or None if it isn't cached.
+        """
+        return self.backend.get(key)
+
+    def set(self, key: str, result: tuple):
+        """Caches a result if it was successful.
+
+        :param key: The cache key.
+        :param result: A tuple of the response content, status code and
+            optionally headers.
+        """
+        if 200 <= result[1] < 300:
+            self.backend.set(key, result, self.ttl)
+
+
+def check_response_cache(method: str, response_cache: ResponseCache):
+    """Checks that responses of an http method can be cached.
+
+    :param method: The http method, e.g. `get`.
+    :param response_cache: The response cache.
+    :raises ValueError: If the method isn't GET and the cache doesn't allow
+        unsafe methods.
+    """
+    if method.lower() != 'get' and not response_cache.allow_unsafe_methods:
+        raise ValueError(
+            'Responses are only cached for GET requests.  Set '
+            'allow_unsafe_methods to cache {} requests.'.format(
+                method.upper()))
@@ -0,0 +1,271 @@
+"""
+Generates specialized validators for :class:`~doctor.types.Object` and
+:class:`~doctor.types.Array` types.
+
+Instantiating an `Object` or `Array` walks its `properties` or `items`
+dynamically for every value.  :func:`compile_type` instead generates python
+source for a flat function that validates a value against the whole type tree,
+with the properties, required keys and limits of every type inlined as
+constants.  The function is built once per type and cached on the class.
+
+The generated validator behaves the same as instantiating the type and
+converting it to its native type, except nested objects and arrays are
+returned as plain dicts and lists instead of doctor type instances.
+
+>>> from doctor.compiler import compile_type
+>>> from doctor.types import array, integer
+>>> Ids = array('ids', items=integer('An id', minimum=1), max_items=2)
+>>> validate = compile_type(Ids)
+>>> validate(['1', 2])
+[1, 2]
+"""
+from typing import Any, Callable, Dict, List
+
+from doctor.errors import TypeSystemError
+from doctor.types import Array, Object, SuperType
+
+
+#: The attribute used to cache compiled validators on a type.
+COMPILED_VALIDATOR_ATTR = '_doctor_compiled_validator'
+
+
+def _has_custom_validate(cls) -> bool:
+    """Returns True if the type overrides :meth:`SuperType.validate`."""
+    return cls.validate.__func__ is not SuperType.validate.__func__
+
+
+class _CodeGenerator(object):
+    """Generates the source of the validator functions for a type tree.
+
+    :param root: The type to generate a validator for.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.lines: List[str] = []
+        self.namespace: Dict[str, Any] = {'TypeSystemError': TypeSystemError}
+        self._constants: Dict[int, str] = {}
+        self._functions: Dict[type, str] = {}
+        self._pending: List[type] = []
+
+    def constant(self, value) -> str:
+        """Binds a value in the namespace and returns the name it's bound to.
+
+        :param value: Any value the generated code should reference.
+        :returns: The name of the variable in the generated code.
+        """
+        name = self._constants.get(id(value))
+        if name is None:
+            name = '_c{}'.format(len(self._constants))
+            self._constants[id(value)] = name
+            self.namespace[name] = value
+        return name
+
+    def caller(self, cls) -> str:
+        """Returns an expression that validates a value against a type.
+
+        Objects and arrays get their own generated function.  Any other type
+        is called directly.
+
+        :param cls: The type.
+        :returns: An expression, to be formatted with the name of the value.
+        """
+        if isinstance(cls, type) and issubclass(cls, (Object, Array)):
+            name = self._functions.get(cls)
+            if name is None:
+                name = '_validate_{}'.format(len(self._functions))
+                self._functions[cls] = name
+                self._pending.append(cls)
+            return name + '({})'
+        return self.constant(cls) + '({})'
+
+    def emit(self, indent: int, line: str):
+        self.lines.append('    ' * indent + line)
+
+    def emit_raise(self, indent: int, cls, code: str):
+        """Emits a line raising the error for an error code of a type."""
+        self.emit(indent, 'raise TypeSystemError(cls={}, code={!r})'.format(
+            self.constant(cls), code))
+
+    def generate(self) -> str:
+        """Generates the source for the type tree.
+
+        :returns: The source.  The function for the root type is always named
+            `_validate_0`.
+        """
+        self.caller(self.root)
+        while self._pending:
+            cls = self._pending.pop(0)
+            if issubclass(cls, Object):
+                self._generate_object(cls)
+            else:
+                self._generate_array(cls)
+            self.lines.append('')
+        return '\n'.join(self.lines)
+
+    def _generate_header(self, cls, empty: str):
+        """Generates the function definition shared by objects and arrays."""
+        self.emit(0, 'def {}(value):'.format(self._functions[cls]))
+        if cls.nullable:
+            self.emit(1, 'if value is None:')
+            self.emit(2, 'return {}'.format(empty))
+
+    def _generate_object(self, cls):
+        c = self.constant(cls)
+        self._generate_header(cls, '{}')
+        if cls.description is None:
+            # Let the type raise MissingDescriptionError.
+            self.emit(1, 'return dict({}(value))'.format(c))
+            return
+
+        # Anything that isn't a dict is rare, so use the type itself to get
+        # the exact same behavior for it.
+        self.emit(1, 'if not isinstance(value, dict):')
+        self.emit(2, 'return dict({}(value))'.format(c))
+        self.emit(1, 'out = dict(value)')
+        self.emit(1, 'for key in out:')
+        self.emit(2, 'if not isinstance(key, str):')
+        self.emit_raise(3, cls, 'invalid_key')
+        self.emit(1, 'errors = {}')
+
+        for key, child in cls.properties.items():
+            k = repr(key)
+            self.emit(1, 'if {} in out:'.format(k))
+            self.emit(2, 'item = out[{}]'.format(k))
+            self.emit(2, 'if not isinstance(item, {}):'.format(
+                self.constant(child)))
+            self.emit(3, 'try:')
+            self.emit(4, 'out[{}] = {}'.format(
+                k, self.caller(child).format('item')))
+            self.emit(3, 'except TypeSystemError as exc:')
+            self.emit(4, 'errors[{}] = exc.detail'.format(k))
+            if hasattr(child, 'default'):
+                # If a key is missing but has a default, then use that.
+                self.emit(1, 'else:')
+                self.emit(2, 'out[{}] = {}'.format(
+                    k, self.constant(child.default)))
+            elif key in cls.required:
+                self.emit(1, 'else:')
+                self.emit(2, "errors[{}] = TypeSystemError(cls={}, "
+                             "code='required').detail".format(k, c))
+
+        if not cls.additional_properties:
+            properties = list(cls.properties.keys())
+            self.emit(1, 'for key in out:')
+            self.emit(2, 'if key not in {}:'.format(
+                self.constant(frozenset(properties))))
+            self.emit(3, "errors[key] = TypeSystemError(cls={}, "
+                         "code='additional_properties').detail".format(c))
+
+        err = 'Required properties {} for property `{}` are missing.'
+        for prop, dependencies in cls.property_dependencies.items():
+            self.emit(1, 'if {} in out and not ({}):'.format(
+                repr(prop),
+                ' and '.join('{!r} in out'.format(dep)
+                             for dep in dependencies) or 'True'))
+            self.emit(2, 'raise TypeSystemError({})'.format(
+                repr(err.format(dependencies, prop))))
+
+        self.emit(1, 'if errors:')
+        self.emit(2, 'raise TypeSystemError(errors)')
+        if _has_custom_validate(cls):
+            self.emit(1, '{}.validate(out.copy())'.format(c))
+        self.emit(1, 'return out')
+
+    def _generate_array(self, cls):
+        c = self.constant(cls)
+        self._generate_header(cls, '[]')
+        # Anything that isn't a list or tuple is rare, so use the type itself
+        # to get the exact same behavior for it.
+        self.emit(1, 'if not isinstance(value, (list, tuple)):')
+        self.emit(2, 'return list({}(value))'.format(c))
+        self.emit(1, 'size = len(value)')
+
+        items = cls.items
+        if isinstance(items, list) and len(items) > 1:
+            self.emit(1, 'if size < {}:'.format(len(items)))
+            self.emit_raise(2, cls, 'min_items')
+            if not cls.additional_items:
+                self.emit(1, 'elif size > {}:'.format(len(items)))
+                self.emit_raise(2, cls, 'max_items')
+
+        self.emit(1, 'if size < {}:'.format(self.constant(cls.min_items)))
+        self.emit_raise(2, cls, 'min_items')
+        if cls.max_items is not None:
+            self.emit(1, 'elif size > {}:'.format(
+                self.constant(cls.max_items)))
+            self.emit_raise(2, cls, 'max_items')
+
+        self.emit(1, 'errors = {}')
+        self.emit(1, 'out = []')
+        if cls.unique_items:
+            self.emit(1, 'seen_items = set()')
+        self.emit(1, 'for pos, item in enumerate(value):')
+        self.emit(2, 'try:')
+        if isinstance(items, list):
+            for pos, item_type in enumerate(items):
+                self.emit(3, '{} pos == {}:'.format(
+                    'if' if pos == 0 else 'elif', pos))
+                self.emit(4, 'item = {}'.format(
+                    self.caller(item_type).format('item')))
+        elif items is not None:
+            self.emit(3, 'item = {}'.format(self.caller(items).format('item')))
+        if cls.unique_items:
+            self.emit(3, 'if item in seen_items:')
+            self.emit_raise(4, cls, 'unique_items')
+            self.emit(3, 'seen_items.add(item)')
+        self.emit(3, 'out.append(item)')
+        self.emit(2, 'except TypeSystemError as exc:')
+        self.emit(3, 'errors[pos] = exc.detail')
+        self.emit(1, 'if errors:')
+        self.emit(2, 'raise TypeSystemError(errors)')
+        if _has_custom_validate(cls):
+            self.emit(1, '{}.validate(list(value))'.format(c))
+        self.emit(1, 'return out')
+
+
+def generate_source(cls) -> str:
+    """Generates the python source of a validator for an object or array type.
+
+    This is mostly useful for debugging, :func:`compile_type` should be used
+    to get a validator.
+
+    :param cls: An :class:`~doctor.types.Object` or
+        :class:`~doctor.types.Array` type.
+    :returns: The source.
+    """
+    return _CodeGenerator(cls).generate()
+
+
+def compile_type(cls) -> Callable[[Any], Any]:
+    """Gets a generated validator for an object or array type.
+
+    The validator is generated the first time this is called for a type and
+    cached on the class, so changes made to the type afterwards are not
+    reflected in it.
+
+    :param cls: An :class:`~doctor.types.Object` or
+        :class:`~doctor.types.Array` type.
+    :returns: A callable that accepts a value and returns the validated value
+        as a dict or list.  It raises a :class:`~doctor.errors.TypeSystemError`
+        if the value is invalid.
+    """
+    if not (isinstance(cls, type) and issubclass(cls, (Object, Array))):
+        raise TypeError('Only Object and Array types can be compiled, '
+                        'got {!r}.'.format(cls))
+    validator = cls.__dict__.get(COMPILED_VALIDATOR_ATTR)
+    # The attribute may have been copied from another type, e.g. by
+    # :func:`~doctor.types.new_type`.
+    if validator is not None and validator.doctor_type is cls:
+        return validator
+
+    generator = _CodeGenerator(cls)
+    source = generator.generate()
+    namespace = generator.namespace
+    filename = '<doctor validator for {}>'.format(cls.__qualname__)
+    exec(compile(source, filename, 'exec'), namespace)
+    validator = namespace['_validate_0']
+    validator.doctor_type = cls
+    validator.source = source
+    setattr(cls, COMPILED_VALIDATOR_ATTR, validator)
+    return validator
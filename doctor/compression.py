@@ -0,0 +1,143 @@
+"""
+Compression of response bodies.
+
+Routes created with a :class:`Compression` compress JSON response bodies
+that are at least `min_size` bytes with the best encoding the client accepts
+in its `Accept-Encoding` header.  gzip is always available, and brotli (`br`)
+is used if the `brotli` package is installed.
+"""
+import gzip
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+
+#: The encodings in the order they are preferred when a client accepts more
+#: than one with the same quality.
+DEFAULT_ENCODINGS = ('br', 'gzip')
+
+
+class Compression(NamedTuple):
+    """How the responses of a route are compressed.
+
+    :param min_size: Bodies smaller than this many bytes aren't compressed.
+    :param encodings: The encodings to use, most preferred first.  Encodings
+        that aren't available are skipped.
+    :param gzip_level: The gzip compression level, from 0 to 9.
+    :param brotli_quality: The brotli quality, from 0 to 11.
+    """
+    min_size: int = 1024
+    encodings: Tuple[str, ...] = DEFAULT_ENCODINGS
+    gzip_level: int = 6
+    brotli_quality: int = 4
+
+
+def _gzip(body: bytes, compression: Compression) -> bytes:
+    return gzip.compress(body, compresslevel=compression.gzip_level)
+
+
+def _brotli() -> Optional[Callable[[bytes, Compression], bytes]]:
+    try:
+        import brotli
+    except ImportError:
+        return None
+
+    def compress(body: bytes, compression: Compression) -> bytes:
+        return brotli.compress(body, quality=compression.brotli_quality)
+    return compress
+
+
+#: Maps encodings to a function that compresses a body, or None if the
+#: encoding isn't available.
+_compressors: Dict[str, Optional[Callable[[bytes, Compression], bytes]]] = {
+    'br': _brotli(),
+    'gzip': _gzip,
+}
+
+
+def get_available_encodings() -> Tuple[str, ...]:
+    """Returns the encodings that can be used."""
+    return tuple(name for name, compress in _compressors.items()
+                 if compress is not None)
+
+
+def parse_accept_encoding(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Parses an `Accept-Encoding` header.
+
+    :param accept_encoding: The value of the header.
+    :returns: A dict of lowercase encoding to quality.
+    """
+    qualities = {}
+    for item in (accept_encoding or '').split(','):
+        encoding, _, params = item.partition(';')
+        encoding = encoding.strip().lower()
+        if not encoding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[encoding] = quality
+    return qualities
+
+
+def choose_encoding(accept_encoding: Optional[str],
+                    compression: Compression) -> Optional[str]:
+    """Chooses the encoding of a response.
+
+    :param accept_encoding: The value of the request's `Accept-Encoding`
+        header.
+    :param compression: The compression of the route.
+    :returns: The available encoding with the highest quality, preferring
+        encodings listed first in the compression, or None if the client
+        doesn't accept any of them.
+    """
+    qualities = parse_accept_encoding(accept_encoding)
+    default = qualities.get('*', 0.0)
+    best = None
+    best_quality = 0.0
+    for encoding in compression.encodings:
+        if _compressors.get(encoding) is None:
+            continue
+        quality = qualities.get(encoding, default)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_body(body: bytes, status_code: int, headers: Dict[str, str],
+                  accept_encoding: Optional[str],
+                  compression: Compression) -> bytes:
+    """Compresses a response body if the client accepts it.
+
+    `Vary: Accept-Encoding` is added to the headers, and `Content-Encoding`
+    if the body is compressed.  Bodies that are empty, smaller than the
+    minimum size or already have a `Content-Encoding` aren't compressed.
+
+    :param body: The encoded response body.
+    :param status_code: The HTTP status code.
+    :param headers: The response headers.  They are updated in place.
+    :param accept_encoding: The value of the request's `Accept-Encoding`
+        header.
+    :param compression: The compression of the route.
+    :returns: The body.
+    """
+    if status_code in (204, 304):
+        return body
+    lower_headers = {key.lower(): key for key in headers}
+    if 'content-encoding' in lower_headers:
+        return body
+    vary_key = lower_headers.get('vary')
+    if vary_key is None:
+        headers['Vary'] = 'Accept-Encoding'
+    elif 'accept-encoding' not in headers[vary_key].lower():
+        headers[vary_key] = '{}, Accept-Encoding'.format(headers[vary_key])
+    if len(body) < compression.min_size:
+        return body
+    encoding = choose_encoding(accept_encoding, compression)
+    if encoding is None:
+        return body
+    headers['Content-Encoding'] = encoding
+    return _compressors[encoding](body, compression)
@@ -2,3 +2,10 @@
 #: methods are allowed to have a body, but some like GET/DELETE have no
 #: contextual meaning server side, so should not be used.
 HTTP_METHODS_WITH_JSON_BODY = ('PATCH', 'POST', 'PUT')
+
+#: The default status code of a successful response for HTTP methods that
+#: don't return a 200.
+STATUS_CODE_MAP = {
+    'POST': 201,
+    'DELETE': 204,
+}
@@ -2,10 +2,13 @@
 
 from __future__ import absolute_import
 
+import hashlib
+import inspect
 import json
 import pipes
 import re
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from inspect import Parameter, Signature
 from typing import Any, Dict, List
 from typing_inspect import get_origin
@@ -549,6 +552,26 @@ class BaseDirective(Directive):
         finally:
             self.harness.teardown_request(self, route, handler, annotation)
 
+    def _make_examples(self, examples):
+        """Makes the example requests of many annotations.
+
+        The requests are made by a pool of `max_workers` threads of the
+        harness, or one at a time if it's 1.  The setup and teardown request
+        hooks are called around each request in the thread that makes it.
+
+        :param list examples: A list of (route, handler, annotation) tuples.
+        :returns: A list with the example lines of each annotation, in the
+            same order.
+        :raises SphinxError: If an example request failed.  If more than one
+            failed, the error is for the first one in the list.
+        """
+        max_workers = self.harness.max_workers
+        if max_workers <= 1 or len(examples) <= 1:
+            return [self._make_example(*example) for example in examples]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(
+                lambda example: self._make_example(*example), examples))
+
     def _prepare_env(self):  # pragma: no cover
         """Setup the document's environment, if necessary."""
         env = self.state.document.settings.env
@@ -559,12 +582,71 @@ class BaseDirective(Directive):
             setattr(env, self.directive_name, state)
         else:
             state = getattr(env, self.directive_name)
+            if not hasattr(state, 'fingerprints'):
+                state.fingerprints = {}
         return env, state
 
     def _render_rst(self):  # pragma: no cover
         """Render lines of reStructuredText for items yielded by
         :meth:`~doctor.docs.base.BaseHarness.iter_annotations`.
         """
+        return self._iter_rst(self._make_examples)
+
+    @classmethod
+    def _get_example_fingerprints(cls, examples):
+        """Gets lines that identify the example requests of annotations.
+
+        This is used in place of :meth:`_make_examples` to fingerprint the
+        documentation without making the requests.  The lines contain the
+        route, the example values and headers of the request, and a hash of
+        the source of the logic function.
+
+        :param list examples: A list of (route, handler, annotation) tuples.
+        :returns: A list with the lines of each annotation, in the same order.
+        """
+        example_lines = []
+        for route, handler, annotation in examples:
+            try:
+                source = inspect.getsource(annotation.logic)
+            except (OSError, TypeError):
+                source = ''
+            example_lines.append([
+                str(route),
+                json.dumps(cls.harness._get_example_values(route, annotation),
+                           sort_keys=True, default=str),
+                json.dumps(cls.harness._get_headers(str(route), annotation),
+                           sort_keys=True, default=str),
+                hashlib.sha256(source.encode('utf-8')).hexdigest(),
+            ])
+        return example_lines
+
+    @classmethod
+    def get_fingerprint(cls):
+        """Returns a fingerprint of the documentation generated by the
+        directive.
+
+        It's a hash of the documentation without the example responses, the
+        example values and headers of the requests and the source of each
+        logic function, so it changes when a route, a type, a logic function
+        or an example of the harness changes.
+
+        :returns: The fingerprint as a hex string.
+        """
+        fingerprint = hashlib.sha256()
+        for line in cls._iter_rst(cls._get_example_fingerprints):
+            fingerprint.update(line.encode('utf-8'))
+            fingerprint.update(b'\n')
+        return fingerprint.hexdigest()
+
+    @classmethod
+    def _iter_rst(cls, make_examples):
+        """Yields lines of reStructuredText for items yielded by
+        :meth:`~doctor.docs.base.BaseHarness.iter_annotations`.
+
+        :param make_examples: A callable that takes a list of
+            (route, handler, annotation) tuples and returns a list with the
+            example lines of each, like :meth:`_make_examples`.
+        """
         # Create a mapping of headers to annotations.  We want to group
         # all annotations by a header, but they could be in multiple handlers
         # so we create a map of them here with the heading as the key and
@@ -572,7 +654,7 @@ class BaseDirective(Directive):
         # sort them alphabetically to make reading the api docs easier.
         heading_to_annotations_map = defaultdict(list)
         for heading, route, handler, annotations in (
-                self.harness.iter_annotations()):
+                cls.harness.iter_annotations()):
             # Set the route and handler as attributes so we can retrieve them
             # when we loop through them all below.
             for annotation in annotations:
@@ -582,11 +664,23 @@ class BaseDirective(Directive):
 
         headings = list(heading_to_annotations_map.keys())
         headings.sort()
+        for heading in headings:
+            # Sort all the annotations by title.
+            heading_to_annotations_map[heading].sort(key=lambda a: a.title)
+
+        # Make the example requests up front, since they can be made
+        # concurrently, and map them back to their annotations.
+        examples = [(annotation.route, annotation.handler, annotation)
+                    for heading in headings
+                    for annotation in heading_to_annotations_map[heading]]
+        example_lines = make_examples(examples)
+        annotation_to_example_lines = {
+            id(annotation): lines
+            for (_, _, annotation), lines in zip(examples, example_lines)}
+
         previous_heading = None
         for heading in headings:
             annotations = heading_to_annotations_map.get(heading)
-            # Sort all the annotations by title.
-            annotations.sort(key=lambda a: a.title)
             # Only emit a new heading if the resource has changed.  This
             # esnures that documented endpoints for the same resource all
             # end up under a single heading.
@@ -596,7 +690,6 @@ class BaseDirective(Directive):
             for annotation in annotations:
                 route = annotation.route
                 normalized_route = normalize_route(route)
-                handler = annotation.handler
                 # Adds a title for the endpoint.
                 if annotation.title is not None:
                     yield annotation.title
@@ -617,11 +710,11 @@ class BaseDirective(Directive):
                 )
 
                 # Document any request headers.
-                defined_headers = list(self.harness._get_headers(
+                defined_headers = list(cls.harness._get_headers(
                     str(route), annotation).keys())
                 defined_headers.sort()
                 for header in defined_headers:
-                    definition = self.harness.header_definitions.get(
+                    definition = cls.harness.header_definitions.get(
                         header, '').strip()
                     docstring.append(':reqheader {}: {}'.format(
                         header, definition))
@@ -631,7 +724,7 @@ class BaseDirective(Directive):
                     docstring.extend(get_json_lines(
                         annotation, field='>json', route=normalized_route))
 
-                docstring.extend(self._make_example(route, handler, annotation))
+                docstring.extend(annotation_to_example_lines[id(annotation)])
                 for line in http_directive(annotation.http_method,
                                            normalized_route, docstring):
                     yield line
@@ -662,32 +755,28 @@ class BaseDirective(Directive):
             else:
                 result.append(line, directive_name)
         nested_parse_with_titles(self.state, result, node)
+        state.fingerprints[env.docname] = self.get_fingerprint()
         return node.children
 
     @classmethod
-    def get_outdated_docs(
-            cls, app, env, added, changed, removed):  # pragma: no cover
+    def get_outdated_docs(cls, app, env, added, changed, removed):
         """Handler for Sphinx's env-get-outdated event.
 
         This handler gives a Sphinx extension a chance to indicate that some
-        set of documents are out of date and need to be re-rendered. The
-        implementation here is stupid, for now, and always says that anything
-        that uses the directive needs to be re-rendered.
-
-        We should make it smarter, at some point, and have it figure out which
-        modules are used by the associated handlers, and whether they have
-        actually been updated since the last time the given document was
-        rendered.
+        set of documents are out of date and need to be re-rendered.  A
+        document that uses the directive is out of date if the fingerprint
+        recorded when it was rendered doesn't match the current one.
+
+        :see: :meth:`get_fingerprint`
         """
         state = getattr(env, cls.directive_name, None)
-        if state and state.doc_names:
-            # This is stupid for now, and always says everything that uses
-            # this autodoc generation needs to be updated. We should make this
-            # smarter at some point and actually figure out what modules are
-            # touched, and whether they have been changed.
-            return sorted(state.doc_names)
-        else:
+        if not state or not state.doc_names:
             return []
+        # Environments pickled by older versions don't have fingerprints.
+        fingerprints = getattr(state, 'fingerprints', {})
+        fingerprint = cls.get_fingerprint()
+        return sorted(doc_name for doc_name in state.doc_names
+                      if fingerprints.get(doc_name) != fingerprint)
 
     @classmethod
     def purge_docs(cls, app, env, docname):  # pragma: no cover
@@ -706,6 +795,7 @@ class BaseDirective(Directive):
         state = getattr(env, cls.directive_name, None)
         if state and docname in state.doc_names:
             state.doc_names.remove(docname)
+            getattr(state, 'fingerprints', {}).pop(docname, None)
 
     @classmethod
     def run_setup(cls, app):  # pragma: no cover
@@ -745,10 +835,13 @@ class BaseHarness(object):
     appropriate times, so the app can bootstrap a mock version of itself.
     """
 
-    def __init__(self, url_prefix):
+    def __init__(self, url_prefix, max_workers=1):
         super(BaseHarness, self).__init__()
         self.defined_example_values = {}
         self.url_prefix = url_prefix.rstrip('/')
+        #: The number of threads that make example requests.  If it's more
+        #: than 1, :meth:`request` and the request hooks must be thread safe.
+        self.max_workers = max_workers
         #: Stores headers for particular methods and routes.
         self.defined_header_values = {}
         #: Stores global headers to use on all requests
@@ -976,3 +1069,6 @@ class DirectiveState(object):
     def __init__(self):  # pragma: no cover
         super(DirectiveState, self).__init__()
         self.doc_names = set()
+        #: A dict of document name to the fingerprint of the documentation
+        #: when the document was rendered.
+        self.fingerprints = {}
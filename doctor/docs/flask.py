@@ -8,6 +8,7 @@ validation don't need to include Sphinx in their runtime dependencies.
 from __future__ import absolute_import
 
 import json
+import threading
 from collections import defaultdict
 from urllib import parse
 
@@ -25,16 +26,29 @@ class AutoFlaskDirective(BaseDirective):
 
 class AutoFlaskHarness(BaseHarness):
 
-    def __init__(self, app_module_filename, url_prefix):
-        super(AutoFlaskHarness, self).__init__(url_prefix)
+    def __init__(self, app_module_filename, url_prefix, max_workers=1):
+        super(AutoFlaskHarness, self).__init__(url_prefix, max_workers)
         self.app_module_filename = app_module_filename
 
     def __getstate__(self):  # pragma: no cover
         state = self.__dict__.copy()
         del state['app']
         del state['test_client']
+        del state['_test_clients']
         return state
 
+    def get_test_client(self):
+        """Returns the test client of the current thread.
+
+        Threads that make example requests each get their own test client.
+        The thread that set up the app uses :attr:`test_client`.
+        """
+        test_client = getattr(self._test_clients, 'test_client', None)
+        if test_client is None:
+            test_client = self.app.test_client()
+            self._test_clients.test_client = test_client
+        return test_client
+
     def __setstate__(self, state):  # pragma: no cover
         self.__dict__.update(state)
 
@@ -121,7 +135,7 @@ class AutoFlaskHarness(BaseHarness):
         else:
             params = {}
         method_name = annotation.http_method.lower()
-        method = getattr(self.test_client, method_name)
+        method = getattr(self.get_test_client(), method_name)
         if method_name in ('post', 'put'):
             response = method(path, data=json.dumps(params), headers=headers,
                               content_type='application/json')
@@ -137,6 +151,8 @@ class AutoFlaskHarness(BaseHarness):
     def setup_app(self, sphinx_app):
         self.app = get_module_attr(self.app_module_filename, 'app', {})
         self.test_client = self.app.test_client()
+        self._test_clients = threading.local()
+        self._test_clients.test_client = self.test_client
 
 
 def setup(app):  # pragma: no cover
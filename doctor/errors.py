@@ -1,4 +1,7 @@
-from typing import Union
+import functools
+import re
+import string
+from typing import Tuple, Union
 
 
 class DoctorError(ValueError):
@@ -59,6 +62,14 @@ class ParseError(DoctorError):
     pass
 
 
+class PayloadTooLargeError(DoctorError):
+    """Raised when a request body exceeds the configured limits.
+
+    Corresponds to a HTTP 413 Payload Too Large error.
+    """
+    pass
+
+
 class SchemaError(DoctorError):
     """Raised for errors in a schema."""
     pass
@@ -77,6 +88,16 @@ class SchemaValidationError(DoctorError):
         self.errors = errors
 
 
+@functools.lru_cache(maxsize=None)
+def _get_template_fields(template: str) -> Tuple[str, ...]:
+    """Gets the names of the class attributes an error template uses."""
+    fields = set()
+    for _, field, _, _ in string.Formatter().parse(template):
+        if field:
+            fields.add(re.split(r'[.\[]', field, 1)[0])
+    return tuple(fields)
+
+
 class TypeSystemError(DoctorError):
     """An error that represents an invalid value for a type.
 
@@ -84,6 +105,10 @@ class TypeSystemError(DoctorError):
     https://github.com/encode/apistar/blob/
     50dd15f0878f0a7c50ce829a72adb276782bcb78/apistar/exceptions.py#L4-L15
 
+    Errors created from a `cls` and `code` render the message of the code
+    when :attr:`detail` or the error's str are first accessed, so errors
+    that are caught and discarded don't format messages.
+
     :param detail: Detail about the error.
     :param cls: The class type that was being instantiated.
     :param code: The error code.
@@ -95,17 +120,52 @@ class TypeSystemError(DoctorError):
                  cls: type = None,
                  code: str = None,
                  errors: dict = None) -> None:
+        # DoctorError.__init__ isn't called because it needs the message.
+        self._detail = detail
+        self._rendered = cls is None or code is None
+        self.cls = cls
+        self.code = code
+        self.errors = errors
 
-        if cls is not None and code is not None:
-            cls_errors = getattr(cls, 'errors')
-            detail = cls_errors[code].format(**cls.__dict__)
-
-        self.detail = detail
-        if errors and len(errors) == 1:
-            param = list(errors.keys())[0]
-            msg = list(errors.values())[0]
-            detail = '{} - {}'.format(param, msg)
-        super().__init__(detail, errors=errors)
+    @property
+    def detail(self) -> Union[str, dict]:
+        """Detail about the error."""
+        if not self._rendered:
+            template = self.cls.errors[self.code]
+            self._detail = template.format(**{
+                field: getattr(self.cls, field)
+                for field in _get_template_fields(template)})
+            self._rendered = True
+        return self._detail
+
+    @detail.setter
+    def detail(self, detail: Union[str, dict]):
+        self._detail = detail
+        self._rendered = True
+
+    @property
+    def message(self) -> Union[str, dict]:
+        """The message of the error.
+
+        This is the detail, or `<param> - <error>` if there is exactly one
+        error in :attr:`errors`.
+        """
+        if self.errors and len(self.errors) == 1:
+            param, msg = next(iter(self.errors.items()))
+            return '{} - {}'.format(param, msg)
+        return self.detail
+
+    @property
+    def args(self) -> tuple:
+        return (self.message,)
+
+    def __reduce__(self):
+        # Types created by the factories can't be pickled, so the error is
+        # pickled with its rendered detail instead of its class and code.
+        return type(self), (self.detail, None, None, self.errors)
+
+    def __str__(self) -> str:
+        return str(self.message)
 
 
 class UnauthorizedError(DoctorError):
@@ -0,0 +1,95 @@
+"""
+ETags and conditional GET requests.
+
+When the `etag` option is set on a GET http method, successful responses
+get an `ETag` header.  If a request's `If-None-Match` header matches it, a
+`304 Not Modified` response with an empty body is returned instead.
+
+By default the ETag is a hash of the response encoded as JSON, so the logic
+function is still called.  The option can also be a callable that takes the
+same params as the logic function and returns a version token, e.g. the
+modification time of a row.  The ETag is made from the token, and the logic
+function isn't called if it matches.  The callable is called synchronously,
+also for ASGI routes, so it can't be an `async def` function.
+
+ETags are weak, since equal responses may be encoded differently by
+different JSON backends.
+"""
+import hashlib
+import inspect
+from typing import Any, Callable, Optional, Union
+
+from . import json_backend
+
+
+#: The value of the `etag` option of an http method.  Either True to hash
+#: responses, or a callable that returns a version token.
+ETagOption = Union[bool, Callable[..., Any]]
+
+
+def _make_etag(value: bytes) -> str:
+    return 'W/"{}"'.format(hashlib.blake2b(value, digest_size=16).hexdigest())
+
+
+def compute_etag(content: Any) -> str:
+    """Computes the ETag of response content.
+
+    :param content: The response content.
+    :returns: A weak ETag of the content encoded as JSON.
+    """
+    return _make_etag(json_backend.dumps(content).encode('utf-8'))
+
+
+def get_version_etag(token: Any) -> str:
+    """Gets the ETag of a version token.
+
+    :param token: A version token returned by an `etag` callable.
+    :returns: A weak ETag of the token.
+    """
+    if not isinstance(token, bytes):
+        token = str(token).encode('utf-8')
+    return _make_etag(b'version:' + token)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Checks if an `If-None-Match` header matches an ETag.
+
+    ETags are compared with the weak comparison function, so `W/"a"`
+    matches `"a"`.
+
+    :param if_none_match: The value of the `If-None-Match` header.
+    :param etag: The ETag of the response.
+    :returns: True if the header matches the ETag.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque_tag = _strip_weak(etag)
+    return any(_strip_weak(tag.strip()) == opaque_tag
+               for tag in if_none_match.split(','))
+
+
+def _strip_weak(etag: str) -> str:
+    if etag.startswith('W/'):
+        return etag[2:]
+    return etag
+
+
+def check_etag(method: str, etag: ETagOption):
+    """Checks that the `etag` option can be used for an http method.
+
+    :param method: The http method, e.g. `get`.
+    :param etag: The `etag` option.
+    :raises ValueError: If the method isn't GET, or the option isn't a bool
+        or a callable, or is an `async def` function.
+    """
+    if not (isinstance(etag, bool) or callable(etag)):
+        raise ValueError('etag must be a bool or a callable that returns a '
+                         'version token.')
+    if inspect.iscoroutinefunction(etag):
+        raise ValueError('etag must not be an async def function, since the '
+                         'version token is computed before the logic '
+                         'function is called and is never awaited.')
+    if etag and method.lower() != 'get':
+        raise ValueError('ETags are only supported for GET requests.')
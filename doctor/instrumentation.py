@@ -0,0 +1,193 @@
+"""
+Timing instrumentation for requests.
+
+Every request handled by :mod:`doctor.pipeline` is split into phases, and the
+time spent in each phase is passed to the active :class:`Instrumentation`
+along with the route and HTTP method of the request.  The default
+instrumentation does nothing, and requests aren't timed while it is active.
+"""
+import bisect
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+#: Reading the request params from the JSON body or the query string and
+#: coercing query string values.
+PHASE_PARSE = 'parse'
+#: Checking that the required params are present.
+PHASE_REQUIRED = 'required'
+#: Validating the params and coercing them to their native types.
+PHASE_VALIDATE = 'validate'
+#: Calling the logic function.
+PHASE_LOGIC = 'logic'
+#: Validating the response of the logic function.
+PHASE_RESPONSE_VALIDATION = 'response_validation'
+#: Building the result from the response of the logic function.
+PHASE_RESPONSE = 'response'
+
+PHASES = (PHASE_PARSE, PHASE_REQUIRED, PHASE_VALIDATE, PHASE_LOGIC,
+          PHASE_RESPONSE_VALIDATION, PHASE_RESPONSE)
+
+
+class PhaseTimer(object):
+    """Measures the duration of consecutive phases of a request.
+
+    Each call to :meth:`mark` records the time since the previous call, or
+    since the timer was created, as the duration of a phase.
+    """
+    __slots__ = ('timings', '_last')
+
+    def __init__(self):
+        #: A dict of phase name to duration in seconds.
+        self.timings: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def mark(self, phase: str):
+        """Records the end of a phase.
+
+        :param phase: The name of the phase.
+        """
+        now = time.perf_counter()
+        self.timings[phase] = now - self._last
+        self._last = now
+
+
+class Instrumentation(object):
+    """Receives the phase timings of requests.
+
+    Subclass this and override :meth:`record` to collect the timings.  The
+    base class does nothing.
+    """
+
+    def record(self, route: str, method: str, timings: Dict[str, float]):
+        """Records the timings of a request.
+
+        Requests that fail only have timings for the phases that completed.
+
+        :param route: The route of the request, e.g. `/foo/<int:foo_id>/`, or
+            the request path if the logic function isn't part of a route.
+        :param method: The HTTP method of the request.
+        :param timings: A dict of phase name to duration in seconds.
+        """
+        pass
+
+
+class Histogram(NamedTuple):
+    """A histogram of durations.
+
+    :param buckets: The upper bounds of the buckets in seconds.
+    :param counts: The number of durations in each bucket.  There is one
+        more count than buckets for durations larger than the last bucket.
+    :param count: The number of durations.
+    :param total: The sum of the durations.
+    :param min: The smallest duration.
+    :param max: The largest duration.
+    """
+    buckets: Tuple[float, ...]
+    counts: Tuple[int, ...]
+    count: int
+    total: float
+    min: float
+    max: float
+
+    @property
+    def mean(self) -> float:
+        """The mean duration."""
+        return self.total / self.count if self.count else 0.0
+
+
+#: The default upper bounds of histogram buckets, in seconds.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HistogramKey = Tuple[str, str, str]
+
+
+class HistogramCollector(Instrumentation):
+    """Collects the timings of requests into in-memory histograms.
+
+    A histogram is kept for each route, method and phase, and for the total
+    time of each route and method under the phase `total`.
+
+    :param buckets: The upper bounds of the histogram buckets in seconds.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._histograms: Dict[HistogramKey, List] = {}
+
+    def record(self, route: str, method: str, timings: Dict[str, float]):
+        with self._lock:
+            for phase, duration in timings.items():
+                self._add((route, method, phase), duration)
+            self._add((route, method, 'total'), sum(timings.values()))
+
+    def _add(self, key: HistogramKey, duration: float):
+        data = self._histograms.get(key)
+        if data is None:
+            # counts, count, total, min, max
+            data = [[0] * (len(self.buckets) + 1), 0, 0.0, duration, duration]
+            self._histograms[key] = data
+        data[0][bisect.bisect_left(self.buckets, duration)] += 1
+        data[1] += 1
+        data[2] += duration
+        if duration < data[3]:
+            data[3] = duration
+        if duration > data[4]:
+            data[4] = duration
+
+    def get(self, route: str, method: str,
+            phase: str = 'total') -> Optional[Histogram]:
+        """Gets a histogram.
+
+        :param route: The route.
+        :param method: The HTTP method.
+        :param phase: The phase, or `total` for the total time.
+        :returns: The histogram, or None if nothing was recorded for it.
+        """
+        with self._lock:
+            data = self._histograms.get((route, method, phase))
+            if data is None:
+                return None
+            return self._to_histogram(data)
+
+    def snapshot(self) -> Dict[HistogramKey, Histogram]:
+        """Returns all histograms keyed by (route, method, phase)."""
+        with self._lock:
+            return {key: self._to_histogram(data)
+                    for key, data in self._histograms.items()}
+
+    def reset(self):
+        """Removes all histograms."""
+        with self._lock:
+            self._histograms.clear()
+
+    def _to_histogram(self, data: List) -> Histogram:
+        counts, count, total, min_, max_ = data
+        return Histogram(self.buckets, tuple(counts), count, total, min_,
+                         max_)
+
+
+#: The default instrumentation, which does nothing.
+NOOP_INSTRUMENTATION = Instrumentation()
+
+_instrumentation = NOOP_INSTRUMENTATION
+
+
+def set_instrumentation(instrumentation: Optional[Instrumentation]):
+    """Sets the instrumentation that receives the timings of requests.
+
+    :param instrumentation: The instrumentation, or None to stop timing
+        requests.
+    """
+    global _instrumentation
+    if instrumentation is None:
+        instrumentation = NOOP_INSTRUMENTATION
+    _instrumentation = instrumentation
+
+
+def get_instrumentation() -> Instrumentation:
+    """Returns the active instrumentation."""
+    return _instrumentation
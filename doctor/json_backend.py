@@ -0,0 +1,130 @@
+"""
+A registry of JSON backends.
+
+Doctor parses JSON in params and request bodies and encodes JSON responses
+with the active backend.  `simplejson` is used by default.  The stdlib
+`json` module, `orjson` and `ujson` are also registered, and other backends
+can be added with :func:`register_backend`.
+
+The backend can be selected with :func:`set_backend` or by setting the
+`DOCTOR_JSON_BACKEND` environment variable to the name of a backend.
+"""
+import os
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+
+
+#: The name of the backend that is used if none is selected.
+DEFAULT_BACKEND = 'simplejson'
+
+
+class JSONBackend(NamedTuple):
+    """A JSON backend.
+
+    :param name: The name the backend is registered under.
+    :param loads: A callable that parses a JSON str or bytes value.  It
+        should raise a ValueError if the value isn't valid JSON.
+    :param dumps: A callable that encodes a value as a JSON str.
+    """
+    name: str
+    loads: Callable[[Union[str, bytes]], Any]
+    dumps: Callable[[Any], str]
+
+
+def _simplejson() -> JSONBackend:
+    import simplejson
+    return JSONBackend('simplejson', simplejson.loads, simplejson.dumps)
+
+
+def _stdlib_json() -> JSONBackend:
+    import json
+    return JSONBackend('json', json.loads, json.dumps)
+
+
+def _orjson() -> JSONBackend:
+    import orjson
+
+    def dumps(value: Any) -> str:
+        return orjson.dumps(value).decode('utf-8')
+    return JSONBackend('orjson', orjson.loads, dumps)
+
+
+def _ujson() -> JSONBackend:
+    import ujson
+    return JSONBackend('ujson', ujson.loads, ujson.dumps)
+
+
+#: Maps backend names to functions that create the backend.  Backends are
+#: created when they are selected so optional dependencies are only
+#: imported if they are used.
+_backend_factories: Dict[str, Callable[[], JSONBackend]] = {
+    'json': _stdlib_json,
+    'orjson': _orjson,
+    'simplejson': _simplejson,
+    'ujson': _ujson,
+}
+
+_backend: Optional[JSONBackend] = None
+
+
+def register_backend(name: str, factory: Callable[[], JSONBackend]):
+    """Registers a JSON backend.
+
+    :param name: The name of the backend.  An existing backend with the same
+        name is replaced.
+    :param factory: A callable that returns a :class:`JSONBackend`.  It is
+        only called when the backend is selected.
+    """
+    _backend_factories[name] = factory
+
+
+def set_backend(name: str) -> JSONBackend:
+    """Selects the JSON backend to use.
+
+    :param name: The name of a registered backend.
+    :returns: The selected backend.
+    :raises ValueError: If no backend is registered with the name.
+    :raises ImportError: If the backend's package isn't installed.
+    """
+    global _backend
+    try:
+        factory = _backend_factories[name]
+    except KeyError:
+        raise ValueError(
+            'Unknown JSON backend {!r}.  Must be one of: {}'.format(
+                name, ', '.join(sorted(_backend_factories))))
+    _backend = factory()
+    return _backend
+
+
+def get_backend() -> JSONBackend:
+    """Returns the active JSON backend.
+
+    If no backend has been selected, the backend named by the
+    `DOCTOR_JSON_BACKEND` environment variable is selected, falling back to
+    :data:`DEFAULT_BACKEND`.
+
+    :returns: The active backend.
+    """
+    if _backend is None:
+        return set_backend(
+            os.environ.get('DOCTOR_JSON_BACKEND') or DEFAULT_BACKEND)
+    return _backend
+
+
+def loads(value: Union[str, bytes]) -> Any:
+    """Parses a JSON value with the active backend.
+
+    :param value: The JSON str or bytes.
+    :returns: The parsed value.
+    :raises ValueError: If the value isn't valid JSON.
+    """
+    return (_backend or get_backend()).loads(value)
+
+
+def dumps(value: Any) -> str:
+    """Encodes a value as JSON with the active backend.
+
+    :param value: The value to encode.
+    :returns: The JSON str.
+    """
+    return (_backend or get_backend()).dumps(value)
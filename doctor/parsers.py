@@ -5,11 +5,12 @@ their appropriate JSON schema types.
 
 import inspect
 import logging
+import threading
 import warnings
-from typing import List
-
-import simplejson as json
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, NamedTuple, Optional
 
+from doctor import json_backend
 from doctor.errors import ParseError, TypeSystemError
 
 
@@ -30,7 +31,7 @@ def _parse_array(value):
     value = value.lstrip()
     if not value or value[0] not in _bracket_strings:
         return None
-    return json.loads(value)
+    return json_backend.loads(value)
 
 
 def _parse_boolean(value):
@@ -59,7 +60,7 @@ def _parse_object(value):
     value = value.lstrip()
     if not value or value[0] not in _brace_strings:
         return None
-    return json.loads(value)
+    return json_backend.loads(value)
 
 
 def _parse_string(value):
@@ -148,15 +149,15 @@ def parse_value(value, allowed_types, name='value'):
 def parse_json(value: str, sig_params: List[inspect.Parameter] = None) -> dict:
     """Parse a value as JSON.
 
-    This is just a wrapper around json.loads which re-raises any errors as a
-    ParseError instead.
+    This is just a wrapper around :func:`doctor.json_backend.loads` which
+    re-raises any errors as a ParseError instead.
 
     :param str value: JSON string.
     :param dict sig_params: The logic function's signature parameters.
     :returns: the parsed JSON value
     """
     try:
-        loaded = json.loads(value)
+        loaded = json_backend.loads(value)
     except Exception as e:
         message = 'Error parsing JSON: %r error: %s' % (value, e)
         logging.debug(message, exc_info=e)
@@ -210,6 +211,184 @@ def map_param_names(
     return new_request_params
 
 
+class CacheInfo(NamedTuple):
+    """Statistics of a :class:`CoercionCache`.
+
+    :param hits: The number of lookups that found a value.
+    :param misses: The number of lookups that didn't find a value.
+    :param maxsize: The maximum number of values the cache holds.
+    :param currsize: The number of values in the cache.
+    """
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+#: Returned by :meth:`CoercionCache.get` if a key isn't cached.
+_MISSING = object()
+
+#: Coerced values of these types are safe to share between requests.  Arrays
+#: and objects are mutable, so they are never cached.
+_CACHEABLE_TYPES = (bool, int, float, str, type(None))
+
+
+class CoercionCache(object):
+    """A thread safe, bounded LRU cache of coerced request param values.
+
+    :param maxsize: The maximum number of values to cache.  The least
+        recently used value is evicted when it is full.
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize < 1:
+            raise ValueError('maxsize must be greater than 0.')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._values = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        """Gets a cached value and marks it as recently used.
+
+        :param key: The cache key.
+        :returns: The value, or `_MISSING` if it isn't cached.
+        """
+        with self._lock:
+            try:
+                value = self._values[key]
+            except KeyError:
+                self.misses += 1
+                return _MISSING
+            self._values.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Caches a value, evicting the least recently used if full.
+
+        :param key: The cache key.
+        :param value: The value.
+        """
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            if len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+    def clear(self):
+        """Removes all values and resets the statistics."""
+        with self._lock:
+            self._values.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Returns the statistics of the cache."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize,
+                             len(self._values))
+
+
+_coercion_cache: Optional[CoercionCache] = None
+
+
+def set_coercion_cache_size(maxsize: Optional[int]):
+    """Enables, resizes or disables caching of coerced request params.
+
+    Form and query string params that are coerced to a boolean, number,
+    string or null are cached by the param's type and raw value, so values
+    repeated across requests, like page sizes, flags and enum filters, are
+    only parsed once.  Params of types with a custom parser aren't cached.
+
+    The cache is disabled by default.
+
+    :param maxsize: The maximum number of values to cache.  If None or 0 the
+        cache is disabled.  Any existing cache is discarded.
+    """
+    global _coercion_cache
+    if maxsize:
+        _coercion_cache = CoercionCache(maxsize)
+    else:
+        _coercion_cache = None
+
+
+def get_coercion_cache_info() -> Optional[CacheInfo]:
+    """Returns the statistics of the coercion cache.
+
+    :returns: The statistics, or None if the cache is disabled.
+    """
+    if _coercion_cache is None:
+        return None
+    return _coercion_cache.info()
+
+
+def get_param_coercer(annotation) -> Optional[Callable]:
+    """Returns a callable that coerces a request param string for a type.
+
+    The allowed JSON types and the custom parser of the annotation are looked
+    up once, so the returned callable can be reused for every request.
+
+    :param annotation: The annotation of a logic function parameter.
+    :returns: A callable that accepts the raw param value and returns the
+        coerced value, or None if the annotation is not a doctor type.
+    :raises ParseError: From the returned callable if the value can't be
+        coerced.
+    """
+    # Importing here to prevent circular dependencies.
+    from doctor.types import SuperType, UnionType
+
+    # Skip coercing parameters not annotated by a doctor type.
+    if not (isinstance(annotation, type) and
+            issubclass(annotation, SuperType)):
+        return None
+
+    # Check if the type has a custom parser for the parameter.
+    custom_parser = annotation.parser
+    if custom_parser is not None:
+        if callable(custom_parser):
+            return custom_parser
+        warnings.warn(
+            'Parser `{}` is not callable, using default parser.'.format(
+                custom_parser))
+
+    json_type = None
+
+    def get_json_type() -> List[str]:
+        if issubclass(annotation, UnionType):
+            allowed = [_native_type_to_json[_type.native_type]
+                       for _type in annotation.types]
+        else:
+            allowed = [_native_type_to_json[annotation.native_type]]
+        # If the type is nullable, also add null as an allowed type.
+        if annotation.nullable:
+            allowed.append('null')
+        return allowed
+
+    def coerce(value):
+        nonlocal json_type
+        cache = _coercion_cache
+        if cache is not None and type(value) is str:
+            key = (annotation, value)
+            cached = cache.get(key)
+            if cached is not _MISSING:
+                return cached
+        else:
+            cache = None
+        # The allowed types are resolved on first use so that a type with an
+        # unknown native type only fails when a value is actually coerced.
+        # The list is built before it's assigned, so concurrent first
+        # requests never see it partially filled.
+        if json_type is None:
+            json_type = get_json_type()
+        _, parsed_value = parse_value(value, json_type)
+        if cache is not None and type(parsed_value) in _CACHEABLE_TYPES:
+            cache.put(key, parsed_value)
+        return parsed_value
+    return coerce
+
+
 def parse_form_and_query_params(req_params: dict, sig_params: dict) -> dict:
     """Uses the parameter annotations to coerce string params.
 
@@ -222,43 +401,17 @@ def parse_form_and_query_params(req_params: dict, sig_params: dict) -> dict:
     :returns: a dict of params parsed from the input dict.
     :raises TypeSystemError: If there are errors parsing values.
     """
-    # Importing here to prevent circular dependencies.
-    from doctor.types import SuperType, UnionType
     errors = {}
     parsed_params = {}
     for param, value in req_params.items():
         # Skip request variables not in the function signature.
         if param not in sig_params:
             continue
-        # Skip coercing parameters not annotated by a doctor type.
-        if not issubclass(sig_params[param].annotation, SuperType):
+        coerce = get_param_coercer(sig_params[param].annotation)
+        if coerce is None:
             continue
-
-        # Check if the type has a custom parser for the parameter.
-        custom_parser = sig_params[param].annotation.parser
-        if custom_parser is not None:
-            if not callable(custom_parser):
-                warnings.warn(
-                    'Parser `{}` is not callable, using default parser.'.format(
-                        custom_parser))
-                custom_parser = None
-
         try:
-            if custom_parser is not None:
-                parsed_params[param] = custom_parser(value)
-            else:
-                if issubclass(sig_params[param].annotation, UnionType):
-                    json_type = [
-                        _native_type_to_json[_type.native_type]
-                        for _type in sig_params[param].annotation.types
-                    ]
-                else:
-                    native_type = sig_params[param].annotation.native_type
-                    json_type = [_native_type_to_json[native_type]]
-                # If the type is nullable, also add null as an allowed type.
-                if sig_params[param].annotation.nullable:
-                    json_type.append('null')
-                _, parsed_params[param] = parse_value(value, json_type)
+            parsed_params[param] = coerce(value)
         except ParseError as e:
             errors[param] = str(e)
 
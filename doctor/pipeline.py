@@ -0,0 +1,1027 @@
+"""
+A framework agnostic request pipeline.
+
+Parsing request params, checking required params, validating and coercing
+params and validating the response only depend on a plain description of the
+request, so any server can use them.  :mod:`doctor.flask` and
+:mod:`doctor.asgi` are thin adapters on top of this module.
+"""
+import logging
+import random
+from typing import (
+    Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple, Union)
+
+from . import json_backend
+from .batch import Batch
+from .body import check_json_body, check_size
+from .compression import Compression, compress_body
+from .constants import HTTP_METHODS_WITH_JSON_BODY, STATUS_CODE_MAP
+from .etag import compute_etag, etag_matches, get_version_etag
+from .errors import (ForbiddenError, ImmutableError, InternalError,
+                     InvalidValueError, NotFoundError, PayloadTooLargeError,
+                     TypeSystemError, UnauthorizedError)
+from .instrumentation import (
+    NOOP_INSTRUMENTATION, PHASE_LOGIC, PHASE_PARSE, PHASE_REQUIRED,
+    PHASE_RESPONSE, PHASE_RESPONSE_VALIDATION, PHASE_VALIDATE, PhaseTimer,
+    get_instrumentation)
+from .plan import ValidationPlan, get_validation_plan
+from .response import (
+    RESPONSE_VALIDATION_OFF, RESPONSE_VALIDATION_SAMPLED,
+    RESPONSE_VALIDATION_SHALLOW, Response, get_response_validation,
+    should_raise_response_validation_errors)
+from .types import Array, Object
+
+
+class Request(object):
+    """A plain description of an HTTP request.
+
+    :param method: The HTTP method, e.g. `GET`.
+    :param mimetype: The content type of the request without any parameters,
+        e.g. `application/json`.
+    :param body: The raw request body.
+    :param query: A mapping or multidict of query string and form params.
+        Only the first value of a param is used.
+    :param path_params: Params parsed from the request path.
+    :param path: The request path, used when logging.
+    :param json_loader: A callable that returns the request body parsed as
+        JSON, for servers that already parse it.  If not provided the body is
+        parsed when the params are read from it.
+    :param body_loader: A callable that returns the raw request body, for
+        servers that read it lazily.  Only used if `body` isn't provided.
+    :param content_length: The Content-Length of the request, if known.
+    :param headers: A mapping of request headers.  It must either be case
+        insensitive or have lowercase keys.
+    """
+    __slots__ = ('method', 'mimetype', '_body', 'query', 'path_params', 'path',
+                 'json_loader', 'body_loader', 'content_length', 'headers')
+
+    def __init__(self, method: str, mimetype: str = '', body: bytes = None,
+                 query: Mapping = None, path_params: Dict = None,
+                 path: str = '', json_loader: Callable[[], Any] = None,
+                 body_loader: Callable[[], bytes] = None,
+                 content_length: int = None, headers: Mapping = None):
+        self.method = method
+        self.mimetype = mimetype
+        self._body = body
+        self.query = {} if query is None else query
+        self.path_params = {} if path_params is None else path_params
+        self.path = path
+        self.json_loader = json_loader
+        self.body_loader = body_loader
+        self.content_length = content_length
+        self.headers = {} if headers is None else headers
+
+    @property
+    def body(self) -> bytes:
+        """The raw request body."""
+        if self._body is None:
+            if self.body_loader is not None:
+                self._body = self.body_loader()
+            else:
+                self._body = b''
+        return self._body
+
+    @property
+    def json(self) -> Any:
+        """The request body parsed as JSON.
+
+        :raises InvalidValueError: If the body isn't valid JSON.
+        """
+        if self.json_loader is not None:
+            return self.json_loader()
+        try:
+            return json_backend.loads(self.body)
+        except ValueError:
+            raise InvalidValueError('Request body is not valid JSON.')
+
+    @property
+    def has_json_body(self) -> bool:
+        """True if the request params are encoded in a JSON body."""
+        # We are checking the mimetype instead of the content type because
+        # the content type can contain encoding, charset, and language
+        # information.  e.g. `Content-Type: application/json; charset=UTF8`
+        return (self.mimetype == 'application/json' and
+                self.method in HTTP_METHODS_WITH_JSON_BODY)
+
+
+class Error(NamedTuple):
+    """A structured error for a request that could not be handled.
+
+    :param status_code: The HTTP status code of the error.
+    :param description: The error description.  For errors raised by doctor
+        or logic functions this is the exception itself.
+    :param errors: A dict containing all validation errors during the
+        request, if any.  The key is the param name and the value is the
+        error message.
+    :param exception: The exception that caused the error.
+    """
+    status_code: int
+    description: Any
+    errors: Optional[Dict[str, str]]
+    exception: Exception
+
+
+#: Maps doctor errors to the HTTP status code of their response.
+ERROR_STATUS_CODES = (
+    ((InvalidValueError, TypeSystemError), 400),
+    (UnauthorizedError, 401),
+    (ForbiddenError, 403),
+    (NotFoundError, 404),
+    (ImmutableError, 409),
+    (PayloadTooLargeError, 413),
+)
+
+
+def get_params(plan: ValidationPlan, request: Request,
+               timer: PhaseTimer = None) -> Dict[str, Any]:
+    """Gets the validated and coerced params for a request.
+
+    :param plan: The validation plan of the logic function.
+    :param request: The request.
+    :param timer: If provided, the parse, required and validate phases are
+        marked on it.
+    :returns: A dict of params.
+    :raises InvalidValueError: If any required params are missing.
+    :raises PayloadTooLargeError: If the body exceeds the plan's body limits.
+    :raises TypeSystemError: If any params fail to parse or validate.
+    """
+    if request.has_json_body:
+        # This is a proper typed JSON request. The parameters will be
+        # encoded into the request body as a JSON blob.
+        if plan.body_limits is not None:
+            # Reject bodies that are too large before reading and parsing
+            # them.
+            check_size(request.content_length, plan.body_limits)
+            check_json_body(request.body, plan.body_limits, plan.body_type)
+        if plan.req_obj_type is None:
+            params = plan.map_param_names(request.json)
+        else:
+            params = request.json
+    else:
+        # Try to parse things from normal HTTP parameters
+        params = plan.parse_query_params(request.query)
+    return validate_params(plan, params, request.path_params, timer=timer)
+
+
+def validate_params(plan: ValidationPlan, params: Dict[str, Any],
+                    path_params: Dict[str, Any] = None,
+                    timer: PhaseTimer = None) -> Dict[str, Any]:
+    """Checks and validates the params read from a request.
+
+    :param plan: The validation plan of the logic function.
+    :param params: A dict of params read from the request body or query
+        string.
+    :param path_params: Params parsed from the request path.
+    :param timer: If provided, the parse, required and validate phases are
+        marked on it.
+    :returns: A dict of params.
+    :raises InvalidValueError: If any required params are missing.
+    :raises TypeSystemError: If any params fail to validate.
+    """
+    # Only filter out additional params if a req_obj_type was not specified.
+    if plan.req_obj_type is None:
+        # Filter out any params not part of the logic signature.
+        all_params = plan.all_params
+        params = {k: v for k, v in params.items() if k in all_params}
+    params.update(**(path_params or {}))
+    if timer is not None:
+        timer.mark(PHASE_PARSE)
+
+    # Check for required params
+    plan.check_required(params)
+    if timer is not None:
+        timer.mark(PHASE_REQUIRED)
+
+    # Validate and coerce parameters to the appropriate types.
+    params = plan.validate(params)
+    if timer is not None:
+        timer.mark(PHASE_VALIDATE)
+    return params
+
+
+def get_logic_call(plan: ValidationPlan, request: Request,
+                   args: Tuple = (),
+                   timer: PhaseTimer = None) -> Tuple[Tuple, Dict[str, Any]]:
+    """Gets the positional and keyword arguments to call a logic function with.
+
+    :param plan: The validation plan of the logic function.
+    :param request: The request.
+    :param args: Any positional arguments that should be passed to the logic
+        function before the request params.
+    :param timer: If provided, the phases of reading the params are marked
+        on it.
+    :returns: A tuple of positional arguments and a dict of keyword arguments.
+    """
+    params = get_params(plan, request, timer=timer)
+    return get_call_args(plan, params, args)
+
+
+def get_call_args(plan: ValidationPlan, params: Dict[str, Any],
+                  args: Tuple = ()) -> Tuple[Tuple, Dict[str, Any]]:
+    """Gets the arguments to call a logic function with validated params.
+
+    :param plan: The validation plan of the logic function.
+    :param params: The validated params.
+    :param args: Any positional arguments that should be passed to the logic
+        function before the request params.
+    :returns: A tuple of positional arguments and a dict of keyword arguments.
+    """
+    if plan.req_obj_type is not None:
+        # Pass any positional arguments followed by the coerced request
+        # parameters to the logic function.
+        return args + (params,), {}
+    # Only pass request parameters defined by the logic signature.
+    return args, {k: v for k, v in params.items() if k in plan.logic_params}
+
+
+def validate_shallow(annotation: Any, value: Any):
+    """Validates only the top level shape of a value.
+
+    Objects are checked for their type, required properties and additional
+    properties, and arrays for their type and number of items, without
+    validating their properties or items.  Any other type is fully validated.
+
+    :param annotation: The type to validate against.
+    :param value: The value.
+    :raises TypeSystemError: If the value doesn't validate.
+    """
+    if not isinstance(annotation, type):
+        return
+    if value is None and getattr(annotation, 'nullable', False):
+        return
+    if issubclass(annotation, Object):
+        if not isinstance(value, dict):
+            raise TypeSystemError(cls=annotation, code='type')
+        errors = {}
+        for key in annotation.required:
+            if key not in value:
+                errors[key] = TypeSystemError(
+                    cls=annotation, code='required').detail
+        if not annotation.additional_properties:
+            for key in value:
+                if key not in annotation.properties:
+                    errors[key] = TypeSystemError(
+                        cls=annotation, code='additional_properties').detail
+        if errors:
+            raise TypeSystemError(errors)
+    elif issubclass(annotation, Array):
+        if not isinstance(value, (list, tuple)):
+            raise TypeSystemError(cls=annotation, code='type')
+        if len(value) < annotation.min_items:
+            raise TypeSystemError(cls=annotation, code='min_items')
+        if (annotation.max_items is not None and
+                len(value) > annotation.max_items):
+            raise TypeSystemError(cls=annotation, code='max_items')
+    else:
+        annotation(value)
+
+
+def validate_response(
+        plan: ValidationPlan, request: Request, response: Any,
+        should_raise: Callable[[], bool] = (
+            should_raise_response_validation_errors)):
+    """Validates the response of a logic function.
+
+    How the response is validated depends on the
+    :class:`~doctor.response.ResponseValidation` of the plan, or the global
+    one if the plan doesn't have one.  A warning is logged if the response
+    doesn't validate.
+
+    :param plan: The validation plan of the logic function.
+    :param request: The request.
+    :param response: The value returned by the logic function.
+    :param should_raise: A callable that returns if response validation errors
+        should be raised.
+    :raises TypeSystemError: If the response doesn't validate and
+        `should_raise` returns True.
+    """
+    if plan.return_annotation is None:
+        return
+    validation = plan.response_validation or get_response_validation()
+    mode = validation.mode
+    if mode == RESPONSE_VALIDATION_OFF:
+        return
+    if (mode == RESPONSE_VALIDATION_SAMPLED and
+            random.random() >= validation.sample_rate):
+        return
+    return_annotation = plan.return_annotation
+    _response = response
+    if isinstance(response, Response):
+        _response = response.content
+        # Check if our return annotation is a Response that supplied a
+        # type to validate against.  If so, use that type for validation
+        # e.g. def logic() -> Response[MyType]
+        return_annotation = plan.response_type
+    try:
+        if mode == RESPONSE_VALIDATION_SHALLOW:
+            validate_shallow(return_annotation, _response)
+        else:
+            return_annotation(_response)
+    except TypeSystemError as e:
+        response_str = str(_response)
+        logging.warning('Response to %s %s does not validate: %s.',
+                        request.method, request.path,
+                        response_str, exc_info=e)
+        if should_raise():
+            error = ('Response to {method} {path} `{response}` does not'
+                     ' validate: {error}'.format(
+                         method=request.method, path=request.path,
+                         response=response, error=e.detail))
+            raise TypeSystemError(error)
+
+
+def get_result(
+        plan: ValidationPlan, request: Request, response: Any,
+        should_raise: Callable[[], bool] = (
+            should_raise_response_validation_errors),
+        timer: PhaseTimer = None) -> Tuple:
+    """Validates the response of a logic function and gets the result.
+
+    :param plan: The validation plan of the logic function.
+    :param request: The request.
+    :param response: The value returned by the logic function.
+    :param should_raise: A callable that returns if response validation errors
+        should be raised.
+    :param timer: If provided, the response validation and response phases
+        are marked on it.
+    :returns: A tuple of the response content and status code.  If the logic
+        function returned a :class:`~doctor.response.Response` the response
+        headers are included as a third item.
+    :raises TypeSystemError: If the response doesn't validate and
+        `should_raise` returns True.
+    """
+    validate_response(plan, request, response, should_raise=should_raise)
+    if timer is not None:
+        timer.mark(PHASE_RESPONSE_VALIDATION)
+    if isinstance(response, Response):
+        status_code = response.status_code
+        if status_code is None:
+            status_code = STATUS_CODE_MAP.get(request.method, 200)
+        result = (response.content, status_code, response.headers)
+    else:
+        result = (response, STATUS_CODE_MAP.get(request.method, 200))
+    if timer is not None:
+        timer.mark(PHASE_RESPONSE)
+    return result
+
+
+def _get_etag_header(headers: Optional[Mapping]) -> Optional[str]:
+    for key, value in (headers or {}).items():
+        if key.lower() == 'etag':
+            return value
+    return None
+
+
+def get_logic_etag(plan: ValidationPlan, logic_args: Tuple,
+                   logic_kwargs: Dict[str, Any]) -> Optional[str]:
+    """Gets the ETag of a request from the version token of the logic function.
+
+    :param plan: The validation plan of the logic function.
+    :param logic_args: The positional arguments of the logic function call.
+    :param logic_kwargs: The keyword arguments of the logic function call.
+    :returns: The ETag, or None if the `etag` option isn't a callable or it
+        returned None.
+    """
+    if not callable(plan.etag):
+        return None
+    token = plan.etag(*logic_args, **logic_kwargs)
+    if token is None:
+        return None
+    return get_version_etag(token)
+
+
+def add_etag(plan: ValidationPlan, result: Tuple,
+             etag: str = None) -> Tuple:
+    """Adds an `ETag` header to a successful result.
+
+    :param plan: The validation plan of the logic function.
+    :param result: The result as returned by :func:`get_result`.
+    :param etag: The ETag from the version token of the logic function.  If
+        not provided the ETag is computed from the response content.
+    :returns: The result with an `ETag` header, or the result unchanged if
+        the `etag` option isn't set, the status code isn't 200 or the
+        response already has an `ETag` header.
+    """
+    if not plan.etag or result[1] != 200:
+        return result
+    headers = result[2] if len(result) > 2 and result[2] else {}
+    if _get_etag_header(headers) is not None:
+        return result
+    if etag is None:
+        etag = compute_etag(result[0])
+    headers = dict(headers, ETag=etag)
+    return result[0], result[1], headers
+
+
+def get_not_modified_result(request: Request,
+                            headers: Mapping) -> Optional[Tuple]:
+    """Gets a 304 result if the request's `If-None-Match` header matches.
+
+    :param request: The request.
+    :param headers: The response headers, including the `ETag` header.
+    :returns: A result with no content, a 304 status code and the headers,
+        or None if the request doesn't match the ETag.
+    """
+    etag = _get_etag_header(headers)
+    if etag is not None and etag_matches(
+            request.headers.get('if-none-match'), etag):
+        return None, 304, dict(headers)
+    return None
+
+
+def get_conditional_result(plan: ValidationPlan, request: Request,
+                           result: Tuple) -> Tuple:
+    """Gets the result of a conditional request.
+
+    :param plan: The validation plan of the logic function.
+    :param request: The request.
+    :param result: The result with the `ETag` header added by
+        :func:`add_etag`.
+    :returns: A 304 result if the request's `If-None-Match` header matches
+        the ETag, otherwise the result.
+    """
+    if not plan.etag or result[1] != 200 or len(result) < 3:
+        return result
+    return get_not_modified_result(request, result[2]) or result
+
+
+def encode_response(
+        result: Tuple, accept_encoding: Optional[str] = None,
+        compression: Optional[Compression] = None,
+) -> Tuple[bytes, int, Dict[str, str]]:
+    """Encodes the content of a result as JSON.
+
+    :param result: The result as returned by :func:`get_result`.
+    :param accept_encoding: The value of the request's `Accept-Encoding`
+        header.
+    :param compression: The :class:`~doctor.compression.Compression` of the
+        route, or None if the body shouldn't be compressed.
+    :returns: A tuple of the body, status code and response headers.  The
+        body is empty for 204 and 304 responses.
+    """
+    content, status_code = result[:2]
+    headers = dict(result[2]) if len(result) > 2 and result[2] else {}
+    body = b''
+    if status_code not in (204, 304):
+        body = json_backend.dumps(content).encode('utf-8')
+    if compression is not None:
+        body = compress_body(body, status_code, headers, accept_encoding,
+                             compression)
+    return body, status_code, headers
+
+
+def get_error(e: Exception, logic: Callable) -> Optional[Error]:
+    """Gets the structured error for an exception raised handling a request.
+
+    :param e: The exception.
+    :param logic: The logic function.
+    :returns: The error, or None if the exception is one of the logic
+        function's allowed exceptions and should be re-raised.
+    """
+    for error_classes, status_code in ERROR_STATUS_CODES:
+        if isinstance(e, error_classes):
+            return Error(status_code, e, getattr(e, 'errors', None), e)
+    allowed_exceptions = logic._doctor_allowed_exceptions
+    if allowed_exceptions and any(isinstance(e, cls)
+                                  for cls in allowed_exceptions):
+        return None
+    return Error(500, 'Uncaught error in logic function', None, e)
+
+
+def start_timer() -> Optional[PhaseTimer]:
+    """Starts timing a request.
+
+    :returns: A timer, or None if the request shouldn't be timed because the
+        default instrumentation is active.
+    """
+    if get_instrumentation() is NOOP_INSTRUMENTATION:
+        return None
+    return PhaseTimer()
+
+
+def get_route(request: Request, logic: Callable) -> str:
+    """Gets the route of a request.
+
+    :param request: The request.
+    :param logic: The logic function.
+    :returns: The route of the logic function, or the request path if it
+        isn't part of a route.
+    """
+    return getattr(logic, '_doctor_route', None) or request.path
+
+
+def get_response_cache_key(
+        plan: ValidationPlan, request: Request, logic: Callable, args: Tuple,
+        logic_args: Tuple, logic_kwargs: Dict[str, Any]) -> Optional[str]:
+    """Gets the key the response to a request is cached under.
+
+    :param plan: The validation plan of the logic function.
+    :param request: The request.
+    :param logic: The logic function.
+    :param args: The positional arguments passed to the handler, which are
+        passed to the logic function before the request params.
+    :param logic_args: The positional arguments of the logic function call.
+    :param logic_kwargs: The keyword arguments of the logic function call.
+    :returns: The key, or None if the responses of the logic function aren't
+        cached.
+    """
+    if plan.response_cache is None:
+        return None
+    return plan.response_cache.get_key(
+        get_route(request, logic), request.method, logic_args[len(args):],
+        logic_kwargs)
+
+
+def record_timings(request: Request, logic: Callable, timer: PhaseTimer):
+    """Passes the timings of a request to the active instrumentation.
+
+    Errors raised by the instrumentation are logged instead of failing the
+    request.
+
+    :param request: The request.
+    :param logic: The logic function.
+    :param timer: The timer of the request.
+    """
+    route = get_route(request, logic)
+    try:
+        get_instrumentation().record(route, request.method, timer.timings)
+    except Exception:
+        logging.exception('Error recording timings for %s %s.',
+                          request.method, route)
+
+
+class BatchCall(NamedTuple):
+    """A validated logic function call for an item of a batch request.
+
+    :param index: The index of the item in the batch.
+    :param args: The positional arguments of the call.
+    :param kwargs: The keyword arguments of the call.
+    """
+    index: int
+    args: Tuple
+    kwargs: Dict[str, Any]
+
+
+def get_batch_calls(
+        plan: ValidationPlan, request: Request, batch: Batch,
+        args: Tuple = ()) -> Tuple[int, List[BatchCall], Dict[int, Any]]:
+    """Validates the items of a batch request.
+
+    Each item is validated like the JSON body of a request, along with the
+    path params of the batch request.
+
+    :param plan: The validation plan of the logic function.
+    :param request: The batch request.
+    :param batch: The batch configuration.
+    :param args: Any positional arguments that should be passed to the logic
+        function before the request params.
+    :returns: A tuple of the number of items, the calls for the valid items
+        and a dict of item index to the exception raised validating it.
+    :raises InvalidValueError: If the body isn't a JSON array.
+    :raises PayloadTooLargeError: If the body exceeds the plan's body limits,
+        or there are more items than the batch allows.
+    """
+    if plan.body_limits is not None:
+        # The body limits of the route apply to the whole batch body, which
+        # is checked before it's parsed like the body of a single request.
+        check_size(request.content_length, plan.body_limits)
+        check_json_body(request.body, plan.body_limits)
+    items = request.json
+    if not isinstance(items, list):
+        raise InvalidValueError('Request body must be a JSON array of params.')
+    if batch.max_items is not None and len(items) > batch.max_items:
+        raise PayloadTooLargeError(
+            'Batches must not have more than {} items.'.format(
+                batch.max_items))
+    calls = []
+    errors = {}
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise InvalidValueError('Batch items must be JSON objects.')
+            if plan.req_obj_type is None:
+                params = plan.map_param_names(item)
+            else:
+                params = dict(item)
+            params = validate_params(plan, params, request.path_params)
+        except Exception as e:
+            errors[index] = e
+            continue
+        call_args, call_kwargs = get_call_args(plan, params, args)
+        calls.append(BatchCall(index, call_args, call_kwargs))
+    return len(items), calls, errors
+
+
+def get_many_params(plan: ValidationPlan,
+                    calls: List[BatchCall]) -> List[Any]:
+    """Gets the params of each call that are passed to a batch's `many`.
+
+    :param plan: The validation plan of the logic function.
+    :param calls: The calls of the valid items.
+    :returns: A list of the params of each call.
+    """
+    if plan.req_obj_type is not None:
+        return [call.args[-1] for call in calls]
+    return [call.kwargs for call in calls]
+
+
+def set_many_responses(calls: List[BatchCall], responses: Any,
+                       results: Dict[int, Any]):
+    """Maps the responses returned by a batch's `many` to the items.
+
+    :param calls: The calls of the valid items.
+    :param responses: The value returned by `many`.
+    :param results: A dict of item index to response that is updated.
+    :raises InternalError: If `many` didn't return a response for each item.
+    """
+    if not isinstance(responses, list) or len(responses) != len(calls):
+        raise InternalError(
+            'Batch many must return a list with a response for each item.')
+    for call, response in zip(calls, responses):
+        results[call.index] = response
+
+
+def run_batch_calls(logic: Callable, calls: List[BatchCall],
+                    results: Dict[int, Any]):
+    """Calls the logic function for the valid items of a batch request.
+
+    The calls are submitted to the batch's executor if it has one, and the
+    responses are mapped back to the items once all calls finish.  Otherwise
+    the logic function is called for one item at a time.  If the batch has a
+    `max_concurrency`, no more than that many calls of the batch endpoint run
+    at the same time.
+
+    :param logic: The logic function of the batch endpoint.
+    :param calls: The calls of the valid items.
+    :param results: A dict of item index to response that is updated with the
+        value returned by the logic function or the exception it raised.
+    """
+    executor = logic._doctor_batch.executor
+    semaphore = logic._doctor_batch_semaphore
+    if executor is None:
+        for call in calls:
+            if semaphore is not None:
+                semaphore.acquire()
+            try:
+                results[call.index] = logic(*call.args, **call.kwargs)
+            except Exception as e:
+                results[call.index] = e
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+        return
+
+    def release(future):
+        semaphore.release()
+
+    futures = []
+    for call in calls:
+        if semaphore is not None:
+            semaphore.acquire()
+        try:
+            future = executor.submit(
+                logic._doctor_batch_logic, *call.args, **call.kwargs)
+        except Exception:
+            if semaphore is not None:
+                semaphore.release()
+            raise
+        if semaphore is not None:
+            future.add_done_callback(release)
+        futures.append((call.index, future))
+    for index, future in futures:
+        try:
+            results[index] = future.result()
+        except Exception as e:
+            results[index] = e
+
+
+def get_batch_item_result(plan: ValidationPlan, request: Request,
+                          logic: Callable, response: Any,
+                          should_raise: Callable[[], bool] = (
+                              should_raise_response_validation_errors)
+                          ) -> Dict[str, Any]:
+    """Gets the result of an item of a batch request.
+
+    :param plan: The validation plan of the logic function.
+    :param request: A request with the HTTP method of the logic function.
+    :param logic: The logic function.
+    :param response: The value returned by the logic function for the item,
+        or the exception raised validating the item or calling the logic
+        function.
+    :param should_raise: A callable that returns if response validation errors
+        should be raised.
+    :returns: A dict with the `status` code and the response `data`, or the
+        error `message` and any validation `errors`.
+    :raises Exception: If the logic function raised one of its allowed
+        exceptions.
+    """
+    try:
+        if isinstance(response, Exception):
+            raise response
+        content, status_code = get_result(
+            plan, request, response, should_raise=should_raise)[:2]
+    except Exception as e:
+        error = get_error(e, logic)
+        if error is None:
+            raise
+        if error.status_code == 500:
+            logging.error('Error handling a batch item for %s %s.',
+                          request.method, request.path,
+                          exc_info=error.exception)
+        result = {'status': error.status_code,
+                  'message': str(error.description)}
+        if error.errors:
+            result['errors'] = error.errors
+        return result
+    return {'status': status_code, 'data': content}
+
+
+def get_batch_result(plan: ValidationPlan, request: Request, logic: Callable,
+                     count: int, responses: Dict[int, Any],
+                     should_raise: Callable[[], bool] = (
+                         should_raise_response_validation_errors)) -> Tuple:
+    """Gets the result of a batch request.
+
+    :param plan: The validation plan of the logic function.
+    :param request: The batch request.
+    :param logic: The logic function of the batch endpoint.
+    :param count: The number of items.
+    :param responses: A dict of item index to the response or exception of
+        the item.
+    :param should_raise: A callable that returns if response validation errors
+        should be raised.
+    :returns: A tuple of the list of item results and a 200 status code.
+    """
+    item_request = Request(logic._doctor_batch_method, path=request.path,
+                           headers=request.headers)
+    return [get_batch_item_result(plan, item_request, logic, responses[i],
+                                  should_raise=should_raise)
+            for i in range(count)], 200
+
+
+class PreparedBatch(NamedTuple):
+    """The validated items of a request to a batch endpoint.
+
+    :param plan: The validation plan of the logic function.
+    :param count: The number of items.
+    :param calls: The calls of the valid items.
+    :param responses: A dict of item index to the exception raised validating
+        the item, which the responses of the calls are added to.
+    :param many_params: The params passed to the batch's `many`, or None if
+        it doesn't have one or none of the items are valid.
+    """
+    plan: ValidationPlan
+    count: int
+    calls: List[BatchCall]
+    responses: Dict[int, Any]
+    many_params: Optional[List[Any]]
+
+
+def prepare_batch(request: Request, logic: Callable,
+                  args: Tuple = ()) -> Union[PreparedBatch, Error]:
+    """Validates the items of a request to a batch endpoint.
+
+    This is the part of :func:`handle_batch_request` before the logic
+    function is called, which is shared by the server adapters.
+
+    :param request: The batch request.
+    :param logic: The logic function of the batch endpoint.
+    :param args: Any positional arguments that should be passed to the logic
+        function before the request params.
+    :returns: The batch to pass to :func:`finish_batch` once the logic
+        function is called, or an :class:`Error` if the request could not be
+        handled.
+    """
+    try:
+        plan = get_validation_plan(logic)
+        batch = logic._doctor_batch
+        count, calls, responses = get_batch_calls(plan, request, batch, args)
+    except Exception as e:
+        error = get_error(e, logic)
+        if error is None:
+            raise
+        return error
+    many_params = None
+    if batch.many is not None and calls:
+        many_params = get_many_params(plan, calls)
+    return PreparedBatch(plan, count, calls, responses, many_params)
+
+
+def finish_batch(request: Request, logic: Callable, prepared: PreparedBatch,
+                 many_responses: Any = None,
+                 should_raise: Callable[[], bool] = (
+                     should_raise_response_validation_errors)
+                 ) -> Union[Tuple, Error]:
+    """Gets the result of a batch request once the logic function is called.
+
+    :param request: The batch request.
+    :param logic: The logic function of the batch endpoint.
+    :param prepared: The batch returned by :func:`prepare_batch`, with the
+        responses of the calls added if the batch doesn't have a `many`.
+    :param many_responses: The value returned by the batch's `many`, or the
+        exception raised calling it or the logic function.
+    :param should_raise: A callable that returns if response validation errors
+        should be raised.
+    :returns: The result as returned by :func:`get_batch_result`, or an
+        :class:`Error` if the request could not be handled.
+    :raises Exception: If the logic function raised one of its allowed
+        exceptions.
+    """
+    try:
+        if prepared.many_params is not None:
+            if isinstance(many_responses, Exception):
+                # All items fail if many raises an exception.
+                many_responses = [many_responses] * len(prepared.calls)
+            set_many_responses(prepared.calls, many_responses,
+                               prepared.responses)
+        elif isinstance(many_responses, Exception):
+            raise many_responses
+        return get_batch_result(prepared.plan, request, logic, prepared.count,
+                                prepared.responses, should_raise=should_raise)
+    except Exception as e:
+        error = get_error(e, logic)
+        if error is None:
+            raise
+        return error
+
+
+def handle_batch_request(
+        request: Request, logic: Callable, args: Tuple = (),
+        should_raise: Callable[[], bool] = (
+            should_raise_response_validation_errors)):
+    """Handles a request to a batch endpoint.
+
+    :see: :mod:`doctor.batch`
+    :param request: The request.
+    :param logic: The logic function of the batch endpoint.
+    :param args: Any positional arguments that should be passed to the logic
+        function before the request params.
+    :param should_raise: A callable that returns if response validation errors
+        should be raised.
+    :returns: The result as returned by :func:`get_batch_result`, or an
+        :class:`Error` if the request could not be handled.
+    :raises Exception: If the logic function raised one of its allowed
+        exceptions.
+    """
+    prepared = prepare_batch(request, logic, args)
+    if isinstance(prepared, Error):
+        return prepared
+    many_responses = None
+    try:
+        if prepared.many_params is not None:
+            many_responses = logic._doctor_batch.many(
+                *args, prepared.many_params)
+        else:
+            run_batch_calls(logic, prepared.calls, prepared.responses)
+    except Exception as e:
+        many_responses = e
+    return finish_batch(request, logic, prepared, many_responses,
+                        should_raise=should_raise)
+
+
+class LogicCall(NamedTuple):
+    """A validated call of a logic function for a request.
+
+    :param plan: The validation plan of the logic function.
+    :param logic: The logic function.
+    :param args: The positional arguments of the call.
+    :param kwargs: The keyword arguments of the call.
+    :param etag: The ETag from the version token of the logic function, or
+        None if it doesn't have one.
+    :param cache_key: The key the response is cached under, or None if the
+        responses of the logic function aren't cached.
+    :param timer: The timer of the request, or None if it isn't timed.
+    """
+    plan: ValidationPlan
+    logic: Callable
+    args: Tuple
+    kwargs: Dict[str, Any]
+    etag: Optional[str]
+    cache_key: Optional[str]
+    timer: Optional[PhaseTimer]
+
+
+def prepare_call(request: Request, logic: Callable,
+                 args: Tuple = ()) -> Union[LogicCall, Tuple, Error]:
+    """Prepares the call of a logic function for a request.
+
+    This is the part of :func:`handle_request` before the logic function is
+    called, which is shared by the server adapters.  The request params are
+    validated, then the ETag and the response cache are checked.
+
+    :param request: The request.
+    :param logic: The logic function.
+    :param args: Any positional arguments that should be passed to the logic
+        function before the request params.
+    :returns: The call to pass to :func:`finish_call` once the logic function
+        returns.  A result is returned instead if the logic function
+        shouldn't be called, which is a 304 result for requests whose
+        `If-None-Match` header matches the ETag or a cached result.  An
+        :class:`Error` is returned if the request could not be handled.
+    :raises Exception: If one of the logic function's allowed exceptions was
+        raised.
+    """
+    timer = start_timer()
+    call = None
+    try:
+        plan = get_validation_plan(logic)
+        logic_args, logic_kwargs = get_logic_call(
+            plan, request, args, timer=timer)
+        etag = get_logic_etag(plan, logic_args, logic_kwargs)
+        if etag is not None:
+            result = get_not_modified_result(request, {'ETag': etag})
+            if result is not None:
+                return result
+        cache_key = get_response_cache_key(
+            plan, request, logic, args, logic_args, logic_kwargs)
+        if cache_key is not None:
+            result = plan.response_cache.get(cache_key)
+            if result is not None:
+                return get_conditional_result(plan, request, result)
+        call = LogicCall(plan, logic, logic_args, logic_kwargs, etag,
+                         cache_key, timer)
+        return call
+    except Exception as e:
+        error = get_error(e, logic)
+        if error is None:
+            raise
+        return error
+    finally:
+        # The timings of a call are recorded once it finishes.
+        if timer is not None and call is None:
+            record_timings(request, logic, timer)
+
+
+def finish_call(request: Request, call: LogicCall, response: Any,
+                should_raise: Callable[[], bool] = (
+                    should_raise_response_validation_errors)
+                ) -> Union[Tuple, Error]:
+    """Gets the result of a request once its logic function returns.
+
+    The response is validated, the ETag is added and the result is cached.
+
+    :param request: The request.
+    :param call: The call returned by :func:`prepare_call`.
+    :param response: The value returned by the logic function, or the
+        exception it raised.
+    :param should_raise: A callable that returns if response validation errors
+        should be raised.
+    :returns: The result as returned by :func:`get_result`, a 304 result if
+        the request's `If-None-Match` header matches the ETag, or an
+        :class:`Error` if the request could not be handled.
+    :raises Exception: If the logic function raised one of its allowed
+        exceptions.
+    """
+    plan, timer = call.plan, call.timer
+    try:
+        if isinstance(response, Exception):
+            raise response
+        if timer is not None:
+            timer.mark(PHASE_LOGIC)
+        result = get_result(plan, request, response,
+                            should_raise=should_raise, timer=timer)
+        result = add_etag(plan, result, call.etag)
+        if call.cache_key is not None:
+            plan.response_cache.set(call.cache_key, result)
+        return get_conditional_result(plan, request, result)
+    except Exception as e:
+        error = get_error(e, call.logic)
+        if error is None:
+            raise
+        return error
+    finally:
+        if timer is not None:
+            record_timings(request, call.logic, timer)
+
+
+def handle_request(
+        request: Request, logic: Callable, args: Tuple = (),
+        should_raise: Callable[[], bool] = (
+            should_raise_response_validation_errors)):
+    """Handles a request for a logic function.
+
+    :param request: The request.
+    :param logic: The logic function.
+    :param args: Any positional arguments that should be passed to the logic
+        function before the request params.
+    :param should_raise: A callable that returns if response validation errors
+        should be raised.
+    :returns: The result as returned by :func:`get_result`, or an
+        :class:`Error` if the request could not be handled.  If the logic
+        function has a response cache, cached results are returned without
+        calling it.  If it has the `etag` option, a 304 result is returned
+        for requests whose `If-None-Match` header matches the ETag.
+    :raises Exception: If the logic function raised one of its allowed
+        exceptions.
+    """
+    if getattr(logic, '_doctor_batch_method', None) is not None:
+        return handle_batch_request(request, logic, args,
+                                    should_raise=should_raise)
+    call = prepare_call(request, logic, args)
+    if not isinstance(call, LogicCall):
+        return call
+    try:
+        response = logic(*call.args, **call.kwargs)
+    except Exception as e:
+        response = e
+    return finish_call(request, call, response, should_raise=should_raise)
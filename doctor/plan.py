@@ -0,0 +1,268 @@
+"""
+Compiled, per-route validation plans.
+
+Everything needed to validate a request for a logic function only depends on
+the logic function itself, so it is computed once when routes are created
+instead of on every request.
+"""
+import logging
+from types import MappingProxyType
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from typing_inspect import get_origin
+
+from .compiler import compile_type
+from .errors import InvalidValueError, ParseError, TypeSystemError
+from .parsers import get_param_coercer
+from .response import Response
+from .types import UnionType
+
+
+def _create_validator(annotation) -> Callable:
+    """Creates a callable that validates and coerces a value for a type.
+
+    :param annotation: The annotation of a logic function parameter.
+    :returns: A callable that accepts a value and returns it coerced to the
+        native type of the annotation.
+    """
+    nullable = getattr(annotation, 'nullable', False)
+
+    if getattr(annotation, 'compiled', False):
+        compiled_validator = compile_type(annotation)
+
+        def validate(value):
+            if nullable and value is None:
+                return None
+            return compiled_validator(value)
+        return validate
+
+    if isinstance(annotation, type) and issubclass(annotation, UnionType):
+        # The native type of a UnionType depends on which of its types the
+        # value resolves to.
+        def validate(value):
+            if nullable and value is None:
+                return None
+            obj_class, value = annotation.resolve(value)
+            return obj_class.native_type(value)
+        return validate
+
+    def validate(value):
+        if nullable and value is None:
+            return None
+        value = annotation(value)
+        return annotation.native_type(value)
+    return validate
+
+
+def get_response_type(return_annotation: Any) -> Any:
+    """Gets the type the content of a `Response` should validate against.
+
+    If the return annotation is a :class:`~doctor.response.Response` that
+    supplied a type, e.g. `def logic() -> Response[MyType]`, that type is
+    returned, otherwise the return annotation itself is returned.
+
+    :param return_annotation: The return annotation of a logic function.
+    :returns: The type.
+    """
+    if ((get_origin(return_annotation) == Response) and
+            return_annotation.__args__ is not None):
+        return return_annotation.__args__[0]
+    return return_annotation
+
+
+class ValidationPlan(NamedTuple):
+    """An immutable plan used to validate requests for a logic function.
+
+    Use :func:`create_validation_plan` to create an instance.
+
+    :param req_obj_type: The `req_obj_type` of the logic function, if any.
+    :param param_names: A mapping of logic function param name to the name
+        of the param in the request.
+    :param all_params: All param names for a request.
+    :param logic_params: The param names that are passed to the logic function.
+    :param required: The required param names for a request.
+    :param required_order: The required param names in signature order, used
+        when reporting missing params.
+    :param coercers: A mapping of param name to a callable that coerces the
+        param from a form or query string value.
+    :param validators: A mapping of param name to a callable that validates
+        a param and coerces it to its native type.
+    :param return_annotation: The return annotation of the logic function, or
+        None if the response should not be validated.
+    :param response_type: The type the content of a
+        :class:`~doctor.response.Response` returned by the logic function
+        should validate against.
+    :param body_limits: The :class:`~doctor.body.BodyLimits` JSON request
+        bodies are checked against, or None if they aren't checked.
+    :param body_type: The type a JSON request body should validate against,
+        or a mapping of request param name to type if the body contains
+        request params.
+    :param response_validation: The
+        :class:`~doctor.response.ResponseValidation` of the logic function,
+        or None if the global response validation should be used.
+    :param response_cache: The :class:`~doctor.cache.ResponseCache` of the
+        logic function, or None if responses aren't cached.
+    :param etag: The `etag` option of the logic function.  See
+        :mod:`doctor.etag`.
+    """
+    req_obj_type: Optional[Any]
+    param_names: Dict[str, str]
+    all_params: frozenset
+    logic_params: frozenset
+    required: frozenset
+    required_order: Tuple[str, ...]
+    coercers: Dict[str, Callable]
+    validators: Dict[str, Callable]
+    return_annotation: Optional[Any]
+    response_type: Optional[Any]
+    body_limits: Optional[Any]
+    body_type: Any
+    response_validation: Optional[Any]
+    response_cache: Optional[Any]
+    etag: Any
+
+    def map_param_names(self, req_params: dict) -> dict:
+        """Maps request param names to match logic function param names.
+
+        :see: :func:`~doctor.parsers.map_param_names`
+        :param req_params: The parameters specified in the request.
+        :returns: A dict of re-mapped params.
+        """
+        return {name: req_params[key]
+                for name, key in self.param_names.items()
+                if key in req_params}
+
+    def parse_query_params(self, req_params: dict) -> dict:
+        """Coerces form and query string params to their expected types.
+
+        :see: :func:`~doctor.parsers.parse_form_and_query_params`
+        :param req_params: The parameters specified in the request.
+        :returns: A dict of params parsed from the input dict.
+        :raises TypeSystemError: If there are errors parsing values.
+        """
+        errors = {}
+        parsed_params = {}
+        coercers = self.coercers
+        for param, value in req_params.items():
+            coerce = coercers.get(param)
+            if coerce is None:
+                continue
+            try:
+                parsed_params[param] = coerce(value)
+            except ParseError as e:
+                errors[param] = str(e)
+        if errors:
+            raise TypeSystemError(errors, errors=errors)
+        return parsed_params
+
+    def check_required(self, params: dict):
+        """Verifies all required params are present.
+
+        :param params: The request params.
+        :raises InvalidValueError: If any required params are missing.
+        """
+        if self.required.issubset(params):
+            return
+        missing = [r for r in self.required_order if r not in params]
+        verb = 'are'
+        if len(missing) == 1:
+            verb = 'is'
+            missing = missing[0]
+        raise InvalidValueError('{} {} required.'.format(missing, verb))
+
+    def validate(self, params: dict) -> dict:
+        """Validates params and coerces them to their native types.
+
+        :param params: The request params.
+        :returns: The coerced params.
+        :raises TypeSystemError: If any params fail to validate.
+        """
+        errors = {}
+        # If a `req_obj_type` was defined for the route, pass all request
+        # params to that type for validation/coercion
+        if self.req_obj_type is not None:
+            try:
+                params = self.validators['__all__'](params)
+            except TypeError:
+                logging.exception(
+                    'Error casting and validating params with value `%s`.',
+                    params)
+                raise
+            except TypeSystemError as e:
+                errors['__all__'] = e.detail
+        else:
+            validators = self.validators
+            for name, value in params.items():
+                try:
+                    params[name] = validators[name](value)
+                except TypeSystemError as e:
+                    errors[name] = e.detail
+        if errors:
+            raise TypeSystemError(errors, errors=errors)
+        return params
+
+
+def create_validation_plan(logic: Callable) -> ValidationPlan:
+    """Compiles a validation plan for a logic function.
+
+    :param logic: A logic function with the `_doctor_*` attributes added by
+        :class:`~doctor.routing.HTTPMethod`.
+    :returns: The validation plan.
+    """
+    sig = logic._doctor_signature
+    doctor_params = logic._doctor_params
+    req_obj_type = logic._doctor_req_obj_type
+    return_annotation = sig.return_annotation
+    if return_annotation == sig.empty:
+        return_annotation = None
+
+    param_names = {}
+    param_types = {}
+    coercers = {}
+    validators = {}
+    for name, param in sig.parameters.items():
+        annotation = param.annotation
+        param_name = getattr(annotation, 'param_name', None)
+        param_names[name] = name if param_name is None else param_name
+        param_types[param_names[name]] = annotation
+        coerce = get_param_coercer(annotation)
+        if coerce is not None:
+            coercers[name] = coerce
+        validators[name] = _create_validator(annotation)
+    if req_obj_type is not None:
+        validators['__all__'] = _create_validator(req_obj_type)
+
+    return ValidationPlan(
+        req_obj_type=req_obj_type,
+        param_names=MappingProxyType(param_names),
+        all_params=frozenset(doctor_params.all),
+        logic_params=frozenset(doctor_params.logic),
+        required=frozenset(doctor_params.required),
+        required_order=tuple(doctor_params.required),
+        coercers=MappingProxyType(coercers),
+        validators=MappingProxyType(validators),
+        return_annotation=return_annotation,
+        response_type=get_response_type(return_annotation),
+        body_limits=getattr(logic, '_doctor_body_limits', None),
+        body_type=(MappingProxyType(param_types) if req_obj_type is None
+                   else req_obj_type),
+        response_validation=getattr(
+            logic, '_doctor_response_validation', None),
+        response_cache=getattr(logic, '_doctor_response_cache', None),
+        etag=getattr(logic, '_doctor_etag', False))
+
+
+def get_validation_plan(logic: Callable) -> ValidationPlan:
+    """Gets the validation plan for a logic function.
+
+    Routes created with :func:`~doctor.routing.create_routes` have their plan
+    compiled ahead of time.  For any other logic function a plan is compiled
+    on the fly.
+
+    :param logic: The logic function.
+    :returns: The validation plan.
+    """
+    plan = getattr(logic, '_doctor_validation_plan', None)
+    if plan is None:
+        plan = create_validation_plan(logic)
+    return plan
@@ -0,0 +1,297 @@
+"""
+Attributes the cost of validation to individual doctor types.
+
+cProfile shows the time spent validating values in the `__new__` and
+`__init__` methods shared by every type, so it can't tell which type is
+slow.  While profiling is enabled, every instantiation of a
+:class:`~doctor.types.SuperType` subclass records its call count and its
+self and cumulative time under the type class that was instantiated.
+
+Profiling works by replacing the methods that validate values when it is
+enabled and restoring them when it is disabled, so it costs nothing while
+disabled.
+
+>>> from doctor import profiling
+>>> from doctor.types import integer
+>>> ItemId = integer('An item ID.')
+>>> profiling.enable()
+>>> ItemId('1')
+1
+>>> profiling.disable()
+>>> [(p.label, p.calls) for p in profiling.get_report()]
+[('Integer: An item ID.', 1)]
+>>> profiling.reset()
+"""
+import marshal
+import pstats
+import threading
+import time
+from typing import (
+    Any, Callable, Dict, Iterator, List, NamedTuple, Optional)
+
+from .types import (Array, Boolean, Enum, JsonSchema, Object, String,
+                    UnionType, _NumericType)
+
+
+class TypeProfile(NamedTuple):
+    """The profile of a type.
+
+    :param type: The type class.
+    :param label: A label for the type, made of its name and description.
+    :param calls: The number of times the type was instantiated.
+    :param self_time: The time spent in the type itself, excluding other
+        types it instantiated, in seconds.
+    :param cumulative_time: The time spent in the type including other types
+        it instantiated, in seconds.  Recursive instantiations aren't counted
+        twice.
+    """
+    type: type
+    label: str
+    calls: int
+    self_time: float
+    cumulative_time: float
+
+
+class _TypeStats(object):
+    __slots__ = ('calls', 'primitive_calls', 'self_time', 'cumulative_time',
+                 'callers')
+
+    def __init__(self):
+        self.calls = 0
+        self.primitive_calls = 0
+        self.self_time = 0.0
+        self.cumulative_time = 0.0
+        #: Maps a caller type to [primitive calls, calls, self, cumulative].
+        self.callers: Dict[type, List] = {}
+
+
+_lock = threading.Lock()
+_local = threading.local()
+_stats: Dict[type, _TypeStats] = {}
+
+
+def _profile_call(cls: type, func: Callable, args: tuple, kwargs: dict):
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    # The type and the time spent in types it instantiates.
+    frame = [cls, 0.0]
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        caller = None
+        if stack:
+            stack[-1][1] += elapsed
+            caller = stack[-1][0]
+        recursive = any(f[0] is cls for f in stack)
+        self_time = elapsed - frame[1]
+        with _lock:
+            stats = _stats.get(cls)
+            if stats is None:
+                stats = _stats[cls] = _TypeStats()
+            stats.calls += 1
+            stats.self_time += self_time
+            if not recursive:
+                stats.primitive_calls += 1
+                stats.cumulative_time += elapsed
+            if caller is not None:
+                counts = stats.callers.get(caller)
+                if counts is None:
+                    counts = stats.callers[caller] = [0, 0, 0.0, 0.0]
+                if not recursive:
+                    counts[0] += 1
+                    counts[3] += elapsed
+                counts[1] += 1
+                counts[2] += self_time
+
+
+def _wrap_new(original: staticmethod) -> staticmethod:
+    func = original.__func__
+
+    def __new__(cls, *args, **kwargs):
+        return _profile_call(cls, func, (cls,) + args, kwargs)
+    __new__._profiled = original
+    return staticmethod(__new__)
+
+
+def _wrap_init(original: Callable) -> Callable:
+    def __init__(self, *args, **kwargs):
+        return _profile_call(
+            self.__class__, original, (self,) + args, kwargs)
+    __init__._profiled = original
+    return __init__
+
+
+def _wrap_resolve(original: classmethod) -> classmethod:
+    func = original.__func__
+
+    def _resolve(cls, args, kwargs):
+        return _profile_call(cls, func, (cls, args, kwargs), {})
+    _resolve._profiled = original
+    return classmethod(_resolve)
+
+
+#: The methods that are profiled.  UnionType values are resolved by
+#: `_resolve`, which is also used by `UnionType.resolve`.
+_PATCHES = (
+    (String, '__new__', _wrap_new),
+    (_NumericType, '__new__', _wrap_new),
+    (Boolean, '__new__', _wrap_new),
+    (Enum, '__new__', _wrap_new),
+    (JsonSchema, '__new__', _wrap_new),
+    (Object, '__init__', _wrap_init),
+    (Array, '__init__', _wrap_init),
+    (UnionType, '_resolve', _wrap_resolve),
+)
+
+_enabled = False
+
+
+def _get_function(method: Any) -> Any:
+    return getattr(method, '__func__', method)
+
+
+def _iter_subclasses(cls: type) -> Iterator[type]:
+    """Yields a class and all of its subclasses."""
+    yield cls
+    for subclass in cls.__subclasses__():
+        yield from _iter_subclasses(subclass)
+
+
+def enable():
+    """Enables profiling.  Does nothing if it is already enabled.
+
+    Types created with :func:`~doctor.types.new_type` get a copy of the
+    methods of the type they are based on, so the methods of existing types
+    are replaced as well.  Types created while profiling is enabled are
+    profiled too.
+    """
+    global _enabled
+    with _lock:
+        if _enabled:
+            return
+        for base, name, wrap in _PATCHES:
+            original = base.__dict__[name]
+            wrapped = wrap(original)
+            func = _get_function(original)
+            for cls in _iter_subclasses(base):
+                method = cls.__dict__.get(name)
+                # Overridden methods call the profiled method with super().
+                if method is not None and _get_function(method) is func:
+                    setattr(cls, name, wrapped)
+        _enabled = True
+
+
+def disable():
+    """Disables profiling.  The collected profiles are kept."""
+    global _enabled
+    with _lock:
+        for base, name, wrap in _PATCHES:
+            for cls in _iter_subclasses(base):
+                method = cls.__dict__.get(name)
+                original = getattr(_get_function(method), '_profiled', None)
+                if original is not None:
+                    setattr(cls, name, original)
+        _enabled = False
+
+
+def is_enabled() -> bool:
+    """Returns True if profiling is enabled."""
+    return _enabled
+
+
+def reset():
+    """Removes the collected profiles."""
+    with _lock:
+        _stats.clear()
+
+
+def _get_labels() -> Dict[type, str]:
+    """Returns a unique label for each profiled type."""
+    labels = {}
+    used = set()
+    for cls in _stats:
+        label = cls.__name__
+        description = getattr(cls, 'description', None)
+        if description:
+            label = '{}: {}'.format(label, description)
+        unique_label = label
+        count = 1
+        while unique_label in used:
+            count += 1
+            unique_label = '{} #{}'.format(label, count)
+        used.add(unique_label)
+        labels[cls] = unique_label
+    return labels
+
+
+def get_report() -> List[TypeProfile]:
+    """Returns the profile of each type, most cumulative time first."""
+    with _lock:
+        labels = _get_labels()
+        report = [
+            TypeProfile(cls, labels[cls], stats.calls, stats.self_time,
+                        stats.cumulative_time)
+            for cls, stats in _stats.items()]
+    report.sort(key=lambda p: p.cumulative_time, reverse=True)
+    return report
+
+
+def format_report(limit: Optional[int] = None) -> str:
+    """Formats the profile of each type as a table.
+
+    :param limit: The maximum number of types to include.
+    :returns: The table.
+    """
+    lines = ['{:>8} {:>12} {:>12}  {}'.format(
+        'calls', 'self (s)', 'cumul (s)', 'type')]
+    for profile in get_report()[:limit]:
+        lines.append('{:>8} {:>12.6f} {:>12.6f}  {}'.format(
+            profile.calls, profile.self_time, profile.cumulative_time,
+            profile.label))
+    return '\n'.join(lines)
+
+
+def _get_pstats_dict() -> Dict:
+    with _lock:
+        labels = _get_labels()
+
+        def key(cls):
+            return (cls.__module__, 0, labels[cls])
+
+        return {
+            key(cls): (
+                stats.primitive_calls, stats.calls, stats.self_time,
+                stats.cumulative_time,
+                {key(caller): tuple(counts)
+                 for caller, counts in stats.callers.items()})
+            for cls, stats in _stats.items()}
+
+
+class _ProfileStats(object):
+    """Adapts the profiles for :class:`pstats.Stats`."""
+
+    def create_stats(self):
+        self.stats = _get_pstats_dict()
+
+
+def get_stats() -> pstats.Stats:
+    """Returns the profiles as a :class:`pstats.Stats` instance.
+
+    Each type is reported as a function named after its label, and the types
+    that instantiated it are its callers.
+    """
+    return pstats.Stats(_ProfileStats())
+
+
+def dump_stats(filename: str):
+    """Writes the profiles to a file that can be loaded by :mod:`pstats`.
+
+    :param filename: The file to write to.
+    """
+    with open(filename, 'wb') as f:
+        marshal.dump(_get_pstats_dict(), f)
@@ -1,4 +1,5 @@
-from typing import Generic, TypeVar
+import os
+from typing import Generic, NamedTuple, Optional, TypeVar
 
 
 #: A type variable to represent the type of content of a `Response`.
@@ -23,3 +24,126 @@ class Response(Generic[CT]):
         self.content = content
         self.headers = headers
         self.status_code = status_code
+
+
+def should_raise_response_validation_errors() -> bool:
+    """Returns if the library should raise response validation errors or not.
+
+    If the environment variable `RAISE_RESPONSE_VALIDATION_ERRORS` is set,
+    it will return True.
+
+    :returns: True if it should, False otherwise.
+    """
+    return bool(os.environ.get('RAISE_RESPONSE_VALIDATION_ERRORS', False))
+
+
+#: Responses aren't validated.
+RESPONSE_VALIDATION_OFF = 'off'
+#: A random sample of responses are fully validated.
+RESPONSE_VALIDATION_SAMPLED = 'sampled'
+#: Only the top level shape of responses is validated.  For objects this is
+#: the type, required properties and additional properties.  For arrays this
+#: is the type and number of items.
+RESPONSE_VALIDATION_SHALLOW = 'shallow'
+#: Responses are fully validated.
+RESPONSE_VALIDATION_FULL = 'full'
+
+RESPONSE_VALIDATION_MODES = (
+    RESPONSE_VALIDATION_OFF, RESPONSE_VALIDATION_SAMPLED,
+    RESPONSE_VALIDATION_SHALLOW, RESPONSE_VALIDATION_FULL)
+
+
+class ResponseValidation(NamedTuple):
+    """How the responses of logic functions are validated.
+
+    :param mode: One of the `RESPONSE_VALIDATION_*` modes.
+    :param sample_rate: The fraction of responses validated in the sampled
+        mode, from 0 to 1.
+    """
+    mode: str = RESPONSE_VALIDATION_FULL
+    sample_rate: float = 0.1
+
+
+def check_response_validation(validation: ResponseValidation):
+    """Checks the mode and sample rate of a response validation.
+
+    :param validation: The response validation.
+    :raises ValueError: If the mode or sample rate is invalid.
+    """
+    if validation.mode not in RESPONSE_VALIDATION_MODES:
+        raise ValueError(
+            'Invalid response validation mode {!r}.  Must be one of: '
+            '{}'.format(validation.mode, ', '.join(RESPONSE_VALIDATION_MODES)))
+    if not 0 <= validation.sample_rate <= 1:
+        raise ValueError('Response validation sample rate must be between 0 '
+                         'and 1.')
+
+
+_response_validation: Optional[ResponseValidation] = None
+#: The response validation read from the environment variables, cached the
+#: first time it's needed.
+_env_response_validation: Optional[ResponseValidation] = None
+_FULL = ResponseValidation()
+
+
+def set_response_validation(validation: Optional[ResponseValidation]):
+    """Sets how responses are validated for routes that don't specify it.
+
+    :param validation: The response validation, or None to read the
+        environment variables again.
+    :raises ValueError: If the mode or sample rate is invalid.
+    """
+    global _env_response_validation, _response_validation
+    if validation is not None:
+        check_response_validation(validation)
+    _response_validation = validation
+    _env_response_validation = None
+
+
+def get_env_response_validation() -> ResponseValidation:
+    """Returns the response validation set by the environment variables.
+
+    The mode is read from the environment variable `RESPONSE_VALIDATION_MODE`
+    and the sample rate from `RESPONSE_VALIDATION_SAMPLE_RATE`.  They are
+    only read and checked the first time this is called, which happens when
+    routes are created, so invalid values fail at startup.  Responses are
+    fully validated if the mode isn't set.
+
+    :returns: The response validation.
+    :raises ValueError: If the mode or sample rate is invalid.
+    """
+    global _env_response_validation
+    if _env_response_validation is not None:
+        return _env_response_validation
+    mode = os.environ.get('RESPONSE_VALIDATION_MODE')
+    if not mode:
+        validation = _FULL
+    else:
+        sample_rate = os.environ.get('RESPONSE_VALIDATION_SAMPLE_RATE')
+        if sample_rate:
+            try:
+                sample_rate = float(sample_rate)
+            except ValueError:
+                raise ValueError(
+                    'Invalid response validation sample rate {!r}.  Must be '
+                    'a number between 0 and 1.'.format(sample_rate))
+            validation = ResponseValidation(mode, sample_rate)
+        else:
+            validation = ResponseValidation(mode)
+        check_response_validation(validation)
+    _env_response_validation = validation
+    return validation
+
+
+def get_response_validation() -> ResponseValidation:
+    """Returns how responses are validated for routes that don't specify it.
+
+    Unless :func:`set_response_validation` was called, this is
+    :func:`get_env_response_validation`.
+
+    :returns: The response validation.
+    :raises ValueError: If the environment variables are invalid.
+    """
+    if _response_validation is not None:
+        return _response_validation
+    return get_env_response_validation()
@@ -1,20 +1,46 @@
 import functools
 import inspect
+import threading
 from typing import Any, Callable, List, Sequence, Tuple
 
+from doctor.batch import Batch, check_batch, get_batch_route
+from doctor.body import BodyLimits
+from doctor.cache import ResponseCache, check_response_cache
+from doctor.compression import Compression
+from doctor.etag import ETagOption, check_etag
+from doctor.plan import create_validation_plan
+from doctor.response import (
+    ResponseValidation, check_response_validation, get_response_validation)
 from doctor.utils import copy_func, get_params_from_func, get_valid_class_name
 
 
 class HTTPMethod(object):
     """Represents and HTTP method and it's configuration.
 
-    When instantiated the logic attribute will have 3 attributes added to it:
+    When instantiated the logic attribute will have these attributes added
+    to it:
         - `_doctor_allowed_exceptions` - A list of excpetions that are allowed
           to be re-reaised if encountered during a request.
+        - `_doctor_batch` - The :class:`~doctor.batch.Batch` of the batch
+          endpoint, if any.
+        - `_doctor_body_limits` - The :class:`~doctor.body.BodyLimits` for
+          JSON request bodies, if any.
+        - `_doctor_etag` - The `etag` option.
         - `_doctor_params` - A :class:`~doctor.utils.Params` instance.
+        - `_doctor_req_obj_type` - The type the request body is converted to,
+          if any.
+        - `_doctor_response_cache` - The
+          :class:`~doctor.cache.ResponseCache` for responses, if any.
+        - `_doctor_response_validation` - The
+          :class:`~doctor.response.ResponseValidation` for responses, if any.
         - `_doctor_signature` - The parsed function Signature.
         - `_doctor_title` - The title that should be used in api documentation.
 
+    :func:`create_routes` also adds `_doctor_compression`, the
+    :class:`~doctor.compression.Compression` of the route, `_doctor_route`,
+    the route path, and `_doctor_validation_plan`, the compiled
+    :class:`~doctor.plan.ValidationPlan`.
+
     :param method: The HTTP method.  One of: (delete, get, post, put).
     :param logic: The logic function to be called for the http method.
     :param allowed_exceptions: If specified, these exception classes will be
@@ -23,10 +49,39 @@ class HTTPMethod(object):
         when generating api documentation.
     :param req_obj_type: A doctor :class:`~doctor.types.Object` type that the
         request body should be converted to.
+    :param body_limits: A :class:`~doctor.body.BodyLimits` instance.  If
+        specified, JSON request bodies are checked against the limits before
+        they are parsed.
+    :param response_validation: A
+        :class:`~doctor.response.ResponseValidation` instance.  If specified,
+        it overrides how responses are validated for this http method.
+    :param response_cache: A :class:`~doctor.cache.ResponseCache` instance.
+        If specified, responses are cached by the validated request params.
+    :param etag: If True, successful responses get an `ETag` header and
+        requests with a matching `If-None-Match` header get a 304 response.
+        It can also be a callable that takes the same params as the logic
+        function and returns a version token the ETag is made from.  See
+        :mod:`doctor.etag`.  Only supported for GET.
+    :param batch: A :class:`~doctor.batch.Batch` instance.  If specified,
+        :func:`create_routes` creates a batch endpoint for the http method.
+    :raises ValueError: If the response validation is invalid, the
+        response cache doesn't allow caching the method or the etag option
+        is invalid.
     """
     def __init__(self, method: str, logic: Callable,
                  allowed_exceptions: List = None, title: str = None,
-                 req_obj_type: Callable = None):
+                 req_obj_type: Callable = None,
+                 body_limits: BodyLimits = None,
+                 response_validation: ResponseValidation = None,
+                 response_cache: ResponseCache = None,
+                 etag: ETagOption = False, batch: Batch = None):
+        if response_validation is not None:
+            check_response_validation(response_validation)
+        if response_cache is not None:
+            check_response_cache(method, response_cache)
+        check_etag(method, etag)
+        if batch is not None:
+            check_batch(batch)
         self.method = method
         logic = copy_func(logic)
 
@@ -41,48 +96,85 @@ class HTTPMethod(object):
         if not hasattr(logic, '_doctor_params'):
             logic._doctor_params = get_params_from_func(logic)
         logic._doctor_allowed_exceptions = allowed_exceptions
+        logic._doctor_batch = batch
+        logic._doctor_body_limits = body_limits
+        logic._doctor_etag = etag
+        logic._doctor_response_cache = response_cache
+        logic._doctor_response_validation = response_validation
         logic._doctor_title = title
         self.logic = logic
 
 
 def delete(func: Callable, allowed_exceptions: List = None,
-           title: str = None, req_obj_type: Callable = None) -> HTTPMethod:
+           title: str = None, req_obj_type: Callable = None,
+           body_limits: BodyLimits = None,
+           response_validation: ResponseValidation = None,
+           response_cache: ResponseCache = None,
+           etag: ETagOption = False, batch: Batch = None) -> HTTPMethod:
     """Returns a HTTPMethod instance to create a DELETE route.
 
     :see: :class:`~doctor.routing.HTTPMethod`
     """
     return HTTPMethod('delete', func, allowed_exceptions=allowed_exceptions,
-                      title=title, req_obj_type=req_obj_type)
+                      title=title, req_obj_type=req_obj_type,
+                      body_limits=body_limits,
+                      response_validation=response_validation,
+                      response_cache=response_cache, etag=etag,
+                      batch=batch)
 
 
 def get(func: Callable, allowed_exceptions: List = None,
-        title: str = None, req_obj_type: Callable = None) -> HTTPMethod:
+        title: str = None, req_obj_type: Callable = None,
+        body_limits: BodyLimits = None,
+        response_validation: ResponseValidation = None,
+        response_cache: ResponseCache = None,
+        etag: ETagOption = False, batch: Batch = None) -> HTTPMethod:
     """Returns a HTTPMethod instance to create a GET route.
 
     :see: :class:`~doctor.routing.HTTPMethod`
     """
     return HTTPMethod('get', func, allowed_exceptions=allowed_exceptions,
-                      title=title, req_obj_type=req_obj_type)
+                      title=title, req_obj_type=req_obj_type,
+                      body_limits=body_limits,
+                      response_validation=response_validation,
+                      response_cache=response_cache, etag=etag,
+                      batch=batch)
 
 
 def post(func: Callable, allowed_exceptions: List = None,
-         title: str = None, req_obj_type: Callable = None) -> HTTPMethod:
+         title: str = None, req_obj_type: Callable = None,
+         body_limits: BodyLimits = None,
+         response_validation: ResponseValidation = None,
+         response_cache: ResponseCache = None,
+         etag: ETagOption = False, batch: Batch = None) -> HTTPMethod:
     """Returns a HTTPMethod instance to create a POST route.
 
     :see: :class:`~doctor.routing.HTTPMethod`
     """
     return HTTPMethod('post', func, allowed_exceptions=allowed_exceptions,
-                      title=title, req_obj_type=req_obj_type)
+                      title=title, req_obj_type=req_obj_type,
+                      body_limits=body_limits,
+                      response_validation=response_validation,
+                      response_cache=response_cache, etag=etag,
+                      batch=batch)
 
 
 def put(func: Callable, allowed_exceptions: List = None,
-        title: str = None, req_obj_type: Callable = None) -> HTTPMethod:
+        title: str = None, req_obj_type: Callable = None,
+        body_limits: BodyLimits = None,
+        response_validation: ResponseValidation = None,
+        response_cache: ResponseCache = None,
+        etag: ETagOption = False, batch: Batch = None) -> HTTPMethod:
     """Returns a HTTPMethod instance to create a PUT route.
 
     :see: :class:`~doctor.routing.HTTPMethod`
     """
     return HTTPMethod('put', func, allowed_exceptions=allowed_exceptions,
-                      title=title, req_obj_type=req_obj_type)
+                      title=title, req_obj_type=req_obj_type,
+                      body_limits=body_limits,
+                      response_validation=response_validation,
+                      response_cache=response_cache, etag=etag,
+                      batch=batch)
 
 
 def create_http_method(logic: Callable, http_method: str,
@@ -99,8 +191,20 @@ def create_http_method(logic: Callable, http_method: str,
         with the route.
     :param after: A function to be called after the logic function associated
         with the route.
-    :returns: A handler function.
+    :returns: A handler function.  If `handle_http` is a coroutine function
+        the handler function is one as well.
     """
+    if inspect.iscoroutinefunction(handle_http):
+        @functools.wraps(logic)
+        async def async_fn(handler, *args, **kwargs):
+            if before is not None and callable(before):
+                before()
+            result = await handle_http(handler, args, kwargs, logic)
+            if after is not None and callable(after):
+                after(result)
+            return result
+        return async_fn
+
     @functools.wraps(logic)
     def fn(handler, *args, **kwargs):
         if before is not None and callable(before):
@@ -126,14 +230,18 @@ class Route(object):
         with the route.
     :param after: A function to be called after the logic function associated
         with the route.
+    :param compression: A :class:`~doctor.compression.Compression` instance.
+        If specified, response bodies are compressed with an encoding
+        accepted by the client.
     """
     def __init__(self, route: str, methods: Sequence[HTTPMethod],
                  heading: str = 'API', base_handler_class = None,
                  handler_name: str = None, before: Callable = None,
-                 after: Callable = None):
+                 after: Callable = None, compression: Compression = None):
         self.after = after
         self.base_handler_class = base_handler_class
         self.before = before
+        self.compression = compression
         self.handler_name = handler_name
         self.heading = heading
         self.methods = methods
@@ -159,6 +267,50 @@ def get_handler_name(route: Route, logic: Callable) -> str:
     return '{}Handler'.format(get_valid_class_name(logic.__name__))
 
 
+def create_batch_route(route: Route, method: HTTPMethod, handler_name: str,
+                       handle_http: Callable,
+                       base_handler_class: Any) -> Tuple[str, Any]:
+    """Creates the handler of the batch endpoint of an http method.
+
+    The logic function is copied and the copy gets a `_doctor_batch_method`
+    attribute, the HTTP method of the logic function, which tells
+    `handle_http` to handle requests to it as batch requests.  It also gets
+    a `_doctor_batch_logic` attribute, the function passed to the http
+    method, which is what the batch's executor calls, and a
+    `_doctor_batch_semaphore` if the batch has a `max_concurrency`.
+
+    :param route: The route of the http method.
+    :param method: The http method.
+    :param handler_name: The name of the route's handler class.
+    :param handle_http: The HTTP handler function that should be
+        used to wrap the logic functions.
+    :param base_handler_class: The base handler class that should be used.
+    :returns: A tuple of the batch route and its handler.
+    """
+    batch = method.logic._doctor_batch
+    batch_route = get_batch_route(route.route, batch)
+    logic = copy_func(method.logic)
+    logic._doctor_batch_method = method.method.upper()
+    # method.logic is a copy made by HTTPMethod, which can't be pickled for a
+    # process pool executor, so the executor calls the original function.
+    logic._doctor_batch_logic = method.logic.__wrapped__
+    logic._doctor_batch_semaphore = None
+    if batch.max_concurrency is not None:
+        logic._doctor_batch_semaphore = threading.BoundedSemaphore(
+            batch.max_concurrency)
+    logic._doctor_route = batch_route
+    http_func = create_http_method(logic, 'post', handle_http,
+                                   before=route.before, after=route.after)
+    name = '{}{}Batch'.format(handler_name, method.method.capitalize())
+    handler = type(name, (base_handler_class,), {
+        '__name__': name,
+        '_doctor_heading': route.heading,
+        'methods': set(['POST']),
+        'post': http_func,
+    })
+    return batch_route, handler
+
+
 def create_routes(routes: Sequence[HTTPMethod], handle_http: Callable,
                   default_base_handler_class: Any) -> List[Tuple[str, Any]]:
     """Creates handler routes from the provided routes.
@@ -170,7 +322,14 @@ def create_routes(routes: Sequence[HTTPMethod], handle_http: Callable,
     :param default_base_handler_class: The default base handler class that
         should be used.
     :returns: A list of tuples containing the route and generated handler.
+        The batch endpoints of http methods with a
+        :class:`~doctor.batch.Batch` follow the route they belong to.
+    :raises ValueError: If the response validation environment variables
+        are invalid.
     """
+    # Read the default response validation now so invalid environment
+    # variables fail at startup instead of on every request.
+    get_response_validation()
     created_routes = []
     all_handler_names = []
     for r in routes:
@@ -192,6 +351,11 @@ def create_routes(routes: Sequence[HTTPMethod], handle_http: Callable,
         for method in r.methods:
             logic = method.logic
             http_method = method.method
+            logic._doctor_compression = r.compression
+            logic._doctor_route = r.route
+            # Compile everything needed to validate a request up front so it
+            # doesn't need to be re-computed on every request.
+            logic._doctor_validation_plan = create_validation_plan(logic)
             http_func = create_http_method(logic, http_method, handle_http,
                                            before=r.before, after=r.after)
 
@@ -214,4 +378,8 @@ def create_routes(routes: Sequence[HTTPMethod], handle_http: Callable,
                 if hasattr(handler, 'methods'):
                     handler.methods.add(http_method.upper())
         created_routes.append((r.route, handler))
+        for method in r.methods:
+            if method.logic._doctor_batch is not None:
+                created_routes.append(create_batch_route(
+                    r, method, handler_name, handle_http, base_handler_class))
     return created_routes
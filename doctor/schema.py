@@ -2,11 +2,9 @@ import logging
 import os
 
 import jsonschema
-import yaml
 from jsonschema.compat import urldefrag
 
-from .errors import (
-    DoctorError, SchemaError, SchemaLoadingError, SchemaValidationError)
+from .errors import SchemaError, SchemaLoadingError, SchemaValidationError
 from .parsers import parse_json
 
 
@@ -96,6 +94,7 @@ class SchemaRefResolver(jsonschema.RefResolver):
         :returns: the retrieved document
         """
         if uri.startswith('file://'):
+            import yaml
             try:
                 path = uri[7:]
                 with open(path, 'r') as schema_file:
@@ -177,24 +176,21 @@ class Schema(object):
         :raises SchemaValidationError:
         :raises Exception:
         """
-        try:
-            validator.validate(value)
-        except Exception as e:
-            logging.debug(e, exc_info=e)
-            if isinstance(e, DoctorError):
-                raise
-            else:
-                # Gather all the validation errors
-                validation_errors = sorted(
-                    validator.iter_errors(value), key=lambda e: e.path)
-                errors = {}
-                for error in validation_errors:
-                    try:
-                        key = error.path[0]
-                    except IndexError:
-                        key = '_other'
-                    errors[key] = error.args[0]
-                raise SchemaValidationError(e.args[0], errors=errors)
+        # Collect all of the validation errors in a single pass.  This is
+        # equivalent to calling validator.validate(value), which raises the
+        # first error, without walking the value again to gather the rest.
+        validation_errors = list(validator.iter_errors(value))
+        if validation_errors:
+            error = validation_errors[0]
+            logging.debug(error, exc_info=error)
+            errors = {}
+            for e in sorted(validation_errors, key=lambda e: e.path):
+                try:
+                    key = e.path[0]
+                except IndexError:
+                    key = '_other'
+                errors[key] = e.args[0]
+            raise SchemaValidationError(error.args[0], errors=errors)
         return value
 
     def validate_json(self, json_value, validator):
@@ -223,6 +219,9 @@ class Schema(object):
         :returns: an instance of the class.
         :raises SchemaLoadingError: for invalid input files.
         """
+        # yaml is imported when it's first needed, since schemas created from
+        # dicts don't use it.
+        import yaml
         schema_filepath = os.path.abspath(schema_filepath)
         try:
             with open(schema_filepath, 'r') as schema_file:
@@ -35,9 +35,6 @@ import typing
 from datetime import datetime
 from typing import Any
 
-import isodate
-import rfc3987
-
 from doctor.errors import SchemaError, SchemaValidationError, TypeSystemError
 from doctor.parsers import parse_value
 
@@ -127,35 +124,80 @@ class UnionType(SuperType):
     #: A list of allowed types.
     types = []
 
+    #: If True, the types whose native type is the python type of the value
+    #: are tried before the other types.  e.g. for `types = [String, Integer]`
+    #: the value `1` resolves to the Integer type instead of the String type.
+    dispatch_on_type = False  # type: bool
+
     _native_type = None
 
     def __new__(cls, *args, **kwargs):
+        obj_class, value = cls._resolve(args, kwargs)
+        # Dynamically change the native_type based on that of the value.
+        cls._native_type = obj_class.native_type
+        return value
+
+    @classmethod
+    def resolve(cls, value: Any) -> typing.Tuple[type, Any]:
+        """Resolves which of the `types` a value is.
+
+        Unlike instantiating the type, this doesn't change the `native_type`
+        of the class, so it is safe to use from multiple threads.
+
+        :param value: The value.
+        :returns: A tuple of the type and the value returned by it.  If the
+            type is itself a UnionType, the type it resolved to is returned.
+        :raises TypeSystemError: If the value isn't any of the types or
+            fails validation.
+        """
+        return cls._resolve((value,), {})
+
+    @classmethod
+    def _resolve(cls, args: tuple, kwargs: dict) -> typing.Tuple[type, Any]:
         if not cls.types:
             raise TypeSystemError(
                 'Sub-class must define a `types` list attribute containing at '
                 'least 1 type.', cls=cls)
 
-        valid = False
-        value = None
-        errors = {}
-        for obj_class in cls.types:
+        candidates = cls.types
+        if cls.dispatch_on_type and len(args) == 1:
+            candidates = cls._get_candidates(type(args[0]))
+
+        # Errors are only formatted if the value isn't any of the types.
+        failures = None
+        for obj_class in candidates:
             try:
-                value = obj_class(*args, **kwargs)
-                valid = True
-                # Dynamically change the native_type based on that of the value.
-                cls._native_type = obj_class.native_type
-                break
+                if issubclass(obj_class, UnionType):
+                    obj_class, value = obj_class._resolve(args, kwargs)
+                else:
+                    value = obj_class(*args, **kwargs)
             except TypeSystemError as e:
-                errors[obj_class.__name__] = str(e)
+                if failures is None:
+                    failures = []
+                failures.append((obj_class, e))
                 continue
+            cls.validate(value)
+            return obj_class, value
 
-        if not valid:
-            klasses = [klass.__name__ for klass in cls.types]
-            raise TypeSystemError('Value is not one of {}. {}'.format(
-                klasses, errors))
+        klasses = [klass.__name__ for klass in cls.types]
+        errors = {klass.__name__: str(e) for klass, e in failures}
+        raise TypeSystemError('Value is not one of {}. {}'.format(
+            klasses, errors))
 
-        cls.validate(value)
-        return value
+    @classmethod
+    def _get_candidates(cls, value_type: type) -> typing.List[type]:
+        """Returns the types in the order they are tried for a python type."""
+        # The table is cached per class and rebuilt if `types` is replaced.
+        table = cls.__dict__.get('_dispatch_table')
+        if table is None or table[0] is not cls.types:
+            table = (cls.types, {})
+            cls._dispatch_table = table
+        candidates = table[1].get(value_type)
+        if candidates is None:
+            exact = [t for t in cls.types if t.native_type is value_type]
+            candidates = exact + [t for t in cls.types if t not in exact]
+            table[1][value_type] = candidates
+        return candidates
 
     @classmethod
     def get_example(cls):
@@ -215,6 +257,10 @@ class String(SuperType, str):
     #: Whether to trim whitespace on a string.  Defaults to `True`.
     trim_whitespace = True
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.get_pattern()
+
     def __new__(cls, *args, **kwargs):
         if cls.nullable and args[0] is None:
             return None
@@ -236,7 +282,7 @@ class String(SuperType, str):
                 raise TypeSystemError(cls=cls, code='max_length')
 
         if cls.pattern is not None:
-            if not re.search(cls.pattern, value):
+            if not cls.get_pattern().search(value):
                 raise TypeSystemError(cls=cls, code='pattern')
 
         # Validate format, if specified
@@ -246,6 +292,9 @@ class String(SuperType, str):
             except ValueError as e:
                 raise TypeSystemError(str(e), cls=cls)
         elif cls.format == 'date-time':
+            # isodate and rfc3987 are imported when they're first needed to
+            # keep them out of the import time of doctor.
+            import isodate
             try:
                 value = isodate.parse_datetime(value)
             except (ValueError, isodate.ISO8601Error) as e:
@@ -259,6 +308,7 @@ class String(SuperType, str):
             except ValueError as e:
                 raise TypeSystemError(str(e), cls=cls)
         elif cls.format == 'uri':
+            import rfc3987
             try:
                 rfc3987.parse(value, rule='URI')
             except ValueError as e:
@@ -273,6 +323,23 @@ class String(SuperType, str):
         cls.validate(value)
         return value
 
+    @classmethod
+    def get_pattern(cls) -> typing.Optional[typing.Pattern]:
+        """Returns the compiled `pattern`.
+
+        The pattern is compiled when the class is created and compiled again
+        only if `pattern` is changed.
+
+        :returns: The compiled pattern or None if the type has no pattern.
+        """
+        if cls.pattern is None:
+            return None
+        compiled = cls.__dict__.get('_compiled_pattern')
+        if compiled is None or compiled[0] != cls.pattern:
+            compiled = (cls.pattern, re.compile(cls.pattern))
+            cls._compiled_pattern = compiled
+        return compiled[1]
+
     @classmethod
     def get_example(cls) -> str:
         """Returns an example value for the String type."""
@@ -434,26 +501,57 @@ class Enum(SuperType, str):
     #: If True the input value will be uppercased before validation.
     uppercase_value = False
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.get_enum_values()
+
     def __new__(cls, value: typing.Union[None, str]):
         if cls.nullable and value is None:
             return None
 
-        if cls.case_insensitive:
-            if cls.uppercase_value:
-                cls.enum = [v.upper() for v in cls.enum]
-            else:
-                cls.enum = [v.lower() for v in cls.enum]
-                value = value.lower()
+        if cls.case_insensitive and not cls.uppercase_value:
+            value = value.lower()
         if cls.lowercase_value:
             value = value.lower()
         if cls.uppercase_value:
             value = value.upper()
-        if value not in cls.enum:
+        try:
+            valid = value in cls.get_enum_values()
+        except TypeError:
+            # Unhashable values, e.g. lists, can't be in the enum.
+            valid = False
+        if not valid:
             raise TypeSystemError(cls=cls, code='invalid')
 
         cls.validate(value)
         return value
 
+    @classmethod
+    def get_enum_values(cls) -> typing.FrozenSet[str]:
+        """Returns the set of allowed values.
+
+        If the enum is case insensitive the values are lowercased, or
+        uppercased if `uppercase_value` is set.  The set is created when the
+        class is created and created again only if `enum` is replaced or the
+        case options are changed.
+
+        :returns: The allowed values.
+        """
+        values = cls.__dict__.get('_enum_values')
+        if (values is None or values[0] is not cls.enum or
+                values[1] != cls.case_insensitive or
+                values[2] != cls.uppercase_value):
+            enum = cls.enum
+            if cls.case_insensitive:
+                if cls.uppercase_value:
+                    enum = [v.upper() for v in enum]
+                else:
+                    enum = [v.lower() for v in enum]
+            values = (cls.enum, cls.case_insensitive, cls.uppercase_value,
+                      frozenset(enum))
+            cls._enum_values = values
+        return values[3]
+
     @classmethod
     def get_example(cls) -> str:
         """Returns an example value for the Enum type."""
@@ -482,6 +580,9 @@ class Object(SuperType, dict):
     #: A mapping of property name to a list of other properties it requires
     #: when the property name is present.
     property_dependencies = {}  # type: typing.Dict[str, typing.List[str]]
+    #: If True requests are validated with a validator generated for this
+    #: type by :func:`~doctor.compiler.compile_type`.
+    compiled = False  # type: bool
 
     def __init__(self, *args, **kwargs):
         if self.nullable and args[0] is None:
@@ -560,6 +661,145 @@ class Object(SuperType, dict):
 
         self.validate(self.copy())
 
+    @classmethod
+    def validate_many(cls, records: typing.Iterable) -> typing.List[dict]:
+        """Validates a list of records against the type.
+
+        This is equivalent to instantiating the type for each record, but
+        each property is validated for all of the records at once and the
+        records are returned as plain dicts instead of instances of the type.
+        Properties that are objects are validated the same way.
+
+        >>> from doctor.types import integer, Object
+        >>> class Item(Object):
+        ...     description = 'An item.'
+        ...     properties = {'item_id': integer('The ID.')}
+        ...
+        >>> Item.validate_many([{'item_id': '1'}, {'item_id': 2}])
+        [{'item_id': 1}, {'item_id': 2}]
+
+        :param records: The records to validate.
+        :returns: A list of the validated records.
+        :raises TypeSystemError: If any of the records are invalid.  The
+            errors are keyed by a tuple of the index of the record and the
+            property, or `'__all__'` for errors with the record as a whole.
+        """
+        rows, row_errors = cls._validate_many(records)
+        if row_errors:
+            errors = {}
+            for index, detail in row_errors.items():
+                if isinstance(detail, dict):
+                    for key, message in detail.items():
+                        errors[(index, key)] = message
+                else:
+                    errors[(index, '__all__')] = detail
+            raise TypeSystemError(errors, errors=errors)
+        return rows
+
+    @classmethod
+    def _validate_many(cls, records: typing.Iterable) -> typing.Tuple[
+            typing.List[typing.Optional[dict]], typing.Dict[int, typing.Any]]:
+        """Validates records, returning the rows and the errors per row.
+
+        The error of a row is the same as the `detail` of the error raised
+        when instantiating the type with the record.
+        """
+        def message(code):
+            return TypeSystemError(cls=cls, code=code).detail
+
+        rows = []
+        row_errors = {}
+        for index, record in enumerate(records):
+            if record is None and cls.nullable:
+                rows.append(None)
+                continue
+            try:
+                row = dict(record)
+            except (TypeError, ValueError):
+                if hasattr(record, '__dict__'):
+                    row = dict(record.__dict__)
+                else:
+                    row_errors[index] = message('type')
+                    rows.append(None)
+                    continue
+            if any(not isinstance(key, str) for key in row):
+                row_errors[index] = message('invalid_key')
+                rows.append(None)
+                continue
+            rows.append(row)
+
+        # Validate the records one property at a time.
+        field_errors = {}
+        for key, child_schema in cls.properties.items():
+            has_default = hasattr(child_schema, 'default')
+            required = key in cls.required
+            is_object = (isinstance(child_schema, type) and
+                         issubclass(child_schema, Object))
+            positions = []
+            column = []
+            for index, row in enumerate(rows):
+                if row is None:
+                    continue
+                try:
+                    item = row[key]
+                except KeyError:
+                    if has_default:
+                        row[key] = child_schema.default
+                    elif required:
+                        field_errors.setdefault(index, {})[key] = message(
+                            'required')
+                    continue
+                if isinstance(item, child_schema):
+                    continue
+                if is_object:
+                    positions.append(index)
+                    column.append(item)
+                    continue
+                try:
+                    row[key] = child_schema(item)
+                except TypeSystemError as exc:
+                    field_errors.setdefault(index, {})[key] = exc.detail
+            if column:
+                values, child_errors = child_schema._validate_many(column)
+                for pos, index in enumerate(positions):
+                    if pos in child_errors:
+                        field_errors.setdefault(index, {})[key] = (
+                            child_errors[pos])
+                    else:
+                        rows[index][key] = values[pos]
+
+        if not cls.additional_properties:
+            properties = cls.properties
+            for index, row in enumerate(rows):
+                if row is None:
+                    continue
+                for key in row:
+                    if key not in properties:
+                        field_errors.setdefault(index, {})[key] = message(
+                            'additional_properties')
+
+        has_custom_validate = (
+            cls.validate.__func__ is not SuperType.validate.__func__)
+        err = 'Required properties {} for property `{}` are missing.'
+        for index, row in enumerate(rows):
+            if row is None:
+                continue
+            dependency_error = None
+            for prop, dependencies in cls.property_dependencies.items():
+                if prop in row and any(dep not in row for dep in dependencies):
+                    dependency_error = err.format(dependencies, prop)
+                    break
+            if dependency_error is not None:
+                row_errors[index] = dependency_error
+            elif index in field_errors:
+                row_errors[index] = field_errors[index]
+            elif has_custom_validate:
+                try:
+                    cls.validate(row.copy())
+                except TypeSystemError as exc:
+                    row_errors[index] = exc.detail
+        return rows, row_errors
+
     @classmethod
     def get_example(cls) -> dict:
         """Returns an example value for the Dict type.
@@ -594,6 +834,9 @@ class Array(SuperType, list):
     max_items = None  # type: typing.Optional[int]
     #: If `True` items in the array should be unique from one another.
     unique_items = False  # type: bool
+    #: If True requests are validated with a validator generated for this
+    #: type by :func:`~doctor.compiler.compile_type`.
+    compiled = False  # type: bool
 
     def __init__(self, *args, **kwargs):
         if self.nullable and args[0] is None:
@@ -681,17 +924,17 @@ class JsonSchema(SuperType):
     #: The key from the definitions in the schema file that the type should
     #: come from.
     definition_key = None  # type: str
+    #: The cached validator, see :meth:`get_validator`.
+    _validator = None
 
     def __new__(cls, value):
         # Attempt to parse the value if it came from a query string
-        try:
-            _, value = parse_value(value, [cls.json_type])
-        except ValueError:
-            pass
-        request_schema = None
+        if isinstance(value, str):
+            try:
+                _, value = parse_value(value, [cls.json_type])
+            except ValueError:
+                pass
         if cls.definition_key is not None:
-            params = [cls.definition_key]
-            request_schema = cls.schema._create_request_schema(params, params)
             data = {cls.definition_key: value}
         else:
             data = value
@@ -699,14 +942,35 @@ class JsonSchema(SuperType):
         super().__new__(cls)
         # Validate the data against the schema and raise an error if it
         # does not validate.
-        validator = cls.schema.get_validator(request_schema)
         try:
-            cls.schema.validate(data, validator)
+            cls.schema.validate(data, cls.get_validator())
         except SchemaValidationError as e:
             raise TypeSystemError(e.args[0], cls=cls)
 
         return value
 
+    @classmethod
+    def get_validator(cls):
+        """Returns the jsonschema validator for the type.
+
+        The validator is created the first time it is needed and reused for
+        every value after that.
+        """
+        # The validator is cached along with the schema and definition key it
+        # was created for, so a type created from this one (e.g. with
+        # new_type) with a different definition key doesn't reuse it.
+        cached = cls._validator
+        if (cached is not None and cached[0] is cls.schema and
+                cached[1] == cls.definition_key):
+            return cached[2]
+        request_schema = None
+        if cls.definition_key is not None:
+            params = [cls.definition_key]
+            request_schema = cls.schema._create_request_schema(params, params)
+        validator = cls.schema.get_validator(request_schema)
+        cls._validator = (cls.schema, cls.definition_key, validator)
+        return validator
+
     @classmethod
     def get_example(cls) -> typing.Any:
         """Returns an example value for the JsonSchema type."""
@@ -0,0 +1,323 @@
+import asyncio
+
+import mock
+import pytest
+import simplejson as json
+
+from doctor.asgi import (
+    create_routes, handle_http, HTTP400Exception, HTTP404Exception,
+    HTTP500Exception, read_request, Resource)
+from doctor.body import BodyLimits
+from doctor.errors import NotFoundError, PayloadTooLargeError
+from doctor.instrumentation import HistogramCollector, set_instrumentation
+from doctor.pipeline import Request
+from doctor.response import Response
+from doctor.routing import Route, delete, get, post
+
+from .types import Colors, FooInstance, Item, ItemId, IncludeDeleted
+from .utils import add_doctor_attrs
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def call_app(app, method='GET', path='/', query_string=b'', body=b'',
+             headers=None, path_params=None):
+    """Calls an ASGI app and returns the status, headers and decoded body."""
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': headers or [],
+    }
+    if path_params is not None:
+        scope['path_params'] = path_params
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    run(app(scope, receive, send))
+    start, body_message = sent
+    body = body_message['body']
+    return (start['status'], dict(start['headers']),
+            json.loads(body.decode('utf-8')) if body else None)
+
+
+def get_item(item_id: ItemId, include_deleted: IncludeDeleted = False) -> Item:
+    return {'item_id': item_id}
+
+
+async def create_item(item: Item, colors: Colors) -> Item:
+    await asyncio.sleep(0)
+    return item
+
+
+def missing_item(item_id: ItemId):
+    raise NotFoundError('Item not found')
+
+
+def make_request(method='GET', query=None, body=b'', mimetype=''):
+    return Request(method, mimetype, body=body, query=query, path='/items/')
+
+
+def make_handler(request, debug=False):
+    handler = mock.Mock(debug=debug)
+    handler.request = request
+    return handler
+
+
+def test_read_request():
+    scope = {
+        'type': 'http',
+        'method': 'POST',
+        'path': '/items/',
+        'query_string': b'a=1&b=',
+        'headers': [(b'Content-Type', b'application/json; charset=UTF8')],
+        'path_params': {'item_id': 1},
+    }
+    messages = [{'type': 'http.request', 'body': b'{"a":', 'more_body': True},
+                {'type': 'http.request', 'body': b' 2}'}]
+
+    async def receive():
+        return messages.pop(0)
+
+    request = run(read_request(scope, receive))
+    assert request.method == 'POST'
+    assert request.path == '/items/'
+    assert request.mimetype == 'application/json'
+    assert request.query == {'a': '1', 'b': ''}
+    assert request.path_params == {'item_id': 1}
+    assert request.json == {'a': 2}
+
+
+def test_read_request_includes_form_params():
+    scope = {
+        'type': 'http',
+        'method': 'POST',
+        'query_string': b'a=1&b=2',
+        'headers': [(b'content-type', b'application/x-www-form-urlencoded')],
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'b=3&c=4&c=5'}
+
+    request = run(read_request(scope, receive))
+    assert request.query == {'a': '1', 'b': '2', 'c': '4'}
+
+
+def test_read_request_repeated_params():
+    # The first value of a param is used, with query string params first,
+    # the same as flask's request.values.
+    (_, handler), = create_routes(
+        (Route('/items/', methods=(post(get_item),)),))
+    status, _, body = call_app(
+        handler, method='POST', query_string=b'item_id=1&item_id=2',
+        body=b'item_id=3',
+        headers=[(b'content-type', b'application/x-www-form-urlencoded')])
+    assert (201, {'item_id': 1}) == (status, body)
+    status, _, body = call_app(
+        handler, method='POST', body=b'item_id=3&item_id=4',
+        headers=[(b'content-type', b'application/x-www-form-urlencoded')])
+    assert (201, {'item_id': 3}) == (status, body)
+
+
+def test_handle_http_query_params():
+    logic = add_doctor_attrs(get_item)
+    request = make_request(query={'item_id': '3', 'include_deleted': 'true'})
+    actual = run(handle_http(make_handler(request), (), {}, logic))
+    assert actual == ({'item_id': 3}, 200)
+
+
+def test_handle_http_async_logic_with_json():
+    logic = add_doctor_attrs(create_item)
+    body = json.dumps({'item': {'item_id': 1}, 'colors': ['blue']})
+    request = make_request('POST', body=body.encode('utf-8'),
+                           mimetype='application/json')
+    actual = run(handle_http(make_handler(request), (), {}, logic))
+    assert actual == ({'item_id': 1}, 201)
+
+
+def test_handle_http_with_route_that_defines_req_obj_type():
+    async def logic(foo: FooInstance):
+        return foo
+
+    logic = add_doctor_attrs(logic, req_obj_type=FooInstance)
+    request = make_request('PUT', body=b'{"foo": "a foo", "foo_id": 1}',
+                           mimetype='application/json')
+    actual = run(handle_http(make_handler(request), (), {}, logic))
+    assert actual == ({'foo': 'a foo', 'foo_id': 1}, 200)
+
+
+def test_handle_http_invalid_json():
+    logic = add_doctor_attrs(create_item)
+    request = make_request('POST', body=b'{"item":',
+                           mimetype='application/json')
+    with pytest.raises(HTTP400Exception, match='not valid JSON'):
+        run(handle_http(make_handler(request), (), {}, logic))
+
+
+def test_handle_http_invalid_param():
+    logic = add_doctor_attrs(get_item)
+    request = make_request(query={'item_id': '0'})
+    with pytest.raises(HTTP400Exception, match='item_id'):
+        run(handle_http(make_handler(request), (), {}, logic))
+
+
+def test_handle_http_response_instance_return_value():
+    async def logic() -> Response[Item]:
+        return Response({'item_id': 1}, {'X-Test': 'foo'}, status_code=202)
+
+    logic = add_doctor_attrs(logic)
+    request = make_request()
+    actual = run(handle_http(make_handler(request), (), {}, logic))
+    assert actual == ({'item_id': 1}, 202, {'X-Test': 'foo'})
+
+
+def test_handle_http_http_errors():
+    logic = add_doctor_attrs(missing_item)
+    request = make_request(query={'item_id': '1'})
+    with pytest.raises(HTTP404Exception, match='Item not found'):
+        run(handle_http(make_handler(request), (), {}, logic))
+
+
+def test_handle_http_uncaught_error(caplog):
+    async def logic():
+        raise ValueError('boom')
+
+    logic = add_doctor_attrs(logic)
+    request = make_request()
+    with pytest.raises(HTTP500Exception):
+        run(handle_http(make_handler(request), (), {}, logic))
+    # The traceback of the exception is logged.
+    record, = [r for r in caplog.records if r.levelname == 'ERROR']
+    assert 'boom' == str(record.exc_info[1])
+    assert "raise ValueError('boom')" in caplog.text
+
+    # Uncaught errors are re-raised when debug is enabled.
+    with pytest.raises(ValueError, match='boom'):
+        run(handle_http(make_handler(request, debug=True), (), {}, logic))
+
+
+def test_create_routes():
+    before = mock.Mock()
+    after = mock.Mock()
+    routes = (
+        Route('/items/{item_id}/', methods=(
+            get(get_item), delete(get_item)), before=before, after=after),
+        Route('/items/', methods=(post(create_item),)),
+    )
+    (item_route, item_handler), (items_route, items_handler) = (
+        create_routes(routes))
+    assert item_route == '/items/{item_id}/'
+    assert issubclass(item_handler, Resource)
+    assert items_route == '/items/'
+
+    status, headers, body = call_app(
+        item_handler, path_params={'item_id': 2})
+    assert (status, body) == (200, {'item_id': 2})
+    assert headers[b'content-type'] == b'application/json'
+    assert before.call_count == 1
+    assert after.call_args == mock.call(({'item_id': 2}, 200))
+
+    status, _, body = call_app(item_handler, 'DELETE',
+                               path_params={'item_id': 2})
+    assert (status, body) == (204, None)
+
+    status, _, body = call_app(
+        items_handler, 'POST',
+        body=b'{"item": {"item_id": 1}, "colors": ["green"]}',
+        headers=[(b'content-type', b'application/json')])
+    assert (status, body) == (201, {'item_id': 1})
+
+
+def test_create_routes_error_responses():
+    routes = (Route('/items/', methods=(post(create_item),)),)
+    (_, handler), = create_routes(routes)
+
+    status, _, body = call_app(handler, 'GET')
+    assert status == 405
+
+    status, _, body = call_app(
+        handler, 'POST', body=b'{"item": {"item_id": 1}}',
+        headers=[(b'content-type', b'application/json')])
+    assert (status, body) == (
+        400, {'status': 400, 'message': 'colors is required.'})
+
+
+def test_create_routes_body_limits():
+    routes = (Route('/items/', methods=(
+        post(create_item, body_limits=BodyLimits(max_bytes=20)),)),)
+    (_, handler), = create_routes(routes)
+
+    body = b'{"item": {"item_id": 1}, "colors": ["green"]}'
+    status, _, body = call_app(
+        handler, 'POST', body=body,
+        headers=[(b'content-type', b'application/json'),
+                 (b'content-length', str(len(body)).encode())])
+    assert (status, body) == (
+        413, {'status': 413,
+              'message': 'Request body must not be larger than 20 bytes.'})
+
+
+def test_read_request_max_body_bytes():
+    scope = {'type': 'http', 'method': 'POST', 'headers': []}
+    messages = [{'type': 'http.request', 'body': b'12345', 'more_body': True},
+                {'type': 'http.request', 'body': b'67890', 'more_body': True},
+                {'type': 'http.request', 'body': b'12345'}]
+
+    async def receive():
+        return messages.pop(0)
+
+    with pytest.raises(PayloadTooLargeError, match='8 bytes'):
+        run(read_request(scope, receive, max_body_bytes=8))
+    # Reading stopped as soon as the body was too large.
+    assert len(messages) == 1
+
+
+def test_create_routes_records_timings():
+    collector = HistogramCollector()
+    set_instrumentation(collector)
+    try:
+        (_, handler), = create_routes(
+            (Route('/items/{item_id}/', methods=(get(get_item),)),))
+        status, _, _ = call_app(handler, path_params={'item_id': 2})
+    finally:
+        set_instrumentation(None)
+    assert status == 200
+    assert collector.get('/items/{item_id}/', 'GET', 'logic').count == 1
+    assert collector.get('/items/{item_id}/', 'GET', 'response').count == 1
+
+
+def test_create_routes_etag():
+    calls = []
+
+    async def get_item_async(item_id: ItemId) -> Item:
+        calls.append(item_id)
+        return {'item_id': item_id}
+
+    (_, handler), = create_routes((Route('/items/{item_id}/', methods=(
+        get(get_item_async, etag=lambda item_id: item_id),)),))
+    status, headers, body = call_app(handler, path_params={'item_id': 2})
+    assert (200, {'item_id': 2}) == (status, body)
+    etag = headers[b'etag']
+    status, headers, _ = call_app(handler, path_params={'item_id': 2})
+    assert etag == headers[b'etag']
+    status, headers, body = call_app(
+        handler, path_params={'item_id': 2},
+        headers=[(b'if-none-match', etag)])
+    assert (304, etag, None) == (status, headers[b'etag'], body)
+    assert [2, 2] == calls
+
+    async def get_item_version(item_id: ItemId):
+        return item_id
+
+    with pytest.raises(ValueError, match='must not be an async def'):
+        create_routes((Route('/items/{item_id}/', methods=(
+            get(get_item_async, etag=get_item_version),)),))
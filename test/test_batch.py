@@ -0,0 +1,363 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import mock
+import pytest
+import simplejson as json
+
+from doctor import asgi
+from doctor.batch import Batch, get_batch_route
+from doctor.body import BodyLimits
+from doctor.errors import NotFoundError
+from doctor.flask import create_routes
+from doctor.pipeline import Error, Request, handle_request
+from doctor.routing import Route, create_routes as doctor_create_routes, get
+
+from .base import FlaskTestCase
+from .types import FooInstance, IncludeDeleted, Item, ItemId
+
+
+def get_item(item_id: ItemId, include_deleted: IncludeDeleted = False) -> Item:
+    if item_id == 404:
+        raise NotFoundError('Item not found')
+    if item_id == 500:
+        raise KeyError('item_id')
+    if item_id == 400:
+        # Raises a TypeSystemError of a type made by a factory.
+        ItemId('a')
+    return {'item_id': item_id}
+
+
+def get_items(params: list) -> list:
+    return [{'item_id': p['item_id']} if p['item_id'] != 404
+            else NotFoundError('Item not found') for p in params]
+
+
+class ConcurrencyCounter(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+    def __exit__(self, *exc_info):
+        with self.lock:
+            self.running -= 1
+
+
+def create_batch_logic(logic, batch=Batch(), **kwargs):
+    routes = (Route('/items/', methods=(get(logic, batch=batch, **kwargs),)),)
+    created = doctor_create_routes(routes, mock.Mock(), object)
+    (route, handler), (batch_route, batch_handler) = created
+    assert '/items/batch/' == batch_route
+    return batch_handler.post.__wrapped__
+
+
+def batch_request(items):
+    return Request('POST', 'application/json',
+                   body=json.dumps(items).encode('utf-8'),
+                   path='/items/batch/')
+
+
+def test_get_batch_route():
+    assert '/items/batch/' == get_batch_route('/items/', Batch())
+    assert '/bulk/' == get_batch_route('^/items/?$', Batch(route='/bulk/'))
+    with pytest.raises(ValueError, match='must set the route of the batch'):
+        get_batch_route('^/items/?$', Batch())
+
+
+def test_check_batch():
+    with pytest.raises(ValueError, match='must be at least 1'):
+        get(get_item, batch=Batch(max_concurrency=0))
+
+
+def test_create_routes():
+    routes = (
+        Route('/items/', methods=(get(get_item, batch=Batch()),),
+              heading='Items'),
+        Route('/foo/', methods=(get(get_item),)),
+    )
+    created = doctor_create_routes(routes, mock.Mock(), object)
+    assert ['/items/', '/items/batch/', '/foo/'] == [r for r, _ in created]
+    handler = created[1][1]
+    assert 'ItemsHandlerGetBatch' == handler.__name__
+    assert {'POST'} == handler.methods
+    assert 'Items' == handler._doctor_heading
+    logic = handler.post.__wrapped__
+    assert 'GET' == logic._doctor_batch_method
+    assert '/items/batch/' == logic._doctor_route
+    # The logic function of the route isn't a batch endpoint.
+    assert not hasattr(created[0][1].get.__wrapped__, '_doctor_batch_method')
+
+
+def test_handle_batch_request():
+    logic = create_batch_logic(get_item)
+    request = batch_request([
+        {'item_id': 1},
+        {'item_id': 'a'},
+        {'item_id': 404},
+        {'include_deleted': True},
+        [1],
+        {'item_id': 2, 'include_deleted': True, 'other': 1},
+        {'item_id': 500},
+    ])
+    with mock.patch('doctor.pipeline.logging') as logging:
+        results, status_code = handle_request(request, logic)
+    assert 200 == status_code
+    assert [
+        {'status': 200, 'data': {'item_id': 1}},
+        {'status': 400, 'message': 'item_id - Must be a valid number.',
+         'errors': {'item_id': 'Must be a valid number.'}},
+        {'status': 404, 'message': 'Item not found'},
+        {'status': 400, 'message': 'item_id is required.'},
+        {'status': 400, 'message': 'Batch items must be JSON objects.'},
+        {'status': 200, 'data': {'item_id': 2}},
+        {'status': 500, 'message': 'Uncaught error in logic function'},
+    ] == results
+    assert 1 == logging.error.call_count
+
+
+def test_handle_batch_request_errors():
+    logic = create_batch_logic(get_item, Batch(max_items=2))
+    error = handle_request(batch_request({'item_id': 1}), logic)
+    assert isinstance(error, Error)
+    assert (400, 'Request body must be a JSON array of params.') == (
+        error.status_code, str(error.description))
+
+    error = handle_request(batch_request([{}, {}, {}]), logic)
+    assert (413, 'Batches must not have more than 2 items.') == (
+        error.status_code, str(error.description))
+
+    assert ([], 200) == handle_request(batch_request([]), logic)
+
+    # Allowed exceptions are re-raised.
+    logic = create_batch_logic(get_item, allowed_exceptions=[KeyError])
+    with pytest.raises(KeyError):
+        handle_request(batch_request([{'item_id': 500}]), logic)
+
+
+def test_handle_batch_request_many():
+    many = mock.Mock(side_effect=get_items)
+    logic = create_batch_logic(get_item, Batch(many=many))
+    request = batch_request([{'item_id': 1}, {'item_id': 'a'},
+                             {'item_id': 404}])
+    results, _ = handle_request(request, logic)
+    assert [200, 400, 404] == [r['status'] for r in results]
+    assert {'item_id': 1} == results[0]['data']
+    # Only the valid items are passed to many.
+    many.assert_called_once_with([{'item_id': 1}, {'item_id': 404}])
+
+    # All items fail if many raises an exception.
+    many.side_effect = NotFoundError('Not found')
+    results, _ = handle_request(request, logic)
+    assert [404, 400, 404] == [r['status'] for r in results]
+
+    many.side_effect = None
+    many.return_value = [{'item_id': 1}]
+    error = handle_request(request, logic)
+    assert 500 == error.status_code
+
+
+def test_handle_batch_request_req_obj_type():
+    def update_foo(foo: FooInstance) -> FooInstance:
+        return foo
+
+    many = mock.Mock(side_effect=lambda foos: foos)
+    for batch in (Batch(), Batch(many=many)):
+        logic = create_batch_logic(update_foo, batch,
+                                   req_obj_type=FooInstance)
+        results, _ = handle_request(batch_request(
+            [{'foo': 'a', 'foo_id': 1}, {'foo': 'b', 'foo_id': 'x'}]), logic)
+        assert [{'status': 200, 'data': {'foo': 'a', 'foo_id': 1}},
+                {'status': 400,
+                 'message': "__all__ - {'foo_id': 'Must be a valid number.'}",
+                 'errors': {'__all__': {'foo_id': 'Must be a valid number.'}}}
+                ] == results
+    many.assert_called_once_with([{'foo': 'a', 'foo_id': 1}])
+
+
+def test_handle_batch_request_executor():
+    counter = ConcurrencyCounter()
+
+    def get_item_slowly(item_id: ItemId) -> Item:
+        with counter:
+            # Later items finish first.
+            time.sleep(0.01 * max(6 - item_id, 0))
+            return get_item(item_id)
+
+    items = [{'item_id': i} for i in range(1, 6)] + [{'item_id': 404}, {}]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        logic = create_batch_logic(get_item_slowly, Batch(executor=executor))
+        results, _ = handle_request(batch_request(items), logic)
+    # The results are in the order of the items.
+    assert [{'status': 200, 'data': {'item_id': i}} for i in range(1, 6)] == (
+        results[:5])
+    assert {'status': 404, 'message': 'Item not found'} == results[5]
+    assert {'status': 400, 'message': 'item_id is required.'} == results[6]
+    assert 1 < counter.max_running <= 4
+
+
+def test_handle_batch_request_max_concurrency():
+    counter = ConcurrencyCounter()
+
+    def get_item_slowly(item_id: ItemId) -> Item:
+        with counter:
+            time.sleep(0.01)
+            return get_item(item_id)
+
+    items = [{'item_id': i} for i in range(1, 7)]
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        logic = create_batch_logic(get_item_slowly, Batch(
+            executor=executor, max_concurrency=2))
+        # The limit applies to all requests to the batch endpoint.
+        threads = [threading.Thread(target=handle_request,
+                                    args=(batch_request(items), logic))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert 2 == counter.max_running
+        results, _ = handle_request(batch_request(items), logic)
+        assert [200] * 6 == [r['status'] for r in results]
+        # All permits are released, including for items that raised.
+        results, _ = handle_request(
+            batch_request([{'item_id': 404}] * 3), logic)
+        assert [404] * 3 == [r['status'] for r in results]
+    assert 0 == counter.running
+    assert logic._doctor_batch_semaphore.acquire(blocking=False)
+    assert logic._doctor_batch_semaphore.acquire(blocking=False)
+
+
+def test_handle_batch_request_process_pool():
+    items = [{'item_id': 1}, {'item_id': 404}, {'item_id': 2},
+             {'item_id': 400}]
+    expected = [{'status': 200, 'data': {'item_id': 1}},
+                {'status': 404, 'message': 'Item not found'},
+                {'status': 200, 'data': {'item_id': 2}},
+                {'status': 400, 'message': 'Must be a valid number.'}]
+    # Errors raised by the logic function are returned the same way whether
+    # they're pickled back from another process or not.
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        logic = create_batch_logic(get_item, Batch(executor=executor))
+        assert (expected, 200) == handle_request(batch_request(items), logic)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        logic = create_batch_logic(get_item, Batch(executor=executor))
+        assert (expected, 200) == handle_request(batch_request(items), logic)
+
+
+def test_asgi_batch_concurrency():
+    counter = ConcurrencyCounter()
+
+    async def get_item_async(item_id: ItemId) -> Item:
+        with counter:
+            await asyncio.sleep(0.01 * max(6 - item_id, 0))
+            return get_item(item_id)
+
+    def get_item_slowly(item_id: ItemId) -> Item:
+        with counter:
+            time.sleep(0.01)
+            return get_item(item_id)
+
+    items = [{'item_id': i} for i in range(1, 6)] + [{'item_id': 404}]
+    expected = [200] * 5 + [404]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for logic, batch, max_running in (
+                (get_item_async, Batch(), 6),
+                (get_item_async, Batch(max_concurrency=2), 2),
+                (get_item_slowly, Batch(executor=executor), 4),
+                (get_item_slowly, Batch(max_concurrency=3), 3)):
+            counter.max_running = 0
+            routes = (Route('/items/', methods=(get(logic, batch=batch),)),)
+            _, (_, handler) = asgi.create_routes(routes)
+            logic = handler.post.__wrapped__
+            results, _ = asyncio.get_event_loop().run_until_complete(
+                asgi.handle_batch_http(batch_request(items), logic, ()))
+            assert expected == [r['status'] for r in results]
+            assert list(range(1, 6)) == [r['data']['item_id']
+                                         for r in results[:5]]
+            assert max_running == counter.max_running
+
+
+def test_asgi_batch():
+    async def get_item_async(item_id: ItemId) -> Item:
+        return get_item(item_id)
+
+    routes = (Route('/items/', methods=(
+        get(get_item_async, batch=Batch(max_items=2)),)),)
+    _, (batch_route, handler) = asgi.create_routes(routes)
+    assert '/items/batch/' == batch_route
+
+    def call(items):
+        scope = {'type': 'http', 'method': 'POST',
+                 'headers': [(b'content-type', b'application/json')]}
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request',
+                    'body': json.dumps(items).encode('utf-8')}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.get_event_loop().run_until_complete(
+            handler(scope, receive, send))
+        return sent[0]['status'], json.loads(sent[1]['body'])
+
+    assert (200, [{'status': 200, 'data': {'item_id': 1}},
+                  {'status': 404, 'message': 'Item not found'}]) == call(
+        [{'item_id': 1}, {'item_id': 404}])
+    assert (413, {'status': 413,
+                  'message': 'Batches must not have more than 2 items.'}) == (
+        call([{}, {}, {}]))
+
+
+class BatchFlaskTestCase(FlaskTestCase):
+
+    def get_routes(self):
+        routes = (
+            Route('/items/<int:item_id>/', methods=(
+                get(get_item, batch=Batch()),)),
+            Route('/limited/', methods=(get(get_item, batch=Batch(),
+                                            body_limits=BodyLimits(
+                                                max_bytes=64, max_depth=2)),)),
+        )
+        return create_routes(routes)
+
+    def test_batch(self):
+        # Path params are used for every item.
+        response = self.client.post(
+            '/items/3/batch/', data=json.dumps([{}, {'item_id': 4}]),
+            content_type='application/json')
+        assert 200 == response.status_code
+        assert [{'status': 200, 'data': {'item_id': 3}},
+                {'status': 200, 'data': {'item_id': 3}}] == response.json
+
+        response = self.client.get('/items/3/')
+        assert {'item_id': 3} == response.json
+
+    def test_batch_body_limits(self):
+        # The body limits of the route apply to its batch endpoint.
+        response = self.client.post(
+            '/limited/batch/', data=json.dumps([{'item_id': 1}] * 10),
+            content_type='application/json')
+        assert 413 == response.status_code
+        assert b'Request body must not be larger than 64 bytes.' in (
+            response.data)
+
+        response = self.client.post(
+            '/limited/batch/', data=json.dumps([{'item_id': [[1]]}]),
+            content_type='application/json')
+        assert 413 == response.status_code
+
+        response = self.client.post(
+            '/limited/batch/', data=json.dumps([{'item_id': 1}]),
+            content_type='application/json')
+        assert [{'status': 200, 'data': {'item_id': 1}}] == response.json
@@ -0,0 +1,65 @@
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.importtime import (
+    LAZY_DEPENDENCIES, ImportTime, get_loaded_modules, parse_importtime)
+from benchmarks.run import measure, percentile
+from benchmarks.scenarios import SCENARIOS
+
+
+@pytest.mark.parametrize('scenario', SCENARIOS, ids=lambda s: s.name)
+def test_scenario_runs(scenario):
+    # Each scenario raises if its request fails validation.
+    scenario.setup()()
+
+
+def test_percentile():
+    timings = [float(i) for i in range(1, 101)]
+    assert percentile(timings, 50) == 50.0
+    assert percentile(timings, 99) == 99.0
+    assert percentile(timings, 0) == 1.0
+    assert percentile([1.0], 90) == 1.0
+
+
+def test_measure():
+    stats = measure(lambda: None, iterations=10, warmup=1)
+    assert stats['iterations'] == 10
+    assert stats['ops_per_sec'] > 0
+    assert stats['min_us'] <= stats['p50_us'] <= stats['p99_us'] <= \
+        stats['max_us']
+
+
+def test_parse_importtime():
+    output = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       120 |        120 |   doctor.errors\n'
+        'import time:      2000 |       2120 | doctor\n'
+        'some other output\n')
+    assert {
+        'doctor.errors': ImportTime('doctor.errors', 120, 120),
+        'doctor': ImportTime('doctor', 2000, 2120),
+    } == parse_importtime(output)
+
+
+@pytest.mark.parametrize('module', ['doctor', 'doctor.flask', 'doctor.asgi'])
+def test_lazy_dependencies(module):
+    assert [] == get_loaded_modules(module, LAZY_DEPENDENCIES)
+
+
+@pytest.mark.parametrize('version_info,eager', [
+    ('sys.version_info', False),
+    # Python 3.6 doesn't support module __getattr__.
+    ('(3, 6, 9)', True),
+])
+def test_lazy_modules(version_info, eager):
+    code = (
+        'import sys, jsonschema, typing_inspect; '
+        'sys.version_info = {}; import doctor; '
+        'eager = "doctor.schema" in sys.modules; '
+        'assert doctor.schema.Schema and doctor.resource.ResourceSchema; '
+        'print(eager)').format(version_info)
+    output = subprocess.check_output([sys.executable, '-c', code],
+                                     universal_newlines=True)
+    assert str(eager) == output.strip()
@@ -0,0 +1,114 @@
+import pytest
+
+from doctor.body import BodyLimits, check_json_body, check_size
+from doctor.errors import (
+    InvalidValueError, PayloadTooLargeError, TypeSystemError)
+from doctor.types import array, integer, new_type, Object
+
+from .types import Colors, Item, ItemId
+
+
+def test_check_size():
+    limits = BodyLimits(max_bytes=10)
+    check_size(None, limits)
+    check_size(10, limits)
+    with pytest.raises(PayloadTooLargeError,
+                       match='must not be larger than 10 bytes'):
+        check_size(11, limits)
+    # No limit
+    check_size(11, BodyLimits())
+
+
+def test_check_json_body_no_limits():
+    check_json_body(b'{"a": [1, 2, {"b": [[[]]]}]}', BodyLimits())
+
+
+def test_check_json_body_max_bytes():
+    with pytest.raises(PayloadTooLargeError, match='10 bytes'):
+        check_json_body(b'[1, 2, 3, 4, 5]', BodyLimits(max_bytes=10))
+
+
+def test_check_json_body_max_depth():
+    limits = BodyLimits(max_depth=3)
+    check_json_body(b'{"a": [{"b": 1}], "c": [{"d": 2}]}', limits)
+    with pytest.raises(PayloadTooLargeError,
+                       match='must not be nested more than 3 levels'):
+        check_json_body(b'{"a": [{"b": [1]}]}', limits)
+
+
+def test_check_json_body_max_array_length():
+    limits = BodyLimits(max_array_length=3)
+    check_json_body(b'[[1, 2, 3], ["a,b", "c", "d"], []]', limits)
+    with pytest.raises(PayloadTooLargeError,
+                       match='Arrays must not have more than 3 items'):
+        check_json_body(b'{"a": [1, 2, 3, 4]}', limits)
+
+
+def test_check_json_body_max_object_keys():
+    limits = BodyLimits(max_object_keys=2)
+    # Commas and colons in strings aren't counted.
+    check_json_body(b'{"a,b:": "c,d:", "e": {"f": 1, "g\\"": 2}}', limits)
+    with pytest.raises(PayloadTooLargeError,
+                       match='Objects must not have more than 2 keys'):
+        check_json_body(b'[{"a": 1, "b": 2, "c": 3}]', limits)
+
+
+def test_check_json_body_type_limits():
+    Ids = array('ids', items=ItemId, max_items=2)
+
+    class Foo(Object):
+        description = 'foo'
+        properties = {'ids': Ids, 'item': Item}
+        additional_properties = False
+
+    limits = BodyLimits()
+    check_json_body(b'{"ids": [1, 2], "item": {"item_id": 1}}', limits, Foo)
+    with pytest.raises(TypeSystemError, match='__all__ - Too many items.'):
+        check_json_body(b'{"ids": [1, 2, 3]}', limits, Foo)
+    with pytest.raises(TypeSystemError,
+                       match='__all__ - Additional properties'):
+        check_json_body(b'{"item": {"item_id": 1, "foo": 2}}', limits, Foo)
+
+    # Objects that allow additional properties aren't limited.
+    Bar = new_type(Foo, additional_properties=True)
+    check_json_body(b'{"ids": [], "item": {}, "a": 1}', limits, Bar)
+
+
+def test_check_json_body_params():
+    Ids = array('ids', items=integer('id'), max_items=2)
+    params = {'colors': Colors, 'ids': Ids, 'item': Item}
+
+    limits = BodyLimits()
+    check_json_body(b'{"ids": [1, 2], "other": [1, 2, 3]}', limits, params)
+    with pytest.raises(TypeSystemError, match='ids - Too many items.'):
+        check_json_body(b'{"colors": [], "ids": [1, 2, 3]}', limits, params)
+    with pytest.raises(TypeSystemError,
+                       match='item - Additional properties'):
+        check_json_body(b'{"item": {"item_id": 1, "a": 1}}', limits, params)
+
+
+@pytest.mark.parametrize('body', [
+    b']', b'{"a": 1}}', b'1, 2', b':', b'[1: 2]', b'{: 1}', b'{"a": [1}',
+    b'["a"]]', b'{"\\x": 1}', b'{"a": "\xff"}',
+])
+def test_check_json_body_invalid_json(body):
+    limits = BodyLimits(max_depth=5, max_array_length=5, max_object_keys=5)
+    with pytest.raises(InvalidValueError, match='not valid JSON'):
+        check_json_body(body, limits)
+
+
+def test_check_json_body_type_limit_messages():
+    class Parent(Object):
+        description = 'Parent'
+        properties = {'item_id': ItemId}
+        additional_properties = False
+        max_keys = 1
+
+    class Child(Parent):
+        # The template uses an attribute inherited from the parent.
+        errors = dict(Object.errors, additional_properties=(
+            'Must have at most {max_keys} key.'))
+
+    with pytest.raises(TypeSystemError) as exc:
+        check_json_body(b'{"item_id": 1, "a": 1}', BodyLimits(), Child)
+    assert {'__all__': 'Must have at most 1 key.'} == exc.value.errors
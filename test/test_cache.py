@@ -0,0 +1,134 @@
+import mock
+import pytest
+
+from doctor.cache import CacheBackend, MemoryCacheBackend, ResponseCache
+from doctor.parsers import CacheInfo
+from doctor.pipeline import Error, Request, handle_request
+from doctor.response import Response
+from doctor.routing import Route, create_routes, get, post
+
+from .types import Colors, Item, ItemId
+
+
+class TestMemoryCacheBackend(object):
+
+    def test_get_set(self):
+        backend = MemoryCacheBackend(maxsize=2)
+        assert backend.get('a') is None
+        backend.set('a', 1, None)
+        backend.set('b', 2, None)
+        assert 1 == backend.get('a')
+        # b is the least recently used value.
+        backend.set('c', 3, None)
+        assert backend.get('b') is None
+        assert 3 == backend.get('c')
+        assert CacheInfo(hits=2, misses=2, maxsize=2,
+                         currsize=2) == backend.info()
+
+        backend.clear()
+        assert CacheInfo(0, 0, 2, 0) == backend.info()
+
+    def test_ttl(self):
+        backend = MemoryCacheBackend()
+        with mock.patch('doctor.cache.time.monotonic', return_value=100):
+            backend.set('a', 1, 10)
+        with mock.patch('doctor.cache.time.monotonic', return_value=109):
+            assert 1 == backend.get('a')
+        with mock.patch('doctor.cache.time.monotonic', return_value=110):
+            assert backend.get('a') is None
+        # Expired values are removed.
+        assert 0 == backend.info().currsize
+
+    def test_invalid_maxsize(self):
+        with pytest.raises(ValueError, match='maxsize must be greater'):
+            MemoryCacheBackend(0)
+
+
+class TestResponseCache(object):
+
+    def test_defaults(self):
+        cache = ResponseCache()
+        assert 60 == cache.ttl
+        assert isinstance(cache.backend, MemoryCacheBackend)
+        assert 1024 == cache.backend.maxsize
+        assert 5 == ResponseCache(maxsize=5).backend.maxsize
+
+        with pytest.raises(ValueError, match='ttl must be greater'):
+            ResponseCache(ttl=0)
+
+    def test_get_key(self):
+        cache = ResponseCache()
+        key = cache.get_key('/items/<int:item_id>/', 'get', (),
+                            {'b': [1, True], 'a': {'y': None, 'x': 'x'}})
+        assert ('GET /items/<int:item_id>/ '
+                '[[],{"a":{"x":"x","y":null},"b":[1,true]}]') == key
+        assert key == cache.get_key(
+            '/items/<int:item_id>/', 'GET', (),
+            {'a': {'x': 'x', 'y': None}, 'b': [1, True]})
+
+    def test_set_only_caches_successful_results(self):
+        cache = ResponseCache(ttl=None)
+        cache.set('a', ('a', 200))
+        cache.set('b', ('b', 201, {'X-Foo': 'foo'}))
+        cache.set('c', ('c', 302))
+        assert ('a', 200) == cache.get('a')
+        assert ('b', 201, {'X-Foo': 'foo'}) == cache.get('b')
+        assert cache.get('c') is None
+
+    def test_custom_backend(self):
+        backend = mock.Mock(spec=CacheBackend)
+        cache = ResponseCache(ttl=5, backend=backend)
+        cache.set('a', ('a', 200))
+        backend.set.assert_called_once_with('a', ('a', 200), 5)
+        assert backend.get.return_value == cache.get('a')
+
+    def test_only_get_by_default(self):
+        def logic(item: Item) -> Item:
+            return item
+
+        with pytest.raises(ValueError,
+                           match='only cached for GET requests'):
+            post(logic, response_cache=ResponseCache())
+        post(logic, response_cache=ResponseCache(allow_unsafe_methods=True))
+
+
+def test_handle_request_response_cache():
+    calls = []
+
+    def logic(item_id: ItemId, colors: Colors = None) -> Response[Item]:
+        calls.append(item_id)
+        if item_id == 2:
+            return Response({'item_id': 2}, status_code=302)
+        return Response({'item_id': item_id}, headers={'X-Id': str(item_id)})
+
+    cache = ResponseCache()
+    routes = (Route('/items/<int:item_id>/', methods=(
+        get(logic, response_cache=cache),)),)
+    handler = create_routes(routes, mock.Mock(), object)[0][1]
+    logic = handler.get.__wrapped__
+
+    expected = ({'item_id': 1}, 200, {'X-Id': '1'})
+    request = Request('GET', query={'colors': '["blue"]'},
+                      path_params={'item_id': 1})
+    assert expected == handle_request(request, logic)
+    # The params are the same once they are coerced.
+    request = Request('GET', query={'colors': '[ "blue" ]'},
+                      path_params={'item_id': '01'})
+    assert expected == handle_request(request, logic)
+    assert [1] == calls
+    assert 1 == cache.backend.info().hits
+
+    request = Request('GET', path_params={'item_id': 1})
+    assert expected == handle_request(request, logic)
+    assert [1, 1] == calls
+
+    # Only successful responses are cached.
+    request = Request('GET', path_params={'item_id': 2})
+    handle_request(request, logic)
+    handle_request(request, logic)
+    assert [1, 1, 2, 2] == calls
+
+    # Errors aren't cached.
+    request = Request('GET', path_params={'item_id': 0})
+    assert isinstance(handle_request(request, logic), Error)
+    assert 4 == len(calls)
@@ -0,0 +1,155 @@
+import pytest
+
+from doctor.compiler import compile_type, generate_source
+from doctor.errors import TypeSystemError
+from doctor.types import (
+    array, Array, integer, MissingDescriptionError, new_type, Object, string)
+
+from .test_types import (
+    FooObject, NoAddtPropsObject, NullableFooObject,
+    PropertyDependenciesObject, RequiredPropsObject, ValidateObject)
+from .types import (
+    Colors, ExampleObjects, ExampleObjectsAndAge, FooInstance, TwoItems)
+
+
+class DefaultsObject(Object):
+    description = 'An object with a default.'
+    properties = {
+        'name': string('name'),
+        'tags': new_type(Colors, default=None),
+    }
+    required = ['name']
+
+
+class NestedObject(Object):
+    description = 'A nested object.'
+    properties = {
+        'foo': FooInstance,
+        'foos': array('foos', items=FooInstance, max_items=2),
+        'objects': ExampleObjects,
+    }
+    additional_properties = False
+
+
+def get_result(cls, value):
+    """Returns the native value or error detail of instantiating a type."""
+    try:
+        return cls.native_type(cls(value))
+    except TypeSystemError as e:
+        return TypeSystemError, e.detail
+
+
+def get_compiled_result(cls, value):
+    """Returns the value or error detail of a compiled validator for a type."""
+    try:
+        return compile_type(cls)(value)
+    except TypeSystemError as e:
+        return TypeSystemError, e.detail
+
+
+class TestCompiler(object):
+
+    @pytest.mark.parametrize('cls,value', [
+        (FooObject, {'foo': 'bar', 'cat': 12}),
+        (FooObject, {'foo': 'f'}),
+        (FooObject, '12'),
+        (FooObject, [('foo', 'bar')]),
+        (FooObject, {1: 'foo'}),
+        (NullableFooObject, None),
+        (NoAddtPropsObject, {'foo': 'bar', 'cat': 12, 'dog': 1}),
+        (RequiredPropsObject, {'bar': '1'}),
+        (RequiredPropsObject, {'foo': 'b', 'baz': 1}),
+        (PropertyDependenciesObject, {'category': 'c', 'name': 'n'}),
+        (PropertyDependenciesObject, {'name': 'n'}),
+        (PropertyDependenciesObject, {'type': 't'}),
+        (ValidateObject, {'key1': 1}),
+        (ValidateObject, {'foo': 1}),
+        (DefaultsObject, {'name': 'a'}),
+        (DefaultsObject, {}),
+        (NestedObject, {'foo': {'foo_id': '1'}, 'objects': [{'str': 's'}]}),
+        (NestedObject, {'foo': {'foo': 1}, 'foos': [{}, {'foo_id': 'a'}],
+                        'objects': [{'str': 's', 'x': 1}], 'bar': 1}),
+        (NestedObject, {'foos': [{'foo_id': 1}] * 3}),
+        (Colors, ['Blue', 'green']),
+        (Colors, ['red', 'blue', 'orange']),
+        (Colors, 'blue'),
+        (Colors, ('blue',)),
+        (Colors, {'blue': 1}),
+        (Colors, 12),
+        (TwoItems, [1, 'blue']),
+        (TwoItems, [1]),
+        (TwoItems, [1, 'blue', 3]),
+        (TwoItems, [0, 'red']),
+        (ExampleObjectsAndAge, [1, {'str': 'a'}, {'a': 1}]),
+        (array('unique', unique_items=True), [1, 2, 1]),
+        (array('min and max', min_items=2, max_items=3), [1]),
+        (array('min and max', min_items=2, max_items=3), [1, 2, 3, 4]),
+        (array('nullable', nullable=True), None),
+        (array('no items'), [1, 'a', None]),
+    ])
+    def test_compiled_matches_type(self, cls, value):
+        assert get_result(cls, value) == get_compiled_result(cls, value)
+
+    def test_compiled_returns_native_types(self):
+        actual = compile_type(NestedObject)({
+            'foo': {'foo_id': '1'}, 'foos': [{'foo_id': 2}]})
+        assert {'foo': {'foo_id': 1}, 'foos': [{'foo_id': 2}]} == actual
+        assert type(actual['foo']) is dict
+        assert type(actual['foos']) is list
+        assert type(actual['foos'][0]) is dict
+
+    def test_custom_validate(self):
+        class A(Array):
+            description = 'Array with 2 items'
+            items = string('string')
+
+            @classmethod
+            def validate(cls, value):
+                if len(value) != 2:
+                    raise TypeSystemError('Length must be 2')
+
+        assert ['1', '2'] == compile_type(A)(['1', '2'])
+        with pytest.raises(TypeSystemError, match='Length must be 2'):
+            compile_type(A)(['1'])
+
+    def test_missing_description(self):
+        class MyObject(Object):
+            pass
+
+        with pytest.raises(MissingDescriptionError):
+            compile_type(MyObject)({'foo': 'bar'})
+
+    def test_recursive_type(self):
+        class Node(Object):
+            description = 'A tree node.'
+            properties = {'value': integer('value')}
+
+        Node.properties['children'] = array('children', items=Node)
+        validate = compile_type(Node)
+        value = {'value': '1', 'children': [{'value': 2, 'children': []}]}
+        assert {'value': 1, 'children': [{'value': 2, 'children': []}]} == (
+            validate(value))
+        with pytest.raises(TypeSystemError) as exc:
+            validate({'value': 1, 'children': [{'value': 'a'}]})
+        assert {'children': {0: {'value': 'Must be a valid number.'}}} == (
+            exc.value.detail)
+
+    def test_compile_type_is_cached_per_class(self):
+        validate = compile_type(FooInstance)
+        assert validate is compile_type(FooInstance)
+        assert validate is FooInstance._doctor_compiled_validator
+
+        # Sub-classes get their own validator.
+        StrictFooInstance = new_type(FooInstance, additional_properties=False)
+        assert validate is not compile_type(StrictFooInstance)
+        with pytest.raises(TypeSystemError):
+            compile_type(StrictFooInstance)({'foo_id': 1, 'bar': 2})
+
+    def test_compile_type_not_object_or_array(self):
+        with pytest.raises(TypeError, match='Only Object and Array types'):
+            compile_type(string('a string'))
+
+    def test_generate_source(self):
+        source = generate_source(TwoItems)
+        assert source.startswith('def _validate_0(value):')
+        assert 'raise TypeSystemError(' in source
@@ -0,0 +1,147 @@
+import asyncio
+import gzip
+
+import mock
+import pytest
+import simplejson as json
+
+from doctor import asgi, compression
+from doctor.compression import (
+    Compression, choose_encoding, compress_body, parse_accept_encoding)
+from doctor.flask import create_routes
+from doctor.pipeline import encode_response
+from doctor.routing import Route, get
+
+from .base import FlaskTestCase
+from .types import ItemId
+
+
+def get_items(item_id: ItemId) -> list:
+    return [{'item_id': item_id}] * 100
+
+
+def fake_brotli(body, compression):
+    return b'br:' + body
+
+
+@pytest.fixture
+def brotli():
+    with mock.patch.dict(compression._compressors, br=fake_brotli):
+        yield
+
+
+def test_parse_accept_encoding():
+    assert {} == parse_accept_encoding(None)
+    assert {'gzip': 1.0, 'br': 0.5, 'identity': 0.0, '*': 0.0} == (
+        parse_accept_encoding('gzip, BR;q=0.5, identity; q=0, *;q=bad'))
+
+
+@pytest.mark.parametrize('accept_encoding,expected', [
+    (None, None),
+    ('identity', None),
+    ('gzip', 'gzip'),
+    ('gzip, br', 'br'),
+    ('gzip, br;q=0.5', 'gzip'),
+    ('*', 'br'),
+    ('*, br;q=0', 'gzip'),
+])
+def test_choose_encoding(brotli, accept_encoding, expected):
+    assert expected == choose_encoding(accept_encoding, Compression())
+
+
+def test_choose_encoding_unavailable():
+    with mock.patch.dict(compression._compressors, br=None):
+        assert 'gzip' == choose_encoding('br, gzip', Compression())
+        assert ('gzip',) == compression.get_available_encodings()
+        assert choose_encoding('br', Compression()) is None
+    # Encodings missing from the compression aren't used.
+    assert choose_encoding('gzip', Compression(encodings=('br',))) is None
+
+
+def test_compress_body():
+    body = b'a' * 100
+    config = Compression(min_size=100, gzip_level=1)
+
+    headers = {}
+    compressed = compress_body(body, 200, headers, 'gzip', config)
+    assert body == gzip.decompress(compressed)
+    assert {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'} == headers
+
+    # Small bodies aren't compressed, but the response still varies.
+    headers = {'vary': 'Cookie'}
+    assert b'a' == compress_body(b'a', 200, headers, 'gzip', config)
+    assert {'vary': 'Cookie, Accept-Encoding'} == headers
+
+    headers = {'Content-Encoding': 'identity'}
+    assert body == compress_body(body, 200, headers, 'gzip', config)
+    assert {'Content-Encoding': 'identity'} == headers
+
+    headers = {}
+    assert b'' == compress_body(b'', 304, headers, 'gzip', config)
+    assert {} == headers
+
+
+def test_encode_response(brotli):
+    assert (b'[1]', 200, {}) == encode_response(([1], 200))
+    assert (b'', 204, {'X-Foo': 'foo'}) == encode_response(
+        (None, 204, {'X-Foo': 'foo'}))
+
+    headers = {'X-Foo': 'foo'}
+    body, status_code, actual = encode_response(
+        ([1], 200, headers), 'br', Compression(min_size=1))
+    assert (b'br:[1]', 200) == (body, status_code)
+    assert {'Content-Encoding': 'br', 'Vary': 'Accept-Encoding',
+            'X-Foo': 'foo'} == actual
+    # The headers of the result aren't modified.
+    assert {'X-Foo': 'foo'} == headers
+
+
+def test_asgi_compression():
+    routes = (Route('/items/{item_id}/', methods=(get(get_items),),
+                    compression=Compression(min_size=100)),)
+    (_, handler), = asgi.create_routes(routes)
+
+    def call(headers):
+        scope = {'type': 'http', 'method': 'GET', 'headers': headers,
+                 'path_params': {'item_id': 1}}
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.get_event_loop().run_until_complete(
+            handler(scope, receive, send))
+        return dict(sent[0]['headers']), sent[1]['body']
+
+    headers, body = call([(b'accept-encoding', b'gzip')])
+    assert b'gzip' == headers[b'content-encoding']
+    assert str(len(body)).encode() == headers[b'content-length']
+    assert get_items(1) == json.loads(gzip.decompress(body))
+
+    headers, body = call([])
+    assert b'content-encoding' not in headers
+    assert get_items(1) == json.loads(body)
+
+
+class CompressionFlaskTestCase(FlaskTestCase):
+
+    def get_routes(self):
+        routes = (Route('/items/<int:item_id>/', methods=(get(get_items),),
+                        compression=Compression(min_size=100)),)
+        return create_routes(routes)
+
+    def test_compression(self):
+        response = self.client.get('/items/1/',
+                                   headers={'Accept-Encoding': 'gzip'})
+        assert 200 == response.status_code
+        assert 'gzip' == response.headers['Content-Encoding']
+        assert 'Accept-Encoding' == response.headers['Vary']
+        assert 'application/json' == response.headers['Content-Type']
+        assert get_items(1) == json.loads(gzip.decompress(response.data))
+
+        response = self.client.get('/items/1/')
+        assert 'Content-Encoding' not in response.headers
+        assert get_items(1) == response.json
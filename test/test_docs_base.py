@@ -1,6 +1,10 @@
 import json
+import threading
+import time
 
 import mock
+import pytest
+from sphinx.errors import SphinxError
 from werkzeug.routing import Rule
 
 from doctor.docs import base
@@ -187,11 +191,72 @@ class TestDocsBase(TestCase):
         assert base.get_name(mock_class) == 'baz'
 
 
+class ExampleHarness(base.BaseHarness):
+
+    def __init__(self, max_workers):
+        super(ExampleHarness, self).__init__('http://foo/', max_workers)
+        self.calls = []
+        self.threads = set()
+
+    def setup_request(self, sphinx_directive, route, handler, annotation):
+        self.calls.append(('setup', route))
+
+    def teardown_request(self, sphinx_directive, route, handler, annotation):
+        self.calls.append(('teardown', route))
+
+    def request(self, route, handler, annotation):
+        if route == '/error/':
+            raise ValueError('bad example')
+        self.threads.add(threading.get_ident())
+        # Later examples finish first.
+        time.sleep(0.01 * (5 - int(route.strip('/'))))
+        self.calls.append(('request', route))
+        return {'method': 'GET', 'url': 'http://foo' + route, 'params': {},
+                'response': json.dumps({'route': route})}
+
+
+class TestDocsBaseDirective(TestCase):
+
+    def make_examples(self, harness, routes):
+        directive = base.BaseDirective.__new__(base.BaseDirective)
+        directive.harness = harness
+        annotation = mock.Mock(http_method='GET', logic=None)
+        return directive._make_examples(
+            [(route, None, annotation) for route in routes])
+
+    def test_make_examples(self):
+        routes = ['/{}/'.format(i) for i in range(5)]
+        expected = [base.get_example_lines(
+            {}, 'GET', 'http://foo' + route, {},
+            json.dumps({'route': route})) for route in routes]
+
+        harness = ExampleHarness(max_workers=1)
+        assert expected == self.make_examples(harness, routes)
+        assert 1 == len(harness.threads)
+        assert [('setup', route) for route in routes] == [
+            call for call in harness.calls if call[0] == 'setup']
+
+        harness = ExampleHarness(max_workers=5)
+        assert expected == self.make_examples(harness, routes)
+        assert 1 < len(harness.threads)
+        # Each request is between its setup and teardown hooks.
+        for route in routes:
+            calls = [call[0] for call in harness.calls if call[1] == route]
+            assert ['setup', 'request', 'teardown'] == calls
+
+    def test_make_examples_error(self):
+        harness = ExampleHarness(max_workers=3)
+        with pytest.raises(SphinxError, match='GET /error/ example: bad'):
+            self.make_examples(harness, ['/1/', '/error/', '/2/'])
+        assert ('teardown', '/error/') in harness.calls
+
+
 class TestDocsBaseHarness(TestCase):
 
     def test_init(self):
         harness = base.BaseHarness('http://foo/')
         assert harness.url_prefix == 'http://foo'
+        assert harness.max_workers == 1
 
     def test_get_annotation_heading_doctor_heading(self):
         """
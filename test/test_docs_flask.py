@@ -1,9 +1,11 @@
 import json
 import os
+import threading
 
 import mock
 
-from doctor.docs.flask import AutoFlaskHarness
+from doctor.docs.base import DirectiveState
+from doctor.docs.flask import AutoFlaskDirective, AutoFlaskHarness
 
 from .base import TestCase
 
@@ -140,3 +142,79 @@ class TestDocsFlask(TestCase):
         result['response'] = json.loads(result['response'])
         assert result['params'] == {'body': 'This is an updated body.',
                                     'done': False}
+
+    def test_harness_request_thread(self):
+        _, rule, view_class, annotations = self.annotations[2]
+        annotation = annotations[0]
+        results = []
+        thread = threading.Thread(target=lambda: results.append((
+            self.harness.get_test_client(),
+            self.harness.request(rule, view_class, annotation))))
+        thread.start()
+        thread.join()
+        test_client, result = results[0]
+        # The thread gets its own test client.
+        assert test_client is not self.harness.test_client
+        assert self.harness.test_client is self.harness.get_test_client()
+        assert result == self.harness.request(rule, view_class, annotation)
+
+
+class TestDocsFlaskDirective(TestCase):
+
+    def setUp(self):
+        flask_folder = os.path.join(os.path.dirname(__file__))
+        self.harness = AutoFlaskHarness(
+            os.path.join(flask_folder, 'flask_app.py'), 'http://127.0.0.1/')
+        self.harness.setup_app(mock.sentinel.sphinx_app)
+
+        class Directive(AutoFlaskDirective):
+            harness = self.harness
+
+        self.directive = Directive
+
+    def tearDown(self):
+        self.harness.teardown_app(mock.sentinel.sphinx_app)
+
+    def test_get_fingerprint(self):
+        fingerprint = self.directive.get_fingerprint()
+        assert 64 == len(fingerprint)
+        assert fingerprint == self.directive.get_fingerprint()
+
+        # Example values are part of the fingerprint.
+        self.harness.define_example_values('GET', '/note/', {'note_id': 2})
+        example_fingerprint = self.directive.get_fingerprint()
+        assert fingerprint != example_fingerprint
+
+        self.harness.headers = {'X-Foo': 'foo'}
+        assert example_fingerprint != self.directive.get_fingerprint()
+
+    def test_get_fingerprint_logic_source(self):
+        fingerprint = self.directive.get_fingerprint()
+        with mock.patch('doctor.docs.base.inspect.getsource',
+                        return_value='def logic(): pass'):
+            assert fingerprint != self.directive.get_fingerprint()
+
+    def test_get_outdated_docs(self):
+        env = mock.Mock(spec=[])
+        outdated = self.directive.get_outdated_docs
+        assert [] == outdated(None, env, set(), set(), set())
+
+        env.autoflask = DirectiveState()
+        env.autoflask.doc_names.update(['api', 'notes', 'other'])
+        env.autoflask.fingerprints.update({
+            'api': self.directive.get_fingerprint(), 'notes': 'old'})
+        assert ['notes', 'other'] == outdated(None, env, set(), set(), set())
+
+        # States pickled without fingerprints are always outdated.
+        del env.autoflask.fingerprints
+        assert ['api', 'notes', 'other'] == outdated(
+            None, env, set(), set(), set())
+
+    def test_purge_docs(self):
+        env = mock.Mock(spec=[])
+        env.autoflask = DirectiveState()
+        env.autoflask.doc_names.update(['api', 'notes'])
+        env.autoflask.fingerprints.update({'api': 'a', 'notes': 'b'})
+        self.directive.purge_docs(None, env, 'api')
+        assert {'notes'} == env.autoflask.doc_names
+        assert {'notes': 'b'} == env.autoflask.fingerprints
@@ -0,0 +1,71 @@
+import pickle
+
+import mock
+
+from doctor import errors
+from doctor.errors import TypeSystemError
+from doctor.types import String, string
+
+
+def test_type_system_error_renders_lazily():
+    Name = string('A name.', max_length=5)
+    with mock.patch('doctor.errors._get_template_fields',
+                    wraps=errors._get_template_fields) as get_fields:
+        e = TypeSystemError(cls=Name, code='max_length')
+        assert not get_fields.called
+        assert 'Must have no more than 5 characters.' == e.detail
+        assert 'Must have no more than 5 characters.' == str(e)
+        assert ('Must have no more than 5 characters.',) == e.args
+    # The message is only rendered once.
+    assert 1 == get_fields.call_count
+    assert (Name, 'max_length') == (e.cls, e.code)
+
+
+def test_type_system_error_inherited_attributes():
+    # Only the attributes used by the message are read, and they can be
+    # inherited.
+    class Base(String):
+        description = 'base'
+        min_length = 3
+
+    class Child(Base):
+        pass
+
+    e = TypeSystemError(cls=Child, code='min_length')
+    assert 'Must have at least 3 characters.' == e.detail
+
+
+def test_type_system_error_template_fields():
+    assert ('a', 'b') == tuple(sorted(errors._get_template_fields(
+        '{a} and {b.c} and {a[0]} {{d}}')))
+
+
+def test_type_system_error_detail():
+    e = TypeSystemError('Bad value.')
+    assert 'Bad value.' == e.detail == str(e)
+    e.detail = 'Changed.'
+    assert 'Changed.' == str(e)
+
+    # A single error is included in the message.
+    e = TypeSystemError({'item_id': 'bad'}, errors={'item_id': 'bad'})
+    assert {'item_id': 'bad'} == e.detail
+    assert 'item_id - bad' == str(e)
+    assert {'item_id': 'bad'} == e.errors
+
+    e = TypeSystemError({'a': 'bad', 'b': 'bad'},
+                        errors={'a': 'bad', 'b': 'bad'})
+    assert "{'a': 'bad', 'b': 'bad'}" == str(e)
+
+
+def test_type_system_error_pickle():
+    # Types made by the factories can't be pickled, so errors are pickled
+    # with their rendered messages.
+    Name = string('A name.', max_length=5)
+    for e in (TypeSystemError(cls=Name, code='max_length'),
+              TypeSystemError({'name': 'bad'}, errors={'name': 'bad'})):
+        unpickled = pickle.loads(pickle.dumps(e))
+        assert isinstance(unpickled, TypeSystemError)
+        assert e.detail == unpickled.detail
+        assert e.errors == unpickled.errors
+        assert str(e) == str(unpickled)
+        assert unpickled.cls is None and unpickled.code is None
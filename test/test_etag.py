@@ -0,0 +1,195 @@
+import asyncio
+
+import mock
+import pytest
+
+from doctor import asgi
+from doctor.etag import (
+    check_etag, compute_etag, etag_matches, get_version_etag)
+from doctor.flask import create_routes
+from doctor.pipeline import Request, handle_request
+from doctor.response import Response
+from doctor.routing import Route, get, post
+
+from .base import FlaskTestCase
+from .types import Item, ItemId
+from .utils import add_doctor_attrs
+
+
+def get_item(item_id: ItemId) -> Item:
+    return {'item_id': item_id}
+
+
+def get_item_version(item_id: ItemId) -> int:
+    return item_id * 10
+
+
+def test_compute_etag():
+    etag = compute_etag({'item_id': 1})
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert len(etag) == 36
+    assert etag == compute_etag({'item_id': 1})
+    assert etag != compute_etag({'item_id': 2})
+
+
+def test_get_version_etag():
+    assert get_version_etag(1) == get_version_etag('1')
+    assert get_version_etag(b'1') == get_version_etag('1')
+    assert get_version_etag(1) != get_version_etag(2)
+    # Version tokens don't collide with hashed content.
+    assert get_version_etag('1') != compute_etag(1)
+
+
+@pytest.mark.parametrize('if_none_match,expected', [
+    (None, False),
+    ('', False),
+    ('*', True),
+    ('"a"', True),
+    ('W/"a"', True),
+    ('"b", W/"a"', True),
+    ('"b", "c"', False),
+])
+def test_etag_matches(if_none_match, expected):
+    assert expected == etag_matches(if_none_match, 'W/"a"')
+
+
+def test_check_etag():
+    check_etag('get', True)
+    check_etag('get', get_item_version)
+    check_etag('post', False)
+    with pytest.raises(ValueError, match='only supported for GET'):
+        check_etag('post', True)
+    with pytest.raises(ValueError, match='must be a bool or a callable'):
+        check_etag('get', 'yes')
+    with pytest.raises(ValueError, match='only supported for GET'):
+        post(get_item, etag=True)
+
+    async def get_item_version_async(item_id: ItemId):
+        return item_id
+
+    with pytest.raises(ValueError, match='must not be an async def'):
+        get(get_item, etag=get_item_version_async)
+
+
+def test_handle_request_etag():
+    logic = add_doctor_attrs(get_item)
+    # ETags are opt in.
+    request = Request('GET', path_params={'item_id': 1})
+    assert ({'item_id': 1}, 200) == handle_request(request, logic)
+
+    logic = get(get_item, etag=True).logic
+    etag = compute_etag({'item_id': 1})
+    assert ({'item_id': 1}, 200, {'ETag': etag}) == handle_request(
+        request, logic)
+
+    request = Request('GET', path_params={'item_id': 1},
+                      headers={'if-none-match': etag})
+    assert (None, 304, {'ETag': etag}) == handle_request(request, logic)
+
+    request = Request('GET', path_params={'item_id': 2},
+                      headers={'if-none-match': etag})
+    assert 200 == handle_request(request, logic)[1]
+
+
+def test_handle_request_etag_response_headers():
+    def logic(item_id: ItemId) -> Response[Item]:
+        if item_id == 2:
+            return Response({'item_id': 2}, headers={'ETag': '"custom"'})
+        return Response({'item_id': item_id}, headers={'X-Id': '1'})
+
+    logic = get(logic, etag=True).logic
+    etag = compute_etag({'item_id': 1})
+    request = Request('GET', path_params={'item_id': 1})
+    assert ({'item_id': 1}, 200, {'ETag': etag, 'X-Id': '1'}) == (
+        handle_request(request, logic))
+    request = Request('GET', path_params={'item_id': 1},
+                      headers={'if-none-match': etag})
+    assert (None, 304, {'ETag': etag, 'X-Id': '1'}) == handle_request(
+        request, logic)
+
+    # An ETag set by the logic function is used.
+    request = Request('GET', path_params={'item_id': 2},
+                      headers={'if-none-match': '"custom"'})
+    assert (None, 304, {'ETag': '"custom"'}) == handle_request(
+        request, logic)
+
+
+def test_handle_request_version_etag():
+    calls = []
+
+    def logic(item_id: ItemId) -> Item:
+        calls.append(item_id)
+        return {'item_id': item_id}
+
+    version = mock.Mock(side_effect=get_item_version)
+    logic = get(logic, etag=version).logic
+    etag = get_version_etag(10)
+
+    request = Request('GET', path_params={'item_id': 1})
+    assert ({'item_id': 1}, 200, {'ETag': etag}) == handle_request(
+        request, logic)
+    version.assert_called_once_with(item_id=1)
+
+    # The logic function isn't called if the version matches.
+    request = Request('GET', path_params={'item_id': 1},
+                      headers={'if-none-match': etag})
+    assert (None, 304, {'ETag': etag}) == handle_request(request, logic)
+    assert [1] == calls
+
+    # The content is hashed if no version is returned.
+    version.side_effect = None
+    version.return_value = None
+    request = Request('GET', path_params={'item_id': 1})
+    assert compute_etag({'item_id': 1}) == handle_request(
+        request, logic)[2]['ETag']
+
+
+def test_asgi_etag():
+    routes = (Route('/items/{item_id}/', methods=(
+        get(get_item, etag=get_item_version),)),)
+    (_, handler), = asgi.create_routes(routes)
+    etag = get_version_etag(10).encode('latin-1')
+
+    def call(headers):
+        scope = {'type': 'http', 'method': 'GET', 'headers': headers,
+                 'path_params': {'item_id': 1}}
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.get_event_loop().run_until_complete(
+            handler(scope, receive, send))
+        return sent[0]['status'], dict(sent[0]['headers']), sent[1]['body']
+
+    status, headers, body = call([])
+    assert (200, etag, b'{"item_id": 1}') == (status, headers[b'etag'], body)
+
+    # Repeated headers are combined.
+    status, headers, body = call([(b'If-None-Match', b'"a"'),
+                                  (b'If-None-Match', etag)])
+    assert (304, etag, b'') == (status, headers[b'etag'], body)
+    assert b'0' == headers[b'content-length']
+
+
+class ETagFlaskTestCase(FlaskTestCase):
+
+    def get_routes(self):
+        routes = (Route('/items/<int:item_id>/', methods=(
+            get(get_item, etag=True),)),)
+        return create_routes(routes)
+
+    def test_etag(self):
+        response = self.client.get('/items/1/')
+        assert 200 == response.status_code
+        etag = response.headers['ETag']
+        assert compute_etag({'item_id': 1}) == etag
+
+        response = self.client.get('/items/1/',
+                                   headers={'If-None-Match': etag})
+        assert 304 == response.status_code
+        assert b'' == response.data
+        assert etag == response.headers['ETag']
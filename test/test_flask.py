@@ -2,21 +2,26 @@ import inspect
 import os
 from functools import wraps
 
+import flask_restful
 import mock
+from flask import Flask
 import pytest
+import simplejson as json
 
+from doctor import json_backend
 from doctor.errors import (
     ForbiddenError, ImmutableError, InvalidValueError, NotFoundError,
     UnauthorizedError)
 from doctor.flask import (
     handle_http, HTTP400Exception, HTTP401Exception, HTTP403Exception,
-    HTTP404Exception, HTTP409Exception, HTTP500Exception,
+    HTTP404Exception, HTTP409Exception, HTTP500Exception, output_json,
     should_raise_response_validation_errors)
 from doctor.types import new_type
 from doctor.response import Response
 from doctor.utils import (
     add_param_annotations, get_params_from_func, Params, RequestParamAnnotation)
 
+from .base import FlaskTestCase
 from .types import (
     Auth, Colors, ColorsOrObject, FooInstance, Item, ItemId, IncludeDeleted,
     Latitude)
@@ -74,14 +79,14 @@ def test_handle_http_with_json(mock_request, mock_post_logic):
     mock_request.method = 'POST'
     mock_request.content_type = 'application/json; charset=UTF8'
     mock_request.mimetype = 'application/json'
-    mock_request.json = {
+    mock_request.get_data.return_value = json.dumps({
         'item': {
             'item_id': 1,
         },
         'colors': ['blue'],
         'optional_id': None,
         'location.lat': 45.2342343,
-    }
+    })
     mock_handler = mock.Mock()
 
     actual = handle_http(mock_handler, (), {}, mock_post_logic)
@@ -102,11 +107,11 @@ def test_handle_http_with_route_that_defines_req_obj_type(mock_request):
     mock_request.method = 'POST'
     mock_request.content_type = 'application/json; charset=UTF8'
     mock_request.mimetype = 'application/json'
-    mock_request.json = {
+    mock_request.get_data.return_value = json.dumps({
         'foo': 'A foo',
         'foo_id': 1,
         'bar': False,
-    }
+    })
     mock_handler = mock.Mock()
     actual = handle_http(mock_handler, (), {}, logic)
     assert actual == ({'foo_id': 1, 'foo': 'A foo', 'bar': False}, 201)
@@ -159,7 +164,8 @@ def test_handle_http_object_array_types(mock_request, mock_post_logic):
     mock_request.method = 'POST'
     mock_request.content_type = 'application/json; charset=UTF8'
     mock_request.mimetype = 'application/json'
-    mock_request.json = {'item': {'item_id': 1}, 'colors': ['blue', 'green']}
+    mock_request.get_data.return_value = json.dumps(
+        {'item': {'item_id': 1}, 'colors': ['blue', 'green']})
 
     mock_handler = mock.Mock()
     actual = handle_http(mock_handler, (), {}, mock_post_logic)
@@ -217,7 +223,7 @@ def test_handle_http_missing_multiple_required_args(
     mock_request.method = 'POST'
     mock_request.content_type = 'application/json; charset=UTF8'
     mock_request.mimetype = 'application/json'
-    mock_request.json = {}
+    mock_request.get_data.return_value = json.dumps({})
 
     mock_handler = mock.Mock()
     with pytest.raises(HTTP400Exception,
@@ -229,7 +235,8 @@ def test_handle_http_multiple_invalid_args(mock_request, mock_post_logic):
     mock_request.method = 'POST'
     mock_request.content_type = 'application/json; charset=UTF8'
     mock_request.mimetype = 'application/json'
-    mock_request.json = {'item': 1, 'colors': 'blue'}
+    mock_request.get_data.return_value = json.dumps(
+        {'item': 1, 'colors': 'blue'})
 
     mock_handler = mock.Mock()
     expected_msg = ("{'item': 'Must be an object.', "
@@ -370,7 +377,7 @@ def test_handle_http_response_type_validation(
 @mock.patch('doctor.flask.should_raise_response_validation_errors')
 @mock.patch('doctor.flask.current_app')
 def test_handle_http_http_errors(
-        mock_app, mock_should, mock_request, mock_get_logic):
+        mock_app, mock_should, mock_request, mock_get_logic, caplog):
     mock_app.config = {'DEBUG': False}
 
     mock_request.method = 'GET'
@@ -407,8 +414,42 @@ def test_handle_http_http_errors(
     mock_get_logic.side_effect = Exception('internal error')
     with pytest.raises(HTTP500Exception, match='Uncaught error in logic func'):
         handle_http(mock_handler, (), {}, mock_get_logic)
+    # The traceback of the exception is logged.
+    record, = [r for r in caplog.records if r.levelname == 'ERROR']
+    assert mock_get_logic.side_effect is record.exc_info[1]
+    assert 'Traceback' in caplog.text
 
     # 500 in debug mode
     mock_app.config = {'DEBUG': True}
     with pytest.raises(Exception, match='internal error'):
         handle_http(mock_handler, (), {}, mock_get_logic)
+
+
+def test_output_json():
+    with Flask('test').test_request_context():
+        response = output_json({'item_id': 1}, 201, {'X-Foo': 'bar'})
+    assert response.status_code == 201
+    assert response.headers['Content-Type'] == 'application/json'
+    assert response.headers['X-Foo'] == 'bar'
+    assert json.loads(response.get_data(as_text=True)) == {'item_id': 1}
+
+
+class OutputJsonFlaskTestCase(FlaskTestCase):
+
+    def create_app(self):
+        app = Flask('test')
+        app.config['TESTING'] = True
+        api = flask_restful.Api(app)
+        api.representations['application/json'] = output_json
+        for url, handler in self.get_routes():
+            api.add_resource(handler, url)
+        return api.app
+
+    def test_output_json(self):
+        with mock.patch('doctor.flask.json_backend.dumps',
+                        wraps=json_backend.dumps) as dumps:
+            response = self.client.get('/test/?item_id=1&name=foo')
+        assert 200 == response.status_code
+        assert 'application/json' == response.headers['Content-Type']
+        assert [1, 'foo'] == response.json
+        dumps.assert_called_once_with((1, 'foo'))
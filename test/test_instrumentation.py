@@ -0,0 +1,113 @@
+import mock
+import pytest
+
+from doctor.errors import NotFoundError
+from doctor.instrumentation import (
+    HistogramCollector, Instrumentation, NOOP_INSTRUMENTATION, PHASES,
+    PhaseTimer, get_instrumentation, set_instrumentation)
+from doctor.pipeline import Error, Request, handle_request, start_timer
+from doctor.routing import Route, get, create_routes
+
+from .types import Item, ItemId
+
+
+def get_item(item_id: ItemId) -> Item:
+    if item_id == 404:
+        raise NotFoundError('Item not found')
+    return {'item_id': item_id}
+
+
+@pytest.fixture
+def collector():
+    collector = HistogramCollector(buckets=(0.5, 0.1))
+    set_instrumentation(collector)
+    yield collector
+    set_instrumentation(None)
+
+
+def test_phase_timer():
+    with mock.patch('doctor.instrumentation.time.perf_counter',
+                    side_effect=[1.0, 1.5, 1.75]):
+        timer = PhaseTimer()
+        timer.mark('a')
+        timer.mark('b')
+    assert {'a': 0.5, 'b': 0.25} == timer.timings
+
+
+def test_noop_instrumentation():
+    assert get_instrumentation() is NOOP_INSTRUMENTATION
+    # Requests aren't timed by default.
+    assert start_timer() is None
+    NOOP_INSTRUMENTATION.record('/', 'GET', {'parse': 1.0})
+
+
+def test_histogram_collector(collector):
+    assert collector.buckets == (0.1, 0.5)
+    collector.record('/items/', 'GET', {'parse': 0.05, 'logic': 0.2})
+    collector.record('/items/', 'GET', {'parse': 0.5, 'logic': 1.0})
+
+    histogram = collector.get('/items/', 'GET', 'parse')
+    assert histogram.counts == (1, 1, 0)
+    assert (histogram.count, histogram.min, histogram.max) == (2, 0.05, 0.5)
+    assert histogram.total == pytest.approx(0.55)
+    assert histogram.mean == pytest.approx(0.275)
+
+    histogram = collector.get('/items/', 'GET')
+    assert histogram.counts == (0, 1, 1)
+    assert histogram.total == pytest.approx(1.75)
+
+    assert collector.get('/items/', 'POST') is None
+    assert set(collector.snapshot()) == {
+        ('/items/', 'GET', 'parse'), ('/items/', 'GET', 'logic'),
+        ('/items/', 'GET', 'total')}
+    collector.reset()
+    assert {} == collector.snapshot()
+
+
+def test_handle_request_records_phases(collector):
+    (route, handler), = create_routes(
+        (Route('/items/<int:item_id>/', methods=(get(get_item),)),),
+        mock.Mock(), object)
+    logic = handler.get.__wrapped__
+
+    request = Request('GET', path='/items/1/', path_params={'item_id': 1})
+    assert ({'item_id': 1}, 200) == handle_request(request, logic)
+    histograms = collector.snapshot()
+    assert {('/items/<int:item_id>/', 'GET', phase)
+            for phase in PHASES + ('total',)} == set(histograms)
+    assert all(h.count == 1 for h in histograms.values())
+
+    # Only the phases that completed are recorded for failed requests.
+    collector.reset()
+    request = Request('GET', path='/items/404/', path_params={'item_id': 404})
+    assert isinstance(handle_request(request, logic), Error)
+    assert {('/items/<int:item_id>/', 'GET', phase)
+            for phase in ('parse', 'required', 'validate', 'total')} == (
+        set(collector.snapshot()))
+
+
+def test_handle_request_without_route(collector):
+    def logic(item_id: ItemId):
+        return item_id
+    logic = get(logic).logic
+
+    request = Request('GET', path='/foo/', path_params={'item_id': 1})
+    handle_request(request, logic)
+    assert collector.get('/foo/', 'GET').count == 1
+
+
+def test_instrumentation_errors_are_logged():
+    class BadInstrumentation(Instrumentation):
+        def record(self, route, method, timings):
+            raise ValueError('boom')
+
+    set_instrumentation(BadInstrumentation())
+    try:
+        request = Request('GET', path='/items/1/', path_params={'item_id': 1})
+        with mock.patch('doctor.pipeline.logging') as mock_logging:
+            result = handle_request(request, get(get_item).logic)
+    finally:
+        set_instrumentation(None)
+    assert ({'item_id': 1}, 200) == result
+    assert mock_logging.exception.call_args == mock.call(
+        'Error recording timings for %s %s.', 'GET', '/items/1/')
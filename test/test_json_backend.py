@@ -0,0 +1,67 @@
+import os
+
+import mock
+import pytest
+import simplejson
+
+from doctor import json_backend
+from doctor.json_backend import JSONBackend, register_backend, set_backend
+from doctor.parsers import parse_json, parse_value
+from doctor.pipeline import Request
+
+
+@pytest.fixture(autouse=True)
+def reset_backend():
+    factories = dict(json_backend._backend_factories)
+    yield
+    json_backend._backend = None
+    json_backend._backend_factories.clear()
+    json_backend._backend_factories.update(factories)
+
+
+def test_default_backend():
+    backend = json_backend.get_backend()
+    assert backend.name == 'simplejson'
+    assert backend.loads is simplejson.loads
+    assert json_backend.get_backend() is backend
+
+
+@mock.patch.dict(os.environ, {'DOCTOR_JSON_BACKEND': 'json'})
+def test_backend_from_environment():
+    assert json_backend.get_backend().name == 'json'
+
+
+@pytest.mark.parametrize('name', ['json', 'orjson', 'simplejson', 'ujson'])
+def test_builtin_backends(name):
+    pytest.importorskip(name)
+    backend = set_backend(name)
+    assert backend.name == name
+    assert json_backend.get_backend() is backend
+    assert json_backend.loads('{"a": [1, 2.5, null]}') == {'a': [1, 2.5, None]}
+    assert json_backend.loads(b'[true]') == [True]
+    dumped = json_backend.dumps({'a': [1, 'b']})
+    assert isinstance(dumped, str)
+    assert simplejson.loads(dumped) == {'a': [1, 'b']}
+    with pytest.raises(ValueError):
+        json_backend.loads('{bad')
+
+
+def test_set_backend_unknown():
+    with pytest.raises(ValueError, match="Unknown JSON backend 'foo'"):
+        set_backend('foo')
+
+
+def test_register_backend():
+    loads = mock.Mock(return_value={'item_id': 1})
+    register_backend('mock', lambda: JSONBackend('mock', loads, str))
+    set_backend('mock')
+
+    # The parsers and request bodies use the active backend.
+    assert parse_json('{"item_id": 2}') == {'item_id': 1}
+    assert parse_value('{}', ['object']) == ('object', {'item_id': 1})
+    request = Request('POST', 'application/json', body=b'{"item_id": 3}')
+    assert request.json == {'item_id': 1}
+    assert loads.call_args_list == [
+        mock.call('{"item_id": 2}'), mock.call('{}'),
+        mock.call(b'{"item_id": 3}')]
+    assert json_backend.dumps(1) == '1'
@@ -3,12 +3,14 @@
 import inspect
 import json
 
+import mock
 import pytest
 
 from doctor.errors import ParseError, TypeSystemError
 from doctor.parsers import (
+    CacheInfo, CoercionCache, get_coercion_cache_info, get_param_coercer,
     map_param_names, parse_form_and_query_params, parse_json, parse_value,
-    _parse_string)
+    set_coercion_cache_size, _MISSING, _parse_string)
 from doctor.types import string
 
 from .base import TestCase
@@ -139,6 +141,17 @@ class TestParsers(TestCase):
         with pytest.raises(ValueError):
             parse_form_and_query_params(query_params, sig.parameters)
 
+    def test_get_param_coercer_allowed_types(self):
+        # The allowed types are resolved on first use.  A failure resolving
+        # them doesn't leave a partial list of types behind.
+        Unknown = type('Unknown', (Color,), {'native_type': bytes})
+        AgeOrUnknown = type('AgeOrUnknown', (ColorsOrObject,),
+                            {'types': [Age, Unknown]})
+        coerce = get_param_coercer(AgeOrUnknown)
+        for _ in range(2):
+            with pytest.raises(KeyError):
+                coerce('22')
+
     def test_parse_form_and_query_params_no_errors_with_custom_parser(self):
         sig = inspect.signature(logic2)
         query_params = {
@@ -256,3 +269,64 @@ class TestParsers(TestCase):
             'opt_in': True,
         }
         assert expected == actual
+
+
+class TestCoercionCache(TestCase):
+
+    def tearDown(self):
+        set_coercion_cache_size(None)
+
+    def test_lru_eviction(self):
+        cache = CoercionCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1
+        # b is the least recently used so it's evicted.
+        cache.put('c', 3)
+        assert cache.get('b') is _MISSING
+        assert cache.get('c') == 3
+        assert cache.info() == CacheInfo(
+            hits=2, misses=1, maxsize=2, currsize=2)
+        cache.clear()
+        assert cache.info() == CacheInfo(0, 0, 2, 0)
+
+    def test_invalid_maxsize(self):
+        with pytest.raises(ValueError, match='maxsize must be greater'):
+            CoercionCache(0)
+
+    def test_disabled_by_default(self):
+        assert get_coercion_cache_info() is None
+        set_coercion_cache_size(10)
+        assert get_coercion_cache_info() == CacheInfo(0, 0, 10, 0)
+        set_coercion_cache_size(0)
+        assert get_coercion_cache_info() is None
+
+    def test_param_coercion_is_cached(self):
+        set_coercion_cache_size(10)
+        sig = inspect.signature(logic)
+        query_params = {'age': '22', 'color': 'blue', 'is_deleted': 'true'}
+        expected = {'age': 22, 'color': 'blue', 'is_deleted': True}
+        with mock.patch('doctor.parsers.parse_value',
+                        wraps=parse_value) as mock_parse_value:
+            for _ in range(3):
+                actual = parse_form_and_query_params(
+                    query_params, sig.parameters)
+                assert expected == actual
+        assert mock_parse_value.call_count == 3
+        assert get_coercion_cache_info() == CacheInfo(6, 3, 10, 3)
+
+        # The same raw value of a different type is cached separately.
+        assert get_param_coercer(Color)('22') == '22'
+        assert get_coercion_cache_info().currsize == 4
+
+    def test_errors_and_mutable_values_are_not_cached(self):
+        set_coercion_cache_size(10)
+        coerce = get_param_coercer(Age)
+        for _ in range(2):
+            with pytest.raises(ParseError):
+                coerce('not an int')
+        coerce = get_param_coercer(ColorsOrObject)
+        first = coerce('["blue"]')
+        assert first == ['blue']
+        assert coerce('["blue"]') is not first
+        assert get_coercion_cache_info() == CacheInfo(0, 4, 10, 0)
@@ -0,0 +1,305 @@
+import mock
+import pytest
+
+from doctor.body import BodyLimits
+from doctor.errors import InvalidValueError, NotFoundError, TypeSystemError
+from doctor.pipeline import (
+    Error, LogicCall, Request, finish_call, get_error, get_logic_call,
+    get_params, get_result, handle_request, prepare_call, validate_response,
+    validate_shallow)
+from doctor.plan import create_validation_plan
+from doctor.response import (
+    Response, ResponseValidation, get_response_validation,
+    set_response_validation)
+from doctor.routing import Route, create_routes, get, post
+from doctor.types import array
+
+from .types import Colors, FooInstance, Item, ItemId, Latitude, Name
+from .utils import add_doctor_attrs
+
+
+def get_item(item_id: ItemId, lat: Latitude = None) -> Item:
+    return {'item_id': item_id}
+
+
+def test_request_json():
+    request = Request('POST', 'application/json', body=b'{"a": 1}')
+    assert request.json == {'a': 1}
+
+    request = Request('POST', 'application/json', body=b'{"a": 1}',
+                      json_loader=lambda: {'b': 2})
+    assert request.json == {'b': 2}
+
+    request = Request('POST', 'application/json', body=b'{"a":')
+    with pytest.raises(InvalidValueError, match='not valid JSON'):
+        request.json
+
+
+def test_request_has_json_body():
+    assert Request('POST', 'application/json').has_json_body
+    assert not Request('GET', 'application/json').has_json_body
+    assert not Request('POST', 'application/x-www-form-urlencoded')\
+        .has_json_body
+
+
+def test_get_params():
+    plan = create_validation_plan(add_doctor_attrs(get_item))
+
+    request = Request('GET', query={'lat': '45.1', 'foo': 'bar'},
+                      path_params={'item_id': 1})
+    assert get_params(plan, request) == {'item_id': 1, 'lat': 45.1}
+
+    request = Request('PUT', 'application/json',
+                      body=b'{"item_id": 2, "location.lat": null}')
+    assert get_params(plan, request) == {'item_id': 2, 'lat': None}
+
+    with pytest.raises(InvalidValueError, match='item_id is required'):
+        get_params(plan, Request('GET'))
+
+    request = Request('GET', query={'item_id': 'foo'})
+    with pytest.raises(TypeSystemError, match='item_id'):
+        get_params(plan, request)
+
+
+def test_get_logic_call():
+    plan = create_validation_plan(add_doctor_attrs(get_item))
+    request = Request('GET', query={'item_id': '1'})
+    assert get_logic_call(plan, request, ('pos',)) == (
+        ('pos',), {'item_id': 1})
+
+    def logic(foo: FooInstance):
+        return foo
+
+    plan = create_validation_plan(
+        add_doctor_attrs(logic, req_obj_type=FooInstance))
+    request = Request('POST', 'application/json', body=b'{"foo_id": 1}')
+    assert get_logic_call(plan, request) == (({'foo_id': 1},), {})
+
+
+def test_get_result():
+    plan = create_validation_plan(add_doctor_attrs(get_item))
+    assert get_result(plan, Request('GET'), {'item_id': 1}) == (
+        {'item_id': 1}, 200)
+    assert get_result(plan, Request('POST'), {'item_id': 1}) == (
+        {'item_id': 1}, 201)
+
+    response = Response({'item_id': 1}, {'X-Foo': 'bar'}, status_code=202)
+    assert get_result(plan, Request('GET'), response) == (
+        {'item_id': 1}, 202, {'X-Foo': 'bar'})
+
+    # Invalid responses only raise if should_raise returns True.
+    assert get_result(plan, Request('GET'), {'foo': 'bar'},
+                      should_raise=lambda: False) == ({'foo': 'bar'}, 200)
+    with pytest.raises(TypeSystemError, match='does not validate'):
+        get_result(plan, Request('GET'), {'foo': 'bar'},
+                   should_raise=lambda: True)
+
+
+def test_validate_shallow():
+    Items = array('items', items=Item, min_items=1, max_items=2)
+    # Properties and items aren't validated.
+    validate_shallow(Item, {'item_id': 'foo'})
+    validate_shallow(Items, [{'foo': 'bar'}])
+    validate_shallow(Name, 'name')
+
+    with pytest.raises(TypeSystemError, match='Must be an object'):
+        validate_shallow(Item, [])
+    with pytest.raises(TypeSystemError) as exc:
+        validate_shallow(Item, {'foo': 1})
+    assert {'item_id': 'This field is required.',
+            'foo': 'Additional properties are not allowed.'} == (
+        exc.value.detail)
+    with pytest.raises(TypeSystemError, match='Must be a list'):
+        validate_shallow(Items, {})
+    with pytest.raises(TypeSystemError, match='Not enough items'):
+        validate_shallow(Items, [])
+    with pytest.raises(TypeSystemError, match='Too many items'):
+        validate_shallow(Items, [{}, {}, {}])
+    with pytest.raises(TypeSystemError, match='Must not be blank'):
+        validate_shallow(Name, '')
+
+
+@pytest.mark.parametrize('validation,invalid,raises', [
+    (ResponseValidation('off'), {'foo': 'bar'}, False),
+    (ResponseValidation('shallow'), {'item_id': 'foo'}, False),
+    (ResponseValidation('shallow'), {'foo': 'bar'}, True),
+    (ResponseValidation('full'), {'item_id': 'foo'}, True),
+    (ResponseValidation('sampled', sample_rate=0), {'foo': 'bar'}, False),
+    (ResponseValidation('sampled', sample_rate=1), {'item_id': 'foo'}, True),
+])
+def test_validate_response_modes(validation, invalid, raises):
+    # Per route validation.
+    plan = create_validation_plan(
+        get(get_item, response_validation=validation).logic)
+    validate_response(plan, Request('GET'), {'item_id': 1},
+                      should_raise=lambda: True)
+    with mock.patch('doctor.pipeline.logging') as mock_logging:
+        if raises:
+            with pytest.raises(TypeSystemError, match='does not validate'):
+                validate_response(plan, Request('GET'), invalid,
+                                  should_raise=lambda: True)
+            assert mock_logging.warning.called
+        else:
+            validate_response(plan, Request('GET'), invalid,
+                              should_raise=lambda: True)
+            assert not mock_logging.warning.called
+
+    # Global validation.
+    plan = create_validation_plan(add_doctor_attrs(get_item))
+    set_response_validation(validation)
+    try:
+        validate_response(plan, Request('GET'), Response(invalid),
+                          should_raise=lambda: False)
+        if raises:
+            with pytest.raises(TypeSystemError):
+                validate_response(plan, Request('GET'), Response(invalid),
+                                  should_raise=lambda: True)
+    finally:
+        set_response_validation(None)
+
+
+def test_response_validation_config():
+    with pytest.raises(ValueError, match="Invalid response validation mode"):
+        get(get_item, response_validation=ResponseValidation('foo'))
+    with pytest.raises(ValueError, match='must be between 0 and 1'):
+        set_response_validation(ResponseValidation('sampled', 2))
+
+    assert ResponseValidation() == get_response_validation()
+    env = {'RESPONSE_VALIDATION_MODE': 'sampled',
+           'RESPONSE_VALIDATION_SAMPLE_RATE': '0.5'}
+    try:
+        with mock.patch.dict('os.environ', env):
+            # The environment variables are cached until reset.
+            assert ResponseValidation() == get_response_validation()
+            set_response_validation(None)
+            assert ResponseValidation('sampled', 0.5) == (
+                get_response_validation())
+            set_response_validation(ResponseValidation('off'))
+            assert ResponseValidation('off') == get_response_validation()
+    finally:
+        set_response_validation(None)
+
+    # Invalid environment variables fail when routes are created.
+    routes = (Route('/items/', methods=(get(get_item),)),)
+    for env in ({'RESPONSE_VALIDATION_MODE': 'foo'},
+                {'RESPONSE_VALIDATION_MODE': 'sampled',
+                 'RESPONSE_VALIDATION_SAMPLE_RATE': 'a'},
+                {'RESPONSE_VALIDATION_MODE': 'sampled',
+                 'RESPONSE_VALIDATION_SAMPLE_RATE': '2'}):
+        try:
+            with mock.patch.dict('os.environ', env):
+                with pytest.raises(ValueError, match='(?i)response validation'):
+                    create_routes(routes, mock.Mock(), object)
+        finally:
+            set_response_validation(None)
+
+
+def test_validate_response_sampled():
+    plan = create_validation_plan(get(get_item, response_validation=(
+        ResponseValidation('sampled', sample_rate=0.25))).logic)
+    with mock.patch('doctor.pipeline.random.random', side_effect=[
+            0.1, 0.3, 0.2]):
+        with mock.patch.object(Item, '__init__',
+                               return_value=None) as mock_init:
+            for _ in range(3):
+                validate_response(plan, Request('GET'), {'item_id': 1})
+    assert mock_init.call_count == 2
+
+
+def test_get_error():
+    logic = add_doctor_attrs(get_item)
+    e = NotFoundError('not found')
+    assert get_error(e, logic) == Error(404, e, None, e)
+
+    e = TypeSystemError({'item_id': 'bad'}, errors={'item_id': 'bad'})
+    assert get_error(e, logic) == Error(400, e, {'item_id': 'bad'}, e)
+
+    e = ValueError('boom')
+    assert get_error(e, logic) == Error(
+        500, 'Uncaught error in logic function', None, e)
+
+    logic._doctor_allowed_exceptions = [ValueError]
+    assert get_error(e, logic) is None
+
+
+def test_handle_request():
+    def logic(item_id: ItemId, colors: Colors = None) -> Item:
+        if item_id == 2:
+            raise NotFoundError('not found')
+        if item_id == 3:
+            raise KeyError('key')
+        return {'item_id': item_id}
+
+    logic = add_doctor_attrs(logic)
+    request = Request('GET', query={'item_id': '1', 'colors': '["blue"]'})
+    assert handle_request(request, logic) == ({'item_id': 1}, 200)
+
+    request = Request('GET', path_params={'item_id': 2})
+    error = handle_request(request, logic)
+    assert isinstance(error, Error)
+    assert error.status_code == 404
+
+    request = Request('GET', path_params={'item_id': 3})
+    assert handle_request(request, logic).status_code == 500
+    logic._doctor_allowed_exceptions = [KeyError]
+    with pytest.raises(KeyError):
+        handle_request(request, logic)
+
+
+def test_prepare_call_and_finish_call():
+    logic = add_doctor_attrs(get_item)
+    request = Request('GET', query={'item_id': '1'})
+    call = prepare_call(request, logic)
+    assert isinstance(call, LogicCall)
+    assert ((), {'item_id': 1}) == (call.args, call.kwargs)
+    assert ({'item_id': 1}, 200) == finish_call(
+        request, call, logic(*call.args, **call.kwargs))
+    # Exceptions raised by the logic function are turned into errors.
+    error = finish_call(request, call, NotFoundError('not found'))
+    assert (404, 'not found') == (error.status_code, str(error.description))
+    logic._doctor_allowed_exceptions = [KeyError]
+    with pytest.raises(KeyError):
+        finish_call(request, call, KeyError('key'))
+
+    error = prepare_call(Request('GET', query={'item_id': 'a'}), logic)
+    assert isinstance(error, Error)
+    assert 400 == error.status_code
+
+
+def test_handle_request_body_limits():
+    def logic(item: Item, colors: Colors) -> Item:
+        return item
+
+    logic = post(logic, body_limits=BodyLimits(
+        max_bytes=100, max_array_length=2)).logic
+    body = b'{"item": {"item_id": 1}, "colors": ["blue", "green"]}'
+    request = Request('POST', 'application/json', body=body)
+    assert handle_request(request, logic) == ({'item_id': 1}, 201)
+
+    request = Request('POST', 'application/json', content_length=101,
+                      body_loader=mock.Mock())
+    error = handle_request(request, logic)
+    assert error.status_code == 413
+    # The body wasn't read since the content length was too large.
+    assert not request.body_loader.called
+
+    body = b'{"item": {"item_id": 1}, "colors": ["blue", "green", "blue"]}'
+    request = Request('POST', 'application/json', body=body)
+    error = handle_request(request, logic)
+    assert error.status_code == 413
+    assert 'Arrays must not have more than 2 items' in str(error.description)
+
+    # Item doesn't allow additional properties.
+    body = b'{"item": {"item_id": 1, "foo": 1}, "colors": []}'
+    request = Request('POST', 'application/json', body=body)
+    error = handle_request(request, logic)
+    assert error.status_code == 400
+    assert error.errors == {'item': 'Additional properties are not allowed.'}
+
+    # Bodies that can't be scanned get the same error as the JSON parser.
+    for body in (b']', b'{"item": {}}}', b'1, 2', b':', b'{"\\x": 1}',
+                 b'{"item": "\xff"}'):
+        request = Request('POST', 'application/json', body=body)
+        error = handle_request(request, logic)
+        assert (400, 'Request body is not valid JSON.') == (
+            error.status_code, str(error.description))
@@ -0,0 +1,140 @@
+import pytest
+
+from doctor.errors import InvalidValueError, TypeSystemError
+from doctor.plan import (
+    create_validation_plan, get_response_type, get_validation_plan)
+from doctor.response import Response
+from doctor.types import new_type
+
+from .types import (
+    AgeOrColor, Auth, Colors, FooInstance, FoosWithParser, Item, ItemId,
+    Latitude, OptIn)
+from .utils import add_doctor_attrs
+
+
+def logic(item_id: ItemId, colors: Colors, lat: Latitude = None,
+          opt_in: OptIn = False) -> Item:
+    return {'item_id': item_id}
+
+
+class TestValidationPlan(object):
+
+    def test_create_validation_plan(self):
+        plan = create_validation_plan(add_doctor_attrs(logic))
+        assert plan.req_obj_type is None
+        assert {'item_id': 'item_id', 'colors': 'colors',
+                'lat': 'location.lat', 'opt_in': 'opt-in'} == plan.param_names
+        assert frozenset(['item_id', 'colors', 'lat', 'opt_in']) == (
+            plan.all_params)
+        assert frozenset(['item_id', 'colors']) == plan.required
+        assert ('item_id', 'colors') == plan.required_order
+        assert Item is plan.return_annotation
+        assert Item is plan.response_type
+
+        # The plan can't be modified.
+        with pytest.raises(AttributeError):
+            plan.required = frozenset()
+        with pytest.raises(TypeError):
+            plan.validators['item_id'] = None
+
+    def test_create_validation_plan_req_obj_type(self):
+        def logic(foo: FooInstance):
+            pass
+
+        plan = create_validation_plan(
+            add_doctor_attrs(logic, req_obj_type=FooInstance))
+        assert FooInstance is plan.req_obj_type
+        assert frozenset(['foo_id']) == plan.required
+        assert {'foo': 'a', 'foo_id': 1} == plan.validate(
+            {'foo': 'a', 'foo_id': '1'})
+
+        with pytest.raises(TypeSystemError) as exc:
+            plan.validate({'foo_id': 'a'})
+        assert {'__all__': {'foo_id': 'Must be a valid number.'}} == (
+            exc.value.errors)
+
+    def test_validate_union_type(self):
+        def logic(age_or_color: AgeOrColor):
+            pass
+
+        plan = create_validation_plan(add_doctor_attrs(logic))
+        native_type = AgeOrColor._native_type
+        assert {'age_or_color': 'blue'} == plan.validate(
+            {'age_or_color': 'blue'})
+        assert {'age_or_color': 22} == plan.validate({'age_or_color': 22})
+        # Validating doesn't change the native type of the shared class.
+        assert AgeOrColor._native_type is native_type
+
+    def test_map_param_names(self):
+        plan = create_validation_plan(add_doctor_attrs(logic))
+        actual = plan.map_param_names({
+            'item_id': 1, 'location.lat': 45.1, 'opt-in': True, 'foo': 'bar'})
+        assert {'item_id': 1, 'lat': 45.1, 'opt_in': True} == actual
+
+    def test_parse_query_params(self):
+        def logic(auth: Auth, foos: FoosWithParser, item_id: ItemId = None,
+                  use_cache: bool = False):
+            pass
+
+        plan = create_validation_plan(add_doctor_attrs(logic))
+        actual = plan.parse_query_params({
+            'auth': 'token', 'foos': 'a,b', 'item_id': '', 'use_cache': '1',
+            'other': '1'})
+        assert {'auth': 'token', 'foos': ['a', 'b'], 'item_id': None} == actual
+
+        with pytest.raises(TypeSystemError) as exc:
+            plan.parse_query_params({'item_id': 'abc'})
+        assert {'item_id': 'value must be a valid type (integer, null)'} == (
+            exc.value.errors)
+
+    def test_check_required(self):
+        plan = create_validation_plan(add_doctor_attrs(logic))
+        plan.check_required({'item_id': 1, 'colors': []})
+
+        with pytest.raises(InvalidValueError, match='colors is required.'):
+            plan.check_required({'item_id': 1})
+
+        with pytest.raises(InvalidValueError,
+                           match=r"\['item_id', 'colors'\] are required."):
+            plan.check_required({})
+
+    def test_validate(self):
+        plan = create_validation_plan(add_doctor_attrs(logic))
+        actual = plan.validate({'item_id': None, 'colors': ['Blue']})
+        assert {'item_id': None, 'colors': ['blue']} == actual
+        assert type(actual['colors']) is list
+
+        with pytest.raises(TypeSystemError) as exc:
+            plan.validate({'item_id': 0, 'colors': 'blue'})
+        assert {'item_id': 'Must be greater than or equal to 1.',
+                'colors': 'Must be a list.'} == exc.value.errors
+
+    def test_get_response_type(self):
+        assert Item is get_response_type(Item)
+        assert Item is get_response_type(Response[Item])
+
+    def test_get_validation_plan(self):
+        func = add_doctor_attrs(logic)
+        # A plan is compiled on the fly if one wasn't compiled ahead of time.
+        assert frozenset(['item_id', 'colors']) == (
+            get_validation_plan(func).required)
+
+        plan = create_validation_plan(func)
+        func._doctor_validation_plan = plan
+        assert plan is get_validation_plan(func)
+
+    def test_validate_compiled_type(self):
+        CompiledItem = new_type(Item, compiled=True)
+
+        def logic(item: CompiledItem, colors: Colors):
+            pass
+
+        plan = create_validation_plan(add_doctor_attrs(logic))
+        actual = plan.validate({'item': {'item_id': '1'}, 'colors': ['blue']})
+        assert {'item': {'item_id': 1}, 'colors': ['blue']} == actual
+        assert CompiledItem._doctor_compiled_validator is not None
+
+        with pytest.raises(TypeSystemError) as exc:
+            plan.validate({'item': {}, 'colors': ['blue']})
+        assert {'item': {'item_id': 'This field is required.'}} == (
+            exc.value.errors)
@@ -0,0 +1,139 @@
+import pstats
+
+import mock
+import pytest
+
+from doctor import profiling
+from doctor.errors import TypeSystemError
+from doctor.types import (
+    Boolean, Object, String, UnionType, array, integer, new_type, string)
+
+from .types import AgeOrColor, Color, Item, ItemId
+
+
+@pytest.fixture(autouse=True)
+def profile():
+    profiling.enable()
+    yield
+    profiling.disable()
+    profiling.reset()
+
+
+def get_profiles():
+    return {p.type: p for p in profiling.get_report()}
+
+
+def test_enable_disable():
+    assert profiling.is_enabled()
+    # Enabling twice doesn't wrap the methods twice.
+    profiling.enable()
+    ItemId(1)
+    assert get_profiles()[ItemId].calls == 1
+    # Types created while profiling is enabled copy the profiled methods.
+    Created = new_type(Item)
+
+    profiling.disable()
+    assert not profiling.is_enabled()
+    # The original methods are restored, including the copies made by
+    # new_type.
+    assert isinstance(String.__dict__['__new__'], staticmethod)
+    assert not hasattr(String.__new__, '_profiled')
+    for cls in (Object, Item, Created):
+        assert cls.__dict__['__init__'] is Object.__dict__['__init__']
+    assert not hasattr(Object.__init__, '_profiled')
+    assert not hasattr(UnionType._resolve.__func__, '_profiled')
+    ItemId(1)
+    Created({'item_id': 1})
+    assert get_profiles()[ItemId].calls == 1
+    assert Created not in get_profiles()
+
+
+def test_report():
+    Item({'item_id': 1})
+    Item({'item_id': 2})
+    Color('blue')
+    Boolean(True)
+    with pytest.raises(TypeSystemError):
+        ItemId(0)
+
+    profiles = get_profiles()
+    assert {Item, ItemId, Color, Boolean} == set(profiles)
+    assert 2 == profiles[Item].calls
+    # Failed validations are counted too.
+    assert 3 == profiles[ItemId].calls
+    item = profiles[Item]
+    assert 'Object: item' == item.label
+    assert 'Integer: item id' == profiles[ItemId].label
+    # Objects include the time spent validating their properties.
+    assert item.cumulative_time >= item.self_time
+    assert item.cumulative_time >= profiles[ItemId].cumulative_time / 3 * 2
+    report = profiling.get_report()
+    assert report == sorted(
+        report, key=lambda p: p.cumulative_time, reverse=True)
+
+    profiling.reset()
+    assert [] == profiling.get_report()
+
+
+def test_self_and_cumulative_time():
+    # Every call to perf_counter advances the clock by a second.
+    clock = iter(range(100))
+    with mock.patch('doctor.profiling.time.perf_counter',
+                    side_effect=lambda: next(clock)):
+        Item({'item_id': 1})
+    profiles = get_profiles()
+    assert (1, 1.0, 1.0) == (
+        profiles[ItemId].calls, profiles[ItemId].self_time,
+        profiles[ItemId].cumulative_time)
+    assert (1, 2.0, 3.0) == (
+        profiles[Item].calls, profiles[Item].self_time,
+        profiles[Item].cumulative_time)
+
+
+def test_union_type():
+    AgeOrColor(34)
+    with pytest.raises(TypeSystemError):
+        AgeOrColor('red')
+    assert 2 == get_profiles()[AgeOrColor].calls
+
+
+def test_unique_labels():
+    # Factory types share a class name, so the description is part of the
+    # label and duplicates are numbered.
+    A = string('A string.')
+    B = string('A string.')
+    A('a')
+    B('b')
+    labels = sorted(p.label for p in profiling.get_report())
+    assert ['String: A string.', 'String: A string. #2'] == labels
+
+
+def test_format_report():
+    Item({'item_id': 1})
+    lines = profiling.format_report().splitlines()
+    assert 3 == len(lines)
+    assert lines[0].split() == ['calls', 'self', '(s)', 'cumul', '(s)',
+                                'type']
+    assert lines[1].endswith('  Object: item')
+    assert lines[2].endswith('  Integer: item id')
+    assert 2 == len(profiling.format_report(limit=1).splitlines())
+
+
+def test_pstats(tmpdir):
+    Ids = array('ids', items=integer('id'))
+    Ids([1, 2, 3])
+
+    stats = profiling.get_stats()
+    ids_key = ('doctor.types', 0, 'Array: ids')
+    id_key = ('doctor.types', 0, 'Integer: id')
+    assert {ids_key, id_key} == set(stats.stats)
+    cc, nc, tt, ct, callers = stats.stats[id_key]
+    assert (3, 3) == (cc, nc)
+    assert [ids_key] == list(callers)
+    assert (3, 3) == callers[ids_key][:2]
+    assert {} == stats.stats[ids_key][4]
+
+    filename = str(tmpdir.join('types.prof'))
+    profiling.dump_stats(filename)
+    loaded = pstats.Stats(filename)
+    assert stats.stats == loaded.stats
@@ -234,3 +234,18 @@ class TestRouting(object):
         """
         route = Route('/', (put(update_foo),), heading='Dinosaur (v1)')
         assert 'DinosaurV1Handler' == get_handler_name(route, update_foo)
+
+    def test_create_routes_compiles_validation_plans(self):
+        routes = (
+            Route('^/foo/<int:foo_id>/?$', (
+                get(get_foo),
+                put(update_foo)), heading='Foo'),
+        )
+        route, handler = create_routes(routes, handle_http, Resource)[0]
+
+        plan = handler.get._doctor_validation_plan
+        assert frozenset(['name', 'age']) == plan.required
+        assert Foo is plan.return_annotation
+
+        plan = handler.put._doctor_validation_plan
+        assert frozenset(['foo_id', 'name']) == plan.required
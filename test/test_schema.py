@@ -52,6 +52,26 @@ class TestSchema(TestCase):
         with pytest.raises(SchemaValidationError, match=expected_message):
             self.schema.validate(bad_value, self.schema.get_validator())
 
+    def test_validate_error_single_pass(self):
+        bad_value = {'annotation_id': 'hodor',
+                     'name': 1}
+        validator = self.schema.get_validator()
+        with mock.patch.object(validator, 'iter_errors',
+                               wraps=validator.iter_errors) as mock_iter, \
+                mock.patch.object(validator, 'validate') as mock_validate:
+            with pytest.raises(SchemaValidationError) as excinfo:
+                self.schema.validate(bad_value, validator)
+        # iter_errors is also called recursively with sub-schemas, but the
+        # value should only be walked once against the whole schema.
+        top_level_calls = [c for c in mock_iter.call_args_list
+                           if len(c[0]) == 1]
+        assert len(top_level_calls) == 1
+        assert not mock_validate.called
+        assert excinfo.value.errors == {
+            'annotation_id': "'hodor' is not of type 'integer'",
+            'name': "1 is not of type 'null', 'string'",
+        }
+
     def test_validate_format_error(self):
         bad_value = {
             'annotation_id': 1,
@@ -1,6 +1,7 @@
 import os
 from datetime import date, datetime
 
+import mock
 import pytest
 
 from doctor.errors import TypeSystemError
@@ -85,6 +86,61 @@ class TestUnionType(object):
         assert Item(True)
         assert Item.native_type == bool
 
+    def test_resolve(self):
+        B = boolean('A bool.')
+        S = string('A string.')
+        N = integer('A nested int.')
+
+        class Nested(UnionType):
+            description = 'N or S.'
+            types = [N, S]
+
+        class Item(UnionType):
+            description = 'B or Nested.'
+            types = [B, Nested]
+
+        # Resolving returns the type without changing the native_type.
+        assert Item.resolve('S') == (S, 'S')
+        assert Item.resolve('5') == (N, 5)
+        assert Item.native_type == bool
+        assert Nested.native_type == int
+
+    def test_errors_only_formatted_on_failure(self):
+        S = string('Starts with S.', pattern=r'^S.*')
+        T = string('Starts with T.', pattern=r'^T.*')
+
+        class SOrT(UnionType):
+            description = 'S or T.'
+            types = [S, T]
+
+        with mock.patch.object(TypeSystemError, '__str__',
+                               return_value='error') as mock_str:
+            assert SOrT.resolve('T string') == (T, 'T string')
+            assert not mock_str.called
+            with pytest.raises(TypeSystemError):
+                SOrT.resolve('B')
+            assert mock_str.call_count == 2
+
+    def test_dispatch_on_type(self):
+        S = string('A string.')
+        Int = integer('An int.')
+
+        class SOrInt(UnionType):
+            description = 'S or Int.'
+            types = [S, Int]
+
+        assert SOrInt.resolve(1) == (S, '1')
+
+        SOrInt.dispatch_on_type = True
+        assert SOrInt.resolve(1) == (Int, 1)
+        assert SOrInt.resolve('1') == (S, '1')
+        # Types whose native type doesn't match are still tried.
+        assert SOrInt.resolve(1.0) == (S, '1.0')
+
+        # Replacing the types rebuilds the dispatch table.
+        SOrInt.types = [Int, S]
+        assert SOrInt.resolve(1.0) == (Int, 1)
+
 
 class TestString(object):
 
@@ -144,6 +200,23 @@ class TestString(object):
         with pytest.raises(TypeSystemError):
             S('bar')
 
+    def test_pattern_is_compiled_once(self):
+        S = string('a regex', pattern=r'^foo*')
+        compiled = S.get_pattern()
+        assert compiled.pattern == r'^foo*'
+        with mock.patch('doctor.types.re') as mock_re:
+            S('foo bar')
+            assert S.get_pattern() is compiled
+        assert not mock_re.compile.called
+        assert not mock_re.search.called
+
+        # Changing the pattern compiles the new pattern.
+        S.pattern = r'^bar'
+        S('bar')
+        with pytest.raises(TypeSystemError):
+            S('foo')
+        assert string('no regex').get_pattern() is None
+
     def test_format_date(self):
         S = string('date', format='date')
         # No exception
@@ -401,6 +474,23 @@ class TestEnum(object):
         with pytest.raises(TypeSystemError, match=expected_msg):
             E('dog')
 
+    def test_enum_values(self):
+        E = enum('choices', enum=['Foo', 'BAR'], case_insensitive=True)
+        values = E.get_enum_values()
+        assert values == frozenset(['foo', 'bar'])
+        assert 'bar' == E('Bar')
+        # The values are only created once and the enum isn't modified.
+        assert E.get_enum_values() is values
+        assert E.enum == ['Foo', 'BAR']
+
+        E.uppercase_value = True
+        assert E.get_enum_values() == frozenset(['FOO', 'BAR'])
+        assert 'FOO' == E('foo')
+
+        E = enum('choices', enum=['foo'])
+        with pytest.raises(TypeSystemError):
+            E(['foo'])
+
     def test_nullalbe(self):
         E = enum('choices', enum=['foo'], nullable=True)
         assert E(None) is None
@@ -556,6 +646,98 @@ class TestObject(object):
         with pytest.raises(TypeSystemError, match=err):
             PropertyDependenciesObject({'type': 'type'})
 
+    def test_validate_many(self):
+        records = [{'bar': '1', 'foo': 'foo'}, {'bar': 2, 'other': True}]
+        actual = RequiredPropsObject.validate_many(records)
+        assert [{'bar': 1, 'foo': 'foo'}, {'bar': 2, 'other': True}] == actual
+        # Plain dicts are returned and the records aren't modified.
+        assert all(type(row) is dict for row in actual)
+        assert '1' == records[0]['bar']
+
+        assert [None, {'foo': 'ab'}] == NullableFooObject.validate_many(
+            [None, {'foo': 'ab'}])
+        assert [] == FooObject.validate_many([])
+
+    def test_validate_many_errors(self):
+        with pytest.raises(TypeSystemError) as exc:
+            RequiredPropsObject.validate_many([
+                {'bar': 1}, {'foo': 'f'}, 'foo', {1: 2}, {'bar': 'a'}])
+        assert {
+            (1, 'bar'): 'This field is required.',
+            (1, 'foo'): 'Must have at least 2 characters.',
+            (2, '__all__'): 'Must be an object.',
+            (3, '__all__'): 'Object keys must be strings.',
+            (4, 'bar'): 'Must be a valid number.',
+        } == exc.value.errors
+
+        with pytest.raises(TypeSystemError) as exc:
+            NoAddtPropsObject.validate_many([{'foo': 'ab', 'cat': 1}])
+        assert {(0, 'cat'): 'Additional properties are not allowed.'} == (
+            exc.value.errors)
+        assert "(0, 'cat') - Additional properties" in str(exc.value)
+
+        with pytest.raises(TypeSystemError) as exc:
+            PropertyDependenciesObject.validate_many([
+                {'category': 'c'}, {'name': 'name'}])
+        assert {(1, '__all__'): "Required properties ['category'] for "
+                                "property `name` are missing."} == (
+            exc.value.errors)
+
+        with pytest.raises(TypeSystemError) as exc:
+            ValidateObject.validate_many([{'key1': 1}, {'foo': 'bar'}])
+        assert {(1, '__all__'): 'Keys must start with key'} == (
+            exc.value.errors)
+
+    def test_validate_many_error_messages(self):
+        class Parent(Object):
+            description = 'parent'
+            properties = {'foo': string('foo')}
+
+        class Child(Parent):
+            # The templates use an attribute inherited from the parent.
+            errors = dict(Object.errors, type='Must be a {description}.')
+
+        with pytest.raises(TypeSystemError) as exc:
+            Child('foo')
+        with pytest.raises(TypeSystemError) as many_exc:
+            Child.validate_many(['foo'])
+        assert {(0, '__all__'): exc.value.detail} == many_exc.value.errors
+        assert 'Must be a parent.' == exc.value.detail
+
+    def test_validate_many_nested_objects(self):
+        class Parent(Object):
+            description = 'parent'
+            properties = {
+                'child': RequiredPropsObject,
+                'name': string('name'),
+            }
+
+        records = [
+            {'child': {'bar': '1'}, 'name': 'a'},
+            {'child': RequiredPropsObject({'bar': 2})},
+            {'child': {'foo': 'f'}},
+            {'child': 1},
+        ]
+        with pytest.raises(TypeSystemError) as exc:
+            Parent.validate_many(records)
+        expected = {}
+        for index, record in enumerate(records):
+            try:
+                Parent(record)
+            except TypeSystemError as e:
+                for key, detail in e.detail.items():
+                    expected[(index, key)] = detail
+        assert {
+            (2, 'child'): {'bar': 'This field is required.',
+                           'foo': 'Must have at least 2 characters.'},
+            (3, 'child'): 'Must be an object.',
+        } == expected == exc.value.errors
+
+        actual = Parent.validate_many(records[:2])
+        assert [{'child': {'bar': 1}, 'name': 'a'},
+                {'child': {'bar': 2}}] == actual
+        assert type(actual[0]['child']) is dict
+
 
 class TestArray(object):
 
@@ -748,6 +930,27 @@ class TestJsonSchema(object):
         with pytest.raises(TypeSystemError, match=expected):
             J('not an int')
 
+    def test_validator_is_cached(self):
+        schema_file = os.path.join(
+            os.path.dirname(__file__), 'schema', 'annotation.yaml')
+        J = json_schema_type(
+            schema_file=schema_file, definition_key='annotation_id')
+        validator = J.get_validator()
+        assert validator is J.get_validator()
+
+        with mock.patch.object(J.schema, 'get_validator') as mock_get:
+            assert 1 == J(1)
+            assert 2 == J('2')
+        assert not mock_get.called
+
+        # A type created from J with a different definition key gets its
+        # own validator.
+        N = new_type(J, definition_key='name')
+        assert N.get_validator() is not validator
+        assert 'foo' == N('foo')
+        with pytest.raises(TypeSystemError, match="1 is not of type"):
+            N(1)
+
     def test_definition_key_resolve_array_of_object(self):
         """
         This tests that when the definition is an array of objects